@@ -0,0 +1,90 @@
+# -----------------------------------------------------------------------------
+# bench_dfa.py
+#
+# Lexes sources for made up command languages with more and more commands,
+# each command a string rule of its own (t_CMD0 = r'getabc' ...).  All of the
+# commands start with the same prefix, so the first character dispatch of the
+# re engine leaves every rule in one group, and the master regex tries the
+# commands one after the other.  The dfa engine follows the characters of all
+# of the commands at once.  Reports the tokens per second of both engines and
+# checks that the tokens are the same.
+#
+# Usage:  python example/bench_dfa.py [tokens]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import time
+import random
+import contextlib
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+from ply import lex
+
+SIZES = [10, 30, 100, 300]
+
+def t_error(t):
+    t.lexer.skip(1)
+
+# Make up count commands of get followed by three to eight letters
+def make_commands(rnd, count):
+    commands = set()
+    while len(commands) < count:
+        commands.add('get' + ''.join(rnd.choice('abcdefgh') for _ in range(rnd.randint(3, 8))))
+    return sorted(commands)
+
+# A lexer module with a string rule for each command
+def make_language(commands):
+    names = ['CMD%d' % i for i in range(len(commands))]
+    attrs = {
+        'tokens': ['NUM'] + names,
+        't_NUM': r'\d+',
+        't_ignore': ' \n',
+        't_error': staticmethod(t_error),
+        '__module__': __name__,
+    }
+    for text, name in zip(commands, names):
+        attrs['t_' + name] = text
+    return type('Language', (), attrs)()
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40000
+
+    rnd = random.Random(1)
+    mismatches = 0
+    print('%-10s %18s %18s' % ('', 're', 'dfa'))
+    for size in SIZES:
+        commands = make_commands(rnd, size)
+        source = ' '.join(rnd.choice(commands + ['1', '42']) for _ in range(count))
+        rates = []
+        results = []
+        for engine in ('re', 'dfa'):
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                spec = lex.lex(module=make_language(commands), engine=engine).spec
+            elapsed, tokens = best_of(lambda: [(t.type, t.value, t.lexpos) for t in spec.lexer(source)], 3)
+            rates.append(len(tokens) / elapsed)
+            results.append(tokens)
+        print('%3d rules  %9.0f tokens/s %9.0f tokens/s  %5.2fx' %
+              (size, rates[0], rates[1], rates[1] / rates[0]))
+        if results[0] != results[1]:
+            print('    the tokens are not the same')
+            mismatches += 1
+
+    if mismatches:
+        sys.exit('FAILED')
+
+if __name__ == '__main__':
+    main()
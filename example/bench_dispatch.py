@@ -0,0 +1,75 @@
+# -----------------------------------------------------------------------------
+# bench_dispatch.py
+#
+# Measures the first character dispatch of the re engine on the Snailz token
+# set.  For each group of tokens (the operators and punctuation PLUS ...
+# SORT, strings, names, numbers and a mix of whole statements) it lexes a
+# source made of those tokens with the Snailz spec and with a copy of the
+# spec without dispatch, which tries all of the rules at every token, and
+# reports the tokens per second of each.  The tokens have to be the same.
+#
+# Usage:  python example/bench_dispatch.py [tokens]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import copy
+import time
+import random
+import contextlib
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+import Snailz
+
+GROUPS = [
+    ('operators', ['+', '-', '*', '/', '(', ')', '&', '|', '>', '[', ']', ',',
+                   '==', '=', '<', '%', '>>', '!', '^']),
+    ('strings',   ['"snail"', '"a \\"quoted\\" snail"', '""']),
+    ('names',     ['x', 'total', 'snail_count', 'a1', 'value', 'i']),
+    ('numbers',   ['0', '7', '42', '1000', '65536']),
+    ('statements', ['x = [1, 2, 3]', 'y = (a + b) * (c - d) / 4 % 5 ^ 2',
+                    'while (i < 10) total = total + [i, i * 2, >>(x)]', 's = "snail"']),
+]
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        spec = Snailz.Snailz().lexer.spec
+    plain = copy.copy(spec)
+    plain.lexstatedispatch = {}
+
+    rnd = random.Random(1)
+    mismatches = 0
+    print('%-12s %22s %22s' % ('', 'all rules', 'dispatch'))
+    for name, pieces in GROUPS:
+        source = ' '.join(rnd.choice(pieces) for _ in range(count))
+        row = []
+        results = []
+        for s in (plain, spec):
+            elapsed, tokens = best_of(lambda: [(t.type, t.value, t.lexpos) for t in s.lexer(source)], 3)
+            row.append(len(tokens) / elapsed)
+            results.append(tokens)
+        print('%-12s %14.0f tokens/s %14.0f tokens/s  %5.2fx' % (name, row[0], row[1], row[1] / row[0]))
+        if results[0] != results[1]:
+            print('    the tokens are not the same')
+            mismatches += 1
+
+    if mismatches:
+        sys.exit('FAILED')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -----------------------------------------------------------------------------
+# bench_errors.py
+#
+# Lexes Snailz sources that have runs of characters no rule matches (as in
+# pasted binary or text in the wrong encoding) with three error rules:
+#
+#    value[0]         Reads the bad character from t.value and skips it.
+#                     Reading the value slices out the rest of the input.
+#    skip(1)          Skips the bad character without reading t.value.
+#    skip_illegal()   Skips the whole run of bad characters (Snailz itself).
+#
+# Each is run on sources of increasing size so that the growth of the time
+# can be seen.
+#
+# Usage:  python example/bench_errors.py [statements]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import time
+import random
+import contextlib
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+import Snailz
+
+STATEMENTS = [
+    'x = [1, 2, 3]',
+    'y = (a + b) * (c - d) / 4 % 5 ^ 2',
+    'while (i < 10) total = total + [i, i * 2, >>(x)]',
+    's = "snail"',
+    '$@?\x00\x01\x02\x7f~`$@?$@?\x00\x01~`',
+    '\x80\x81\x82\x83\x84\x85\x86\x87\x88\x89\x8a\x8b',
+]
+
+# Snailz with an error rule that skips one character at a time
+class SkipSnailz(Snailz.Snailz):
+    read_value = False
+
+    def t_error(self, t):
+        if self.read_value:
+            t.value[0]
+        t.lexer.skip(1)
+
+def skip_snailz(read_value):
+    snailz = SkipSnailz()
+    snailz.read_value = read_value
+    return snailz
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        specs = [('value[0]', skip_snailz(True).lexer.spec),
+                 ('skip(1)', skip_snailz(False).lexer.spec),
+                 ('skip_illegal()', Snailz.Snailz().lexer.spec)]
+
+    rnd = random.Random(1)
+    sizes = [count, count * 2, count * 4]
+    sources = ['\n'.join(rnd.choice(STATEMENTS) for _ in range(n)) for n in sizes]
+    print('%-16s' % 'error rule' + ''.join('%12d' % len(s) for s in sources) + '  characters')
+    for name, spec in specs:
+        times = []
+        for source in sources:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                spec.lexer().tokenize_all(source)
+                times.append(time.perf_counter() - start)
+        print('%-16s' % name + ''.join('%10.1f ms' % (t * 1e3) for t in times))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# -----------------------------------------------------------------------------
+# bench_ignore.py
+#
+# Lexes a Snailz source in which every statement is indented by a few dozen
+# spaces and tabs, skipping the ignored characters a whole run at a time (as
+# the lexer does) and, for comparison, one character at a time (with a copy
+# of the spec whose skip regexes match a single character).  Reports the
+# tokens per second of each lexer engine and checks that the tokens are the
+# same.
+#
+# Usage:  python example/bench_ignore.py [statements] [indent]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import re
+import sys
+import copy
+import time
+import random
+import contextlib
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+from ply import lex
+import Snailz
+
+STATEMENTS = [
+    'x = [1, 2, 3]',
+    'y = (a + b) * (c - d) / 4 % 5 ^ 2',
+    'while (i < 10) total = total + [i, i * 2, >>(x)]',
+    's = "snail"',
+]
+
+# A copy of spec that skips one ignored character at a time
+def one_at_a_time(spec):
+    spec = copy.copy(spec)
+    spec.lexstateskip = { state: (chars, re.compile('[%s]' % re.escape(chars)))
+                          for state, chars in spec.lexstateignore.items() if chars }
+    return spec
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    indent = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    rnd = random.Random(1)
+    lines = []
+    for _ in range(count):
+        pad = ''.join(rnd.choice(' \t') for _ in range(rnd.randint(indent // 2, indent)))
+        lines.append(pad + rnd.choice(STATEMENTS).replace(' ', '   '))
+    source = '\n'.join(lines)
+    print('%d characters, %d statements indented by up to %d' % (len(source), count, indent))
+
+    mismatches = 0
+    for engine in ('re', 'dfa'):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            spec = lex.lex(module=Snailz.Snailz(), engine=engine).spec
+        results = []
+        for name, s in (('runs', spec), ('characters', one_at_a_time(spec))):
+            elapsed, tokens = best_of(lambda: s.lexer().tokenize_all(source), 3)
+            results.append([(t.type, t.value, t.lexpos) for t in tokens])
+            print('    %-4s %-12s %8.1f ms %10.0f tokens/s' %
+                  (engine, name, elapsed * 1e3, len(tokens) / elapsed))
+        if results[0] != results[1]:
+            print('    the tokens are not the same')
+            mismatches += 1
+
+    if mismatches:
+        sys.exit('FAILED')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# -----------------------------------------------------------------------------
+# bench_keywords.py
+#
+# Lexes an identifier heavy Snailz source with the Snailz spec, which looks
+# the names up in its keywords, and with a copy of Snailz that has a rule
+# for each keyword as it used to (string rules for while, for, else and
+# snail, function rules for the others, and a test in t_NAME).  Reports the
+# tokens per second of each lexer engine and checks that the tokens are the
+# same.  None of the names in the source start with a keyword, since the
+# keyword rules would split those (for example format into for and mat).
+#
+# Usage:  python example/bench_keywords.py [statements]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import time
+import random
+import contextlib
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+from ply import lex
+import Snailz
+
+STATEMENTS = [
+    'total = total + value * count',
+    'while (index < limit) index = index + step',
+    'if done ThereneverisaslowerpaceThansnailscompetinginarace(result) else result = first',
+    'for (i < n i = i + 1) sum = sum + item',
+    'flag = True & !False | ready',
+    'snail = [alpha, beta, gamma, delta]',
+]
+
+# Snailz with the keyword rules
+class RuleSnailz(Snailz.Snailz):
+    t_keywords = None
+
+    t_WHILE = r'while'
+    t_FOR = r'for'
+    t_ELSE = r'else'
+    t_SNAIL = r'snail'
+
+    def t_PRINT(self, t):
+        r'ThereneverisaslowerpaceThansnailscompetinginarace'
+        return t
+
+    def t_TRUE(self, t):
+        r'True'
+        return t
+
+    def t_FALSE(self, t):
+        r'False'
+        return t
+
+    def t_IF(self, t):
+        r'if'
+        return t
+
+    def t_NAME(self, t):
+        r'[a-zA-Z_][a-zA-Z0-9_]*'
+        if t.value in ('if', 'else', 'while', 'for', 'snail', 'ThereneverisaslowerpaceThansnailscompetinginarace'):
+            t.type = t.value.upper()
+        return t
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    rnd = random.Random(1)
+    source = '\n'.join(rnd.choice(STATEMENTS) for _ in range(count))
+    print('%d characters, %d statements' % (len(source), count))
+
+    mismatches = 0
+    for engine in ('re', 'dfa'):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            specs = [('keyword rules', lex.lex(module=RuleSnailz(), engine=engine).spec),
+                     ('keywords', lex.lex(module=Snailz.Snailz(), engine=engine).spec)]
+        results = []
+        for name, spec in specs:
+            elapsed, tokens = best_of(lambda: [(t.type, t.value, t.lexpos) for t in spec.lexer(source)], 3)
+            results.append(tokens)
+            print('    %-4s %-14s %8.1f ms %10.0f tokens/s' %
+                  (engine, name, elapsed * 1e3, len(tokens) / elapsed))
+        if results[0] != results[1]:
+            print('    the tokens are not the same')
+            mismatches += 1
+
+    if mismatches:
+        sys.exit('FAILED')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# -----------------------------------------------------------------------------
+# bench_lalr.py
+#
+# Times the two digraph() passes of LALR(1) lookahead generation (the Read
+# sets and the Follow sets) on synthetic grammars of increasing size, and
+# reports the time per element of the relation.  If the passes scale linearly
+# in the size of the relations, the last column stays roughly constant.  (The
+# sets are bitsets over the terminals, so it creeps up slowly in grammars whose
+# number of terminals grows with the size.)
+#
+# Two grammar shapes are generated:
+#
+#    nullable  s : a_0 a_1 ... a_n-1 END,  a_i : X_i | <empty>
+#              (one long chain in the reads relation)
+#    expr      an expression grammar with n precedence levels, each level
+#              with its own operator and a nullable suffix
+#
+# The nullable grammar is deeper than the Python recursion limit for the
+# larger sizes, which a recursive traversal can't handle.
+#
+# Each shape is measured at a number of sizes (four by default), doubling
+# each time.
+#
+# Usage:  python example/bench_lalr.py [steps]
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+from ply import yacc
+
+def nullable_grammar(n):
+    g = yacc.Grammar(['END'] + ['X%d' % i for i in range(n)])
+    g.add_production('s', ['a%d' % i for i in range(n)] + ['END'])
+    for i in range(n):
+        g.add_production('a%d' % i, ['X%d' % i])
+        g.add_production('a%d' % i, [])
+    g.set_start('s')
+    return g
+
+def expr_grammar(n):
+    terms = ['NUM', 'LPAREN', 'RPAREN'] + ['OP%d' % i for i in range(n)] + ['MARK%d' % i for i in range(n)]
+    g = yacc.Grammar(terms)
+    for i in range(n):
+        g.add_production('e%d' % i, ['e%d' % i, 'OP%d' % i, 'e%d' % (i + 1), 's%d' % i])
+        g.add_production('e%d' % i, ['e%d' % (i + 1)])
+        g.add_production('s%d' % i, ['MARK%d' % i])
+        g.add_production('s%d' % i, [])
+    g.add_production('e%d' % n, ['NUM'])
+    g.add_production('e%d' % n, ['LPAREN', 'e0', 'RPAREN'])
+    g.set_start('e0')
+    return g
+
+def measure(grammar):
+    grammar.build_lritems()
+    lr = yacc.LRTable(grammar, yacc.NullLogger())
+
+    # Redo the lookahead passes on their own
+    C = lr.lr0_items()
+    nullable = lr.compute_nullable_nonterminals()
+    trans = lr.find_nonterminal_transitions(C)
+    lookd, included = lr.compute_lookback_includes(C, trans, nullable)
+    reads = sum(len(lr.reads_relation(C, t, nullable)) for t in trans)
+    includes = sum(len(v) for v in included.values())
+
+    start = time.perf_counter()
+    readsets = lr.compute_read_sets(C, trans, nullable)
+    lr.compute_follow_sets(trans, readsets, included)
+    elapsed = time.perf_counter() - start
+
+    return len(C), len(trans), reads + includes, elapsed
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    print('%-8s %6s %7s %7s %9s %10s %12s' %
+          ('shape', 'size', 'states', 'trans', 'relation', 'time (ms)', 'us/element'))
+    for name, make, size in (('nullable', nullable_grammar, 250), ('expr', expr_grammar, 50)):
+        for _ in range(steps):
+            nstates, ntrans, nrel, elapsed = measure(make(size))
+            print('%-8s %6d %7d %7d %9d %10.1f %12.2f' %
+                  (name, size, nstates, ntrans, nrel, elapsed * 1e3,
+                   elapsed * 1e6 / (ntrans + nrel)))
+            size *= 2
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# -----------------------------------------------------------------------------
+# bench_lex.py
+#
+# Measures what it costs to get a lexer for a new input with the Snailz rules:
+# building one with lex.lex() (reflection and regex compilation), cloning an
+# existing lexer, and making a new lexer for the compiled spec.  Then it
+# tokenizes a set of statements from several threads at once, each task with
+# its own lexer on the one shared spec, and checks the tokens against those
+# of a serial run.
+#
+# Finally it joins the statements into one source and reports the tokens per
+# second of each lexer engine (re and dfa), once making a LexToken for each
+# token and once with tokenize_all() (of the string and of its encoding as
+# bytes), along with the memory taken up by the result.  The statements don't have any identifiers that start with a
+# keyword, so both engines give the same tokens.
+#
+# Usage:  python example/bench_lex.py [threads] [statements]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import time
+import random
+import tracemalloc
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+from ply import lex
+import Snailz
+
+STATEMENTS = [
+    'x = [1, 2, 3]',
+    'y = (a + b) * (c - d) / 4 % 5 ^ 2',
+    'z = !(a > b) & (c < d) | e == f',
+    'while (i < 10) total = total + [i, i * 2, >>(x)]',
+    'for (i < 3 x = x + 1) if i > 5 x = -i else x = i',
+    's = "snail"',
+]
+
+# Time a function of no arguments and return microseconds per call
+def per_call(func, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) * 1e6 / number
+
+def tokenize(spec, inputs):
+    lexer = spec.lexer()
+    result = []
+    for s in inputs:
+        lexer.input(s)
+        lexer.lineno = 1
+        result.append([(t.type, t.value, t.lineno, t.lexpos) for t in lexer])
+    return result
+
+# Run func() repeat times and return the best time, along with the result of
+# one more run and the memory that it holds on to
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    tracemalloc.start()
+    result = func()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return best, result, memory
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        snailz = Snailz.Snailz()
+        lexer = snailz.lexer
+
+        def build():
+            lex.lex(module=snailz)
+
+        candidates = [
+            ('lex.lex()', build, 200),
+            ('clone()', lexer.clone, 100000),
+            ('spec.lexer()', lexer.spec.lexer, 100000),
+        ]
+        times = [(name, per_call(func, number)) for name, func, number in candidates]
+
+    print('Getting a lexer for a new input')
+    for name, us in times:
+        print('    %-14s %10.2f us' % (name, us))
+
+    rnd = random.Random(1)
+    inputs = [rnd.choice(STATEMENTS) for _ in range(count)]
+    expected = tokenize(lexer.spec, inputs)
+
+    chunks = [inputs[i:i+20] for i in range(0, len(inputs), 20)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = []
+        for r in pool.map(tokenize, [lexer.spec] * len(chunks), chunks):
+            results.extend(r)
+    elapsed = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, results) if a != b)
+    print('%d statements in %d threads on one spec: %.1f ms, %d mismatches' %
+          (count, threads, elapsed * 1e3, mismatches))
+
+    source = '\n'.join(inputs)
+    raw = source.encode()
+    print('Lexing all of the statements as one source of %d characters' % len(source))
+    tokens = []
+    for engine in ('re', 'dfa'):
+        with contextlib.redirect_stderr(io.StringIO()):
+            spec = lex.lex(module=snailz, engine=engine).spec
+        for name, func in (('tokens', lambda: list(spec.lexer(source))),
+                           ('tokenize_all', lambda: spec.lexer().tokenize_all(source)),
+                           ('bytes', lambda: spec.lexer().tokenize_all(raw))):
+            elapsed, result, memory = measure(func, 5)
+            tokens.append([(t.type, t.value, t.lineno, t.lexpos) for t in result])
+            print('    %-4s %-14s %8.1f ms %10.0f tokens/s %8.1f MB' %
+                  (engine, name, elapsed * 1e3, len(result) / elapsed, memory / 1e6))
+    if any(toks != tokens[0] for toks in tokens):
+        print('    the tokens are not all the same')
+        mismatches += 1
+
+    if mismatches:
+        sys.exit('FAILED')
+
+if __name__ == '__main__':
+    main()
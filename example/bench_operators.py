@@ -0,0 +1,101 @@
+# -----------------------------------------------------------------------------
+# bench_operators.py
+#
+# Lexes sources made of operators (and numbers) for made up dialects with
+# more and more operators.  Each dialect is built twice: with a string rule
+# for each operator (t_OP0 = r'\+\+' ...) and with the operators declared
+# together (t_operators = {'++': 'OP0', ...}), which are matched by one regex
+# that follows a trie of them.  Reports the tokens per second of each lexer
+# engine, and of the re engine without the first character dispatch (which
+# leaves the rules for each operator to be tried one after the other), and
+# checks that the tokens are the same.
+#
+# Usage:  python example/bench_operators.py [tokens]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import re
+import sys
+import copy
+import time
+import random
+import contextlib
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+from ply import lex
+
+CHARS = '+-*/<>=!&|^%~?:.'
+SIZES = [20, 60, 180]
+
+def t_error(t):
+    t.lexer.skip(1)
+
+# Make up count operators of up to three characters
+def make_operators(rnd, count):
+    operators = set(CHARS)
+    while len(operators) < count:
+        operators.add(''.join(rnd.choice(CHARS) for _ in range(rnd.randint(2, 3))))
+    return sorted(operators)[:count]
+
+# A lexer module for the operators, with a rule for each or an operator set
+def make_dialect(operators, declared):
+    names = ['OP%d' % i for i in range(len(operators))]
+    attrs = {
+        'tokens': ['NUM'] + names,
+        't_NUM': r'\d+',
+        't_ignore': ' ',
+        't_error': staticmethod(t_error),
+        '__module__': __name__,
+    }
+    if declared:
+        attrs['t_operators'] = dict(zip(operators, names))
+    else:
+        for text, name in zip(operators, names):
+            attrs['t_' + name] = re.escape(text)
+    return type('Dialect', (), attrs)()
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    rnd = random.Random(1)
+    mismatches = 0
+    print('%-14s %22s %22s' % ('', 'a rule each', 'operator set'))
+    for size in SIZES:
+        operators = make_operators(rnd, size)
+        source = ' '.join(rnd.choice(operators + ['1', '42']) for _ in range(count))
+        for name, engine, dispatch in (('re', 're', True), ('re-all', 're', False), ('dfa', 'dfa', False)):
+            row = []
+            results = []
+            for declared in (False, True):
+                with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                    spec = lex.lex(module=make_dialect(operators, declared), engine=engine).spec
+                if not dispatch:
+                    spec = copy.copy(spec)
+                    spec.lexstatedispatch = {}
+                elapsed, tokens = best_of(lambda: [(t.type, t.value, t.lexpos) for t in spec.lexer(source)], 3)
+                row.append(len(tokens) / elapsed)
+                results.append(tokens)
+            print('%3d ops  %-6s %13.0f tokens/s %14.0f tokens/s  %5.2fx' %
+                  (size, name, row[0], row[1], row[1] / row[0]))
+            if results[0] != results[1]:
+                print('    the tokens are not the same')
+                mismatches += 1
+
+    if mismatches:
+        sys.exit('FAILED')
+
+if __name__ == '__main__':
+    main()
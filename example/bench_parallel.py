@@ -0,0 +1,71 @@
+# -----------------------------------------------------------------------------
+# bench_parallel.py
+#
+# Lexes one large Snailz source with tokenize_all() and with
+# tokenize_parallel() in pools of 2 up to the given number of worker
+# processes, reports the tokens per second of each, and checks that they all
+# give the same tokens.  Some of the strings in the source run over more than
+# one line, so not every newline is a place where the input can be cut.
+#
+# Usage:  python example/bench_parallel.py [workers] [statements]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import time
+import random
+import contextlib
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+import Snailz
+
+STATEMENTS = [
+    'x = [1, 2, 3]',
+    'y = (a + b) * (c - d) / 4 % 5 ^ 2',
+    'z = !(a > b) & (c < d) | e == f',
+    'while (i < 10) total = total + [i, i * 2, >>(x)]',
+    'for (i < 3 x = x + 1) if i > 5 x = -i else x = i',
+    's = "snail"',
+    's = "a snail\non two lines"',
+]
+
+def dump(tokens):
+    return (list(tokens.types), list(tokens.starts), list(tokens.ends),
+            list(tokens.linenos), tokens.values, tokens.typenames)
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        snailz = Snailz.Snailz()
+    spec = snailz.lexer.spec
+
+    rnd = random.Random(1)
+    source = '\n'.join(rnd.choice(STATEMENTS) for _ in range(count))
+    print('%d characters, %d CPUs' % (len(source), os.cpu_count() or 1))
+
+    start = time.perf_counter()
+    expected = spec.lexer().tokenize_all(source)
+    elapsed = time.perf_counter() - start
+    print('    %-22s %8.1f ms %10.0f tokens/s' % ('tokenize_all()', elapsed * 1e3, len(expected) / elapsed))
+
+    mismatches = 0
+    for n in range(2, max(workers, 2) + 1):
+        start = time.perf_counter()
+        tokens = spec.lexer().tokenize_parallel(source, workers=n)
+        elapsed = time.perf_counter() - start
+        print('    %-22s %8.1f ms %10.0f tokens/s' %
+              ('tokenize_parallel(%d)' % n, elapsed * 1e3, len(tokens) / elapsed))
+        if dump(tokens) != dump(expected):
+            print('    the tokens are not the same')
+            mismatches += 1
+
+    if mismatches:
+        sys.exit('FAILED')
+
+if __name__ == '__main__':
+    main()
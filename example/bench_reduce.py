@@ -0,0 +1,107 @@
+# -----------------------------------------------------------------------------
+# bench_reduce.py
+#
+# Measures how many grammar reductions per second the LR engine performs on
+# the Snailz grammar.  The input is tokenized up front so that only the parser
+# is timed, and the statements are assignments and loops so that no Snailz
+# evaluation (printing, sorting) runs inside the grammar actions.
+#
+# Usage:  python example/bench_reduce.py [repeat]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import time
+import contextlib
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+from ply import lex, yacc
+import Snailz
+
+STATEMENTS = [
+    'x = [1, 2, 3]',
+    'y = (a + b) * (c - d) / 4 % 5 ^ 2',
+    'z = !(a > b) & (c < d) | e == f',
+    'while (i < 10) total = total + [i, i * 2, >>(x)]',
+    'for (i < 3 x = x + 1) if i > 5 x = -i else x = i',
+    'if a & b while (c) for (d e = f) g = h',
+]
+
+# A lexer stand-in that replays a list of tokens
+class TokenReplay:
+    def __init__(self, toks):
+        self.toks = toks
+        self.lineno = 1
+        self.lexpos = 0
+
+    def input(self, data):
+        self.it = iter(self.toks)
+
+    def token(self):
+        return next(self.it, None)
+
+def tokenize(lexer, text):
+    lexer.input(text)
+    lexer.lineno = 1
+    return list(lexer)
+
+def count_reductions(parser, inputs):
+    count = [0]
+    saved = [p.callable for p in parser.productions]
+
+    def counted(func):
+        def wrapper(*args):
+            count[0] += 1
+            return func(*args)
+        return wrapper
+
+    for p in parser.productions:
+        if p.callable:
+            p.callable = counted(p.callable)
+    try:
+        for toks in inputs:
+            parser.parse('', lexer=TokenReplay(toks))
+    finally:
+        for p, func in zip(parser.productions, saved):
+            p.callable = func
+    return count[0]
+
+def bench(parser, inputs, repeat, tracking=False):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for toks in inputs:
+            parser.parse('', lexer=TokenReplay(toks), tracking=tracking)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        snailz = Snailz.Snailz()
+        lexer = lex.lex(module=snailz)
+        engines = []
+        for name, packed in (('dict', False), ('packed', True), ('compressed', 'compressed')):
+            parser = yacc.yacc(module=snailz, debug=False, packed=packed,
+                               tabmodule=snailz.tabmodule, outputdir=os.path.abspath(srcdir))
+            engines.append((name, parser))
+
+    inputs = [tokenize(lexer, s) for s in STATEMENTS] * 500
+    ntokens = sum(len(toks) for toks in inputs)
+    nreductions = count_reductions(engines[0][1], inputs)
+    print('%d statements, %d tokens, %d reductions per pass' % (len(inputs), ntokens, nreductions))
+
+    for name, parser in engines:
+        for tracking in (False, True):
+            elapsed = bench(parser, inputs, repeat, tracking)
+            print('%-10s tracking=%-5s  %8.1f ms  %10.0f reductions/s' %
+                  (name, tracking, elapsed * 1e3, nreductions / elapsed))
+
+if __name__ == '__main__':
+    main()
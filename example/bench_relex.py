@@ -0,0 +1,85 @@
+# -----------------------------------------------------------------------------
+# bench_relex.py
+#
+# Simulates typing into a Snailz source in an editor.  Each keystroke inserts
+# (or, now and then, deletes) a character at a random place, and the tokens
+# are brought up to date once with Lexer.relex() and once by lexing the whole
+# text again with tokenize_all().  Reports the time per keystroke of both and
+# checks that they give the same tokens.
+#
+# Usage:  python example/bench_relex.py [statements] [keystrokes]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import time
+import random
+import contextlib
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+import Snailz
+
+STATEMENTS = [
+    'x = [1, 2, 3]',
+    'y = (a + b) * (c - d) / 4 % 5 ^ 2',
+    'z = !(a > b) & (c < d) | e == f',
+    'while (i < 10) total = total + [i, i * 2, >>(x)]',
+    'for (i < 3 x = x + 1) if i > 5 x = -i else x = i',
+    's = "snail"',
+]
+
+TYPED = 'abcxyz0123456789 +-*/()[]="'
+
+def dump(tokens):
+    return [(t.type, t.value, t.lineno, t.lexpos) for t in tokens]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    keystrokes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        snailz = Snailz.Snailz()
+    spec = snailz.lexer.spec
+
+    rnd = random.Random(1)
+    text = '\n'.join(rnd.choice(STATEMENTS) for _ in range(count))
+    lexer = spec.lexer()
+    tokens = lexer.tokenize_all(text)
+
+    relex_time = full_time = 0.0
+    relexed = 0
+    mismatches = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for n in range(keystrokes):
+            offset = rnd.randrange(len(text))
+            if rnd.random() < 0.2:
+                deleted, inserted = 1, ''
+            else:
+                deleted, inserted = 0, rnd.choice(TYPED)
+            text = text[:offset] + inserted + text[offset + deleted:]
+
+            start = time.perf_counter()
+            tokens = lexer.relex(tokens, offset, deleted, inserted)
+            relex_time += time.perf_counter() - start
+            relexed += len(tokens.changed)
+
+            start = time.perf_counter()
+            expected = spec.lexer().tokenize_all(text)
+            full_time += time.perf_counter() - start
+
+            if n % 20 == 0 and dump(tokens) != dump(expected):
+                mismatches += 1
+
+    print('%d keystrokes in %d characters (%d tokens)' % (keystrokes, len(text), len(tokens)))
+    print('    relex()          %8.3f ms per keystroke, %.1f tokens lexed again' %
+          (relex_time * 1e3 / keystrokes, relexed / keystrokes))
+    print('    tokenize_all()   %8.3f ms per keystroke' % (full_time * 1e3 / keystrokes))
+    print('    %d mismatches' % mismatches)
+    if mismatches:
+        sys.exit('FAILED')
+
+if __name__ == '__main__':
+    main()
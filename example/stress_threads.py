@@ -0,0 +1,120 @@
+# -----------------------------------------------------------------------------
+# stress_threads.py
+#
+# Parses Snailz statements from many threads at once with a single parser and
+# checks that every result matches the result of parsing the same statement
+# serially.  Each task makes its own lexer from the shared lexer spec, since a
+# lexer holds the state of its input, and all of the tasks share one LRParser.
+# Some of the statements contain syntax errors so that error recovery runs
+# concurrently as well.
+# p_error() records the state of the parser it sees along with each error,
+# and those records have to match too.
+#
+# The dictionary and packed engines are run with and without position
+# tracking.  On a free-threaded build of CPython the threads really do run
+# in parallel.
+#
+# Usage:  python example/stress_threads.py [threads] [statements]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import time
+import random
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+import Snailz
+
+STATEMENTS = [
+    'x = [1, 2, 3]',
+    'y = (a + b) * (c - d) / 4 % 5 ^ 2',
+    'z = !(a > b) & (c < d) | e == f',
+    'while (i < 10) total = total + [i, i * 2, >>(x)]',
+    'for (i < 3 x = x + 1) if i > 5 x = -i else x = i',
+    'if a & b while (c) for (d e = f) g = h',
+    's = "snail"',
+    'x = = 1',                       # Syntax errors
+    'y = (1 + ) * 2',
+    'while ( x = 1',
+    'z = [1, 2',
+]
+
+# Snailz with a p_error() that records what it sees in the calling thread
+class RecordingSnailz(Snailz.Snailz):
+    local = threading.local()
+
+    def p_error(self, p):
+        self.local.errors.append((p and p.value, self.parser.state, len(self.parser.symstack)))
+
+# Turn a parse result into a string that can be compared
+def dump(n):
+    if isinstance(n, Snailz.ASTNode):
+        return '%s(%s;%r)' % (n.type, ','.join(dump(c) for c in n.children), n.value)
+    if isinstance(n, list):
+        return '[%s]' % ','.join(dump(c) for c in n)
+    return repr(n)
+
+def parse_all(parser, lexer, inputs, tracking):
+    lexer = lexer.spec.lexer()
+    results = []
+    for s in inputs:
+        lexer.lineno = 1
+        errors = RecordingSnailz.local.errors = []
+        try:
+            result = dump(parser.parse(s, lexer=lexer, tracking=tracking))
+        except Exception as e:
+            # Snailz evaluates expression statements, which can fail
+            result = 'exception: %s' % e
+        results.append((result, errors))
+    return results
+
+def stress(parser, lexer, inputs, threads, tracking):
+    expected = parse_all(parser, lexer, inputs, tracking)
+
+    # Hand out small chunks so that the threads interleave a lot
+    chunks = [inputs[i:i+20] for i in range(0, len(inputs), 20)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(parse_all, parser, lexer, chunk, tracking) for chunk in chunks]
+        results = []
+        for f in futures:
+            results.extend(f.result())
+    elapsed = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, results) if a != b)
+    return mismatches, elapsed
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    rnd = random.Random(1)
+    inputs = [rnd.choice(STATEMENTS) for _ in range(count)]
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('%d threads, %d statements, GIL %s' % (threads, count, 'enabled' if gil else 'disabled'))
+
+    failed = False
+    for packed in (False, True, 'compressed'):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            snailz = RecordingSnailz(packed=packed)
+            results = []
+            for tracking in (False, True):
+                results.append((tracking,) + stress(snailz.parser, snailz.lexer, inputs, threads, tracking))
+        for tracking, mismatches, elapsed in results:
+            print('packed=%-10s tracking=%-5s  %6.1f ms  %d mismatches' %
+                  (packed, tracking, elapsed * 1e3, mismatches))
+            failed = failed or mismatches > 0
+
+    if failed:
+        sys.exit('FAILED')
+    print('OK')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+# -----------------------------------------------------------------------------
+# table_pages.py
+#
+# Reports how much of the memory of a set of forked Snailz workers is shared
+# and how much is private to each worker, for each format of saved parsing
+# tables.  The parent process writes the tables once, then forks the workers.
+# Each worker loads its own parser from the saved tables (as a preforked
+# server would) and parses a few statements.  While all of the workers are
+# alive, the parent sums up /proc/<pid>/smaps for each of them.
+#
+# The Snailz tables are small.  Given a size, the workers instead load the
+# tables of a synthetic expression grammar with that many precedence levels,
+# which makes the difference between the formats easier to see.
+#
+# The figures are averages per worker in kB:
+#
+#    rss       Resident memory
+#    pss       Proportional set size (shared pages divided among their users)
+#    shared    Pages that are also mapped by another process
+#    private   Pages that only this worker uses
+#    tables    Shared and private pages of the mapped table file (binary only).
+#              Only the pages that the parser has read are resident.
+#
+# Only works on Linux.
+#
+# Usage:  python example/table_pages.py [workers] [size]
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import shutil
+import tempfile
+import contextlib
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+from ply import yacc
+import Snailz
+
+STATEMENTS = [
+    'x = [1, 2, 3]',
+    'y = (a + b) * (c - d) / 4 % 5 ^ 2',
+    'while (i < 10) total = total + [i, i * 2, >>(x)]',
+]
+
+# Sum up the fields of /proc/<pid>/smaps.  Returns (totals, per_file) where
+# totals maps field names to kB and per_file does the same for the mappings
+# of the file named filename.
+def read_smaps(pid, filename=None):
+    totals = {}
+    per_file = {}
+    current = None
+    with open('/proc/%d/smaps' % pid) as f:
+        for line in f:
+            fields = line.split()
+            if not fields[0].endswith(':'):
+                # Start of a new mapping.  The pathname is the sixth field.
+                current = fields[5] if len(fields) > 5 else None
+                continue
+            if len(fields) != 3 or fields[2] != 'kB':
+                continue
+            name = fields[0][:-1]
+            totals[name] = totals.get(name, 0) + int(fields[1])
+            if filename and current == filename:
+                per_file[name] = per_file.get(name, 0) + int(fields[1])
+    return totals, per_file
+
+# Write a grammar module with size precedence levels to directory and import it
+def make_expr_module(directory, size):
+    lines = ['tokens = %r' % (['NUM', 'LPAREN', 'RPAREN'] + ['OP%d' % i for i in range(size)])]
+    for i in range(size):
+        lines.append('def p_e%d(p):' % i)
+        lines.append('    """e%d : e%d OP%d e%d\n           | e%d"""' % (i, i, i, i + 1, i + 1))
+        lines.append('    p[0] = p[1]')
+    lines.append('def p_atom(p):')
+    lines.append('    """e%d : NUM\n           | LPAREN e0 RPAREN"""' % size)
+    lines.append('    p[0] = p[1]')
+    lines.append('def p_error(p):')
+    lines.append('    pass')
+    with open(os.path.join(directory, 'exprgram.py'), 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    sys.path.insert(0, directory)
+    import exprgram
+    return exprgram
+
+# Build or load a parser.  module is None for Snailz.
+def load(module, kw, optimize=1):
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        if module is None:
+            snailz = Snailz.Snailz(optimize=optimize, **kw)
+            for s in STATEMENTS:
+                try:
+                    snailz.parser.parse(s, lexer=snailz.lexer)
+                except Exception:
+                    pass
+        else:
+            yacc.yacc(module=module, optimize=optimize, debug=False, **kw)
+
+# Body of a worker.  Loads the parser, tells the parent it is ready and waits
+# until the parent closes the pipe.
+def worker(module, kw, ready, done):
+    load(module, kw)
+    os.write(ready, b'x')
+    os.read(done, 1)
+    os._exit(0)
+
+def measure(module, kw, workers, filename=None):
+    ready_r, ready_w = os.pipe()
+    done_r, done_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            os.close(done_w)
+            worker(module, kw, ready_w, done_r)
+        pids.append(pid)
+    os.close(ready_w)
+    os.close(done_r)
+
+    for _ in range(workers):
+        os.read(ready_r, 1)
+
+    sums = {}
+    for pid in pids:
+        totals, per_file = read_smaps(pid, filename)
+        row = {
+            'rss':     totals.get('Rss', 0),
+            'pss':     totals.get('Pss', 0),
+            'shared':  totals.get('Shared_Clean', 0) + totals.get('Shared_Dirty', 0),
+            'private': totals.get('Private_Clean', 0) + totals.get('Private_Dirty', 0),
+            'tshared': per_file.get('Shared_Clean', 0) + per_file.get('Shared_Dirty', 0),
+            'tprivate': per_file.get('Private_Clean', 0) + per_file.get('Private_Dirty', 0),
+        }
+        for k, v in row.items():
+            sums[k] = sums.get(k, 0) + v
+
+    os.close(done_w)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    os.close(ready_r)
+    return { k: v / workers for k, v in sums.items() }
+
+def main():
+    if not os.path.exists('/proc/self/smaps'):
+        sys.exit('table_pages.py needs /proc/<pid>/smaps (Linux)')
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        picklefile = os.path.join(tmpdir, 'tables.pickle')
+        binfile = os.path.join(tmpdir, 'tables.bin')
+        if size:
+            module = make_expr_module(tmpdir, size)
+            tabmodule = {'tabmodule': 'exprgram_parsetab', 'outputdir': tmpdir}
+        else:
+            module = None
+            tabmodule = {}
+        formats = [
+            ('module', tabmodule, None),
+            ('pickle', {'picklefile': picklefile}, None),
+            ('binary', {'binfile': binfile}, binfile),
+        ]
+
+        # Write all of the table files.  This is done in a child process so that
+        # the workers don't inherit the parsers built along the way.
+        pid = os.fork()
+        if pid == 0:
+            for name, kw, _ in formats:
+                load(module, kw, optimize=0)
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        print('%s, %d workers, averages per worker in kB' %
+              ('%d level expression grammar' % size if size else 'Snailz', workers))
+        print('%-8s %8s %8s %8s %8s %16s' % ('format', 'rss', 'pss', 'shared', 'private', 'tables sh/priv'))
+        for name, kw, filename in formats:
+            r = measure(module, kw, workers, filename)
+            tables = '%d/%d' % (r['tshared'], r['tprivate']) if filename else '-'
+            print('%-8s %8.0f %8.0f %8.0f %8.0f %16s' %
+                  (name, r['rss'], r['pss'], r['shared'], r['private'], tables))
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    main()
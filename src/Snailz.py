@@ -21,6 +21,10 @@ class Parser:
 
     def __init__(self, **kw):
         self.debug = kw.get('debug', 0)
+        self.optimize = kw.get('optimize', 0)
+        self.packed = kw.get('packed', 0)
+        self.picklefile = kw.get('picklefile', None)
+        self.binfile = kw.get('binfile', None)
         self.names = {}
         self.symbol_table = {}
         try:
@@ -29,13 +33,20 @@ class Parser:
         except:
             modname = "parser" + "_" + self.__class__.__name__
         self.debugfile = modname + ".dbg"
+        self.tabmodule = modname + "_parsetab"
         # print self.debugfile
 
         # Build the lexer and parser
-        lex.lex(module=self, debug=self.debug)
-        yacc.yacc(module=self,
-                  debug=self.debug,
-                  debugfile=self.debugfile)
+        self.lexer = lex.lex(module=self, debug=self.debug)
+        self.parser = yacc.yacc(module=self,
+                                debug=self.debug,
+                                debugfile=self.debugfile,
+                                optimize=self.optimize,
+                                packed=self.packed,
+                                picklefile=self.picklefile,
+                                binfile=self.binfile,
+                                tabmodule=self.tabmodule,
+                                outputdir=os.path.dirname(os.path.abspath(__file__)))
 
     def run(self):
         while True:
@@ -45,7 +56,7 @@ class Parser:
                 break
             if not s:
                 continue
-            parse_tree = yacc.parse(s)
+            parse_tree = self.parser.parse(s, lexer=self.lexer)
             if parse_tree:
                 # self.print_ast(parse_tree)
                 self.eval(parse_tree)
@@ -56,57 +67,45 @@ class Snailz(Parser):
             'COMPEQU', 'EQUALS', 'LES', 'MOD', 'SORT',
            'NOT', 'EXP','IF','WHILE','FOR','ELSE','SNAIL','STRING')
 
-    t_PLUS = r'\+'
-    t_MINUS = r'-'
-    t_TIMES = r'\*'
-    t_DIVIDE = r'/'
-    t_LPAREN = r'\('
-    t_RPAREN = r'\)'
-    #t_NAME = r'[a-zA-Z_][a-zA-Z0-9_]*'
-    t_AND = r'\&'
-    t_OR = r'\|'
-    t_GR8R = r'\>'
-    t_LBRA = r'\['
-    t_RBRA = r'\]'
-    t_COM = r'\,'
-    t_COMPEQU = r'\=='
-    t_EQUALS = r'\='
-    t_LES = r'\<'
-    t_MOD = r'\%'
-    t_SORT = r'\>>'
-    t_NOT = r'\!'
-    t_EXP = r'\^'
-    ##t_IF = r'if'
-    t_WHILE  = r'while'
-    t_FOR = r'for'
-    t_ELSE = r'else'
-    t_SNAIL = r'snail'
+    t_NAME = r'[a-zA-Z_][a-zA-Z0-9_]*'
     t_STRING = r'"([^"\\]|\\.)*"'
 
-    def t_PRINT(self, t):
-        r'ThereneverisaslowerpaceThansnailscompetinginarace'
-        return t
-    
-    def t_TRUE(self, t):
-        r'True'
-        t.value = True
-        return t
-
-    def t_FALSE(self, t):
-        r'False'
-        t.value = False
-        return t
-    def t_IF(self, t):
-        r'if'
-        #print("IF token detected")
-        return t
-    
-    def t_NAME(self, t):
-        r'[a-zA-Z_][a-zA-Z0-9_]*'
-        if t.value in ('if', 'else', 'while', 'for','snail', 'ThereneverisaslowerpaceThansnailscompetinginarace'):  # Exclude 'if' and 'else' from being recognized as variable names
-            t.type = t.value.upper()   # Convert keyword to uppercase to match token type
-        return t
-    
+    # The operators are matched together, the longest first (>> before >)
+    t_operators = {
+        '+': 'PLUS',
+        '-': 'MINUS',
+        '*': 'TIMES',
+        '/': 'DIVIDE',
+        '(': 'LPAREN',
+        ')': 'RPAREN',
+        '&': 'AND',
+        '|': 'OR',
+        '>': 'GR8R',
+        '[': 'LBRA',
+        ']': 'RBRA',
+        ',': 'COM',
+        '==': 'COMPEQU',
+        '=': 'EQUALS',
+        '<': 'LES',
+        '%': 'MOD',
+        '>>': 'SORT',
+        '!': 'NOT',
+        '^': 'EXP',
+    }
+
+    # Names that are keywords get these token types (the lexer looks up the
+    # NAME tokens).  The value of a TRUE or FALSE token is its text, 'True'
+    # or 'False'; p_expression_boolean() turns it into a bool.
+    t_keywords = {
+        'if': 'IF',
+        'else': 'ELSE',
+        'while': 'WHILE',
+        'for': 'FOR',
+        'snail': 'SNAIL',
+        'True': 'TRUE',
+        'False': 'FALSE',
+        'ThereneverisaslowerpaceThansnailscompetinginarace': 'PRINT',
+    }
 
     def t_NUMBER(self, t):
         r'\d+'
@@ -138,8 +137,9 @@ class Snailz(Parser):
         return all(lst[i] <= lst[i+1] for i in range(len(lst)-1))
 
     def t_error(self, t):
-        print("Illegal character '%s'" % t.value[0])
-        t.lexer.skip(1)
+        # Skip the whole run of bad characters at once
+        bad = t.lexer.skip_illegal()
+        print("Illegal character%s '%s'" % ('s' if len(bad) > 1 else '', bad))
 
     def eval(self, node):
         if node.type == 'number':
@@ -262,15 +262,19 @@ class Snailz(Parser):
     ('nonassoc', 'LBRA', 'RBRA'),
     )
 
-    def p_statement_assign(self, p):
+    # Rules marked @yacc.positional get the values of the right hand side as
+    # arguments and return the new node instead of assigning p[0]
+    @yacc.positional
+    def p_statement_assign(self, name, equals, expression):
         'statement : NAME EQUALS expression'
         # Store the variable and its value in the symbol table
         # a ###### self.symbol_table[p[1]] = self.eval(p[3])
-        p[0] = ASTNode('assignment', [ASTNode('variable', value=p[1]), p[3]])
+        return ASTNode('assignment', [ASTNode('variable', value=name), expression])
     
-    def p_string(self,p):
+    @yacc.positional
+    def p_string(self, name, equals, string):
         'statement : NAME EQUALS STRING'
-        p[0] = ASTNode('string', children=[p[1],p[3]])
+        return ASTNode('string', children=[name, string])
 
     def p_statement_expr(self, p):
         '''statement : expression'''
@@ -278,78 +282,91 @@ class Snailz(Parser):
         result = self.eval(p[1])
         p[0] = ASTNode('statement_expr', children=[p[1]], value=result)
 
-    def p_expression_binop(self, p):
+    @yacc.positional
+    def p_expression_binop(self, left, op, right):
         """
         expression : expression PLUS expression
                   | expression MINUS expression
                   | expression TIMES expression
                   | expression DIVIDE expression
         """
-        p[0] = ASTNode(p[2], [p[1], p[3]])
+        return ASTNode(op, [left, right])
 
-    def p_expression_uminus(self, p):
+    @yacc.positional
+    def p_expression_uminus(self, minus, expression):
         'expression : MINUS expression %prec UMINUS'
-        p[0] = ASTNode('uminus', [p[2]])
+        return ASTNode('uminus', [expression])
 
-    def p_expression_group(self, p):
+    @yacc.positional
+    def p_expression_group(self, lparen, expression, rparen):
         'expression : LPAREN expression RPAREN'
-        p[0] = p[2]
+        return expression
 
-    def p_expression_number(self, p):
+    @yacc.positional
+    def p_expression_number(self, number):
         'expression : NUMBER'
-        p[0] = ASTNode('number', value=p[1])
+        return ASTNode('number', value=number)
 
-    def p_expression_name(self, p):
+    @yacc.positional
+    def p_expression_name(self, name):
         'expression : NAME'
-        p[0] = ASTNode('variable', value=p[1])
+        return ASTNode('variable', value=name)
 
-    def p_expression_exp(self, p):
+    @yacc.positional
+    def p_expression_exp(self, left, op, right):
         """
         expression : expression EXP expression
         """
-        p[0] = ASTNode('exp', [p[1], p[3]])
+        return ASTNode('exp', [left, right])
 
-    def p_expression_mod(self, p):
+    @yacc.positional
+    def p_expression_mod(self, left, op, right):
         """
         expression : expression MOD expression
         """
-        p[0] = ASTNode('mod', [p[1], p[3]])
+        return ASTNode('mod', [left, right])
 
-    def p_expression_gr8r(self, p):
+    @yacc.positional
+    def p_expression_gr8r(self, left, op, right):
         """
         expression : expression GR8R expression
         """
-        p[0] = ASTNode('GR8R', [p[1], p[3]])
+        return ASTNode('GR8R', [left, right])
 
-    def p_expression_les(self, p):
+    @yacc.positional
+    def p_expression_les(self, left, op, right):
         """
         expression : expression LES expression
         """
-        p[0] = ASTNode('LES', [p[1], p[3]])
+        return ASTNode('LES', [left, right])
 
-    def p_expression_compequ(self, p):
+    @yacc.positional
+    def p_expression_compequ(self, left, op, right):
         """
         expression : expression COMPEQU expression
         """
-        p[0] = ASTNode('COMPEQU', [p[1], p[3]])
+        return ASTNode('COMPEQU', [left, right])
 
-    def p_expression_lbra(self, p):
+    @yacc.positional
+    def p_expression_lbra(self, lbra, expression, rbra):
         """
         expression : LBRA expression RBRA
         """
-        p[0] = p[2]
+        return expression
 
-    def p_expression_rbra(self, p):
+    @yacc.positional
+    def p_expression_rbra(self, lbra, expression, rbra):
         """
         expression : RBRA expression RBRA
         """
-        p[0] = p[2]
+        return expression
 
-    def p_expression_list(self, p):
+    @yacc.positional
+    def p_expression_list(self, lbra, elements, rbra):
         """
         expression : LBRA list_elements RBRA
         """
-        p[0] = ASTNode('list', children=p[2])
+        return ASTNode('list', children=elements)
     
     def p_list_elements(self, p):
         """
@@ -361,29 +378,33 @@ class Snailz(Parser):
         else:
             p[0] = p[1] + [p[3]]
 
-    def p_expression_sort(self, p):
+    @yacc.positional
+    def p_expression_sort(self, sort, lparen, expression, rparen):
         'expression : SORT LPAREN expression RPAREN'
         # Here, we create a sort node with the inner expression as a child
-        p[0] = ASTNode('sort', [p[3]])
+        return ASTNode('sort', [expression])
 
 
-    def p_expression_and(self, p):
+    @yacc.positional
+    def p_expression_and(self, left, op, right):
         """
         expression : expression AND expression
         """
-        p[0] = ASTNode('AND', [p[1], p[3]])
+        return ASTNode('AND', [left, right])
 
-    def p_expression_or(self, p):
+    @yacc.positional
+    def p_expression_or(self, left, op, right):
         """
         expression : expression OR expression
         """
-        p[0] = ASTNode('OR', [p[1], p[3]])
+        return ASTNode('OR', [left, right])
 
-    def p_expression_not(self, p):
+    @yacc.positional
+    def p_expression_not(self, op, expression):
         """
         expression : NOT expression
         """
-        p[0] = ASTNode('NOT', [p[2]])
+        return ASTNode('NOT', [expression])
 
      # Grammar rules
     def p_statement_if(self, p):
@@ -398,32 +419,37 @@ class Snailz(Parser):
             # Includes else branch
             p[0] = ASTNode('IF', children=[p[2], p[3], p[5]])
             
-    def p_statement_while(self, p):
+    @yacc.positional
+    def p_statement_while(self, while_, lparen, condition, rparen, body):
         """
         statement : WHILE LPAREN expression RPAREN statement
         """
-        p[0] = ASTNode('WHILE', children=[p[3], p[5]])
+        return ASTNode('WHILE', children=[condition, body])
     
-    def p_statement_snail(self,p):
+    @yacc.positional
+    def p_statement_snail(self, snail):
         """
         statement : SNAIL
         """
-        p[0] = ASTNode('SNAIL')
+        return ASTNode('SNAIL')
 
-    def p_statement_for(self, p):
+    @yacc.positional
+    def p_statement_for(self, for_, lparen, condition, step, rparen, body):
         """
         statement : FOR LPAREN expression statement RPAREN statement
         """
-        p[0] = ASTNode('FOR', children=[p[3], p[4], p[6]])
+        return ASTNode('FOR', children=[condition, step, body])
 
-    def p_statement_print(self, p):
+    @yacc.positional
+    def p_statement_print(self, print_, lparen, expression, rparen):
         'statement : PRINT LPAREN expression RPAREN'
-        p[0] = ASTNode('print', children=[p[3]])
+        return ASTNode('print', children=[expression])
     
-    def p_expression_boolean(self, p):
+    @yacc.positional
+    def p_expression_boolean(self, value):
         '''expression : TRUE
                     | FALSE'''
-        p[0] = ASTNode('boolean', value=p[1])
+        return ASTNode('boolean', value=(value == 'True'))
 
 
     def p_error(self, p):
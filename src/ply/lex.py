@@ -39,10 +39,22 @@ import types
 import copy
 import os
 import inspect
+import threading
+import mmap
+from array import array
+from bisect import bisect_left, bisect_right
+
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse
 
 # This tuple contains acceptable string types
 StringTypes = (str, bytes)
 
+# Inputs that are lexed with the bytes version of a spec
+BufferTypes = (bytes, bytearray, memoryview, mmap.mmap)
+
 # This regular expression is used to match valid token names
 _is_identifier = re.compile(r'^[a-zA-Z0-9_]+$')
 
@@ -58,6 +70,62 @@ class LexToken(object):
     def __repr__(self):
         return f'LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})'
 
+# Return the number of newlines in data[start:end]
+def _count_newlines(data, start, end):
+    return data.count('\n' if isinstance(data, str) else b'\n', start, end)
+
+# Return the character at data[pos] for an error message
+def _char(data, pos):
+    return data[pos] if isinstance(data, str) else bytes(data[pos:pos + 1])
+
+# Token class for bytes input.  The value is kept as the bytes that were
+# matched (raw) until it's first read, when it's decoded to a string.
+class BytesToken(LexToken):
+    encoding = 'utf-8'
+
+    @property
+    def value(self):
+        value = self.raw
+        if isinstance(value, BufferTypes):
+            value = self.raw = str(value, self.encoding, 'replace')
+        return value
+
+    @value.setter
+    def value(self, value):
+        self.raw = value
+
+# Keywords of the bytes version of a spec.  A match in a bytearray or a
+# memoryview has to be made into bytes to be looked up.
+class BytesKeywords(dict):
+    def get(self, word, default=None):
+        return dict.get(self, bytes(word), default)
+
+# Token class of the tokens passed to t_error().  The value is the rest of the
+# input, as always, but it's only sliced out of lexdata (and decoded, for
+# bytes input) when it's first read.  An error rule that just looks at the
+# bad character and skips it doesn't copy the rest of the input each time.
+class ErrorToken(LexToken):
+    encoding = None
+
+    def __init__(self, lexdata, datapos):
+        self.lexdata = lexdata        # The input (or the window of a stream)
+        self.datapos = datapos        # Index of the bad character in lexdata
+
+    @property
+    def value(self):
+        try:
+            return self.raw
+        except AttributeError:
+            value = self.lexdata[self.datapos:]
+            if self.encoding:
+                value = str(value, self.encoding, 'replace')
+            self.raw = value
+            return value
+
+    @value.setter
+    def value(self, value):
+        self.raw = value
+
 # This object is a stand-in for a logging object created by the
 # logging module.
 
@@ -78,57 +146,94 @@ class PlyLogger(object):
     debug = critical
 
 # -----------------------------------------------------------------------------
-#                        === Lexing Engine ===
+#                        === Lexer Specification ===
 #
-# The following Lexer class implements the lexer runtime.   There are only
-# a few public methods and attributes:
+# A LexerSpec holds everything that lex() compiles from the rules of a module:
+# the master regular expressions of each state, the tables that map regex
+# groups to rules, and the ignored characters, error and eof functions of each
+# state.  A spec is never modified once lex() has built it.  All of the state
+# of scanning an input lives in the Lexer, so any number of lexers (in any
+# number of threads) can share one spec, and making a new lexer for a spec
+# costs about as much as making any small object.
 #
-#    input()          -  Store a new string in the lexer
-#    token()          -  Get the next token
-#    clone()          -  Clone the lexer
+#    lexer()          -  Make a new lexer for the spec
+#    bind()           -  Make a copy of the spec with the rules bound to an object
+#    bytespec()       -  The version of the spec for bytes input
 #
-#    lineno           -  Current line number
-#    lexpos           -  Current position in the input string
+# Bytes input (bytes, bytearray, memoryview or mmap) is scanned as it is,
+# without decoding it first.  The first time a lexer gets such an input, the
+# spec makes a copy of itself with all of the regular expressions, ignored
+# characters and literals encoded (with lex(encoding=...), UTF-8 by default)
+# and compiled as bytes patterns, and the lexer switches to that copy.  The
+# tokens are BytesTokens, whose values are decoded when they're first read.
+# In bytes patterns \w, \d and \s only match ASCII characters, and
+# lexer.lexmatch is a match on bytes.
 # -----------------------------------------------------------------------------
 
-class Lexer:
+class LexerSpec:
     def __init__(self):
-        self.lexre = None             # Master regular expression. This is a list of
-                                      # tuples (re, findex) where re is a compiled
-                                      # regular expression and findex is a list
-                                      # mapping regex group numbers to rules
-        self.lexretext = None         # Current regular expression strings
-        self.lexstatere = {}          # Dictionary mapping lexer states to master regexs
+        self.lexstatere = {}          # Dictionary mapping lexer states to master regexs.
+                                      # Each is a list of tuples (re, findex) where re
+                                      # is a compiled regular expression and findex is
+                                      # a list mapping regex group numbers to rules
         self.lexstateretext = {}      # Dictionary mapping lexer states to regex strings
         self.lexstaterenames = {}     # Dictionary mapping lexer states to symbol names
-        self.lexstate = 'INITIAL'     # Current lexer state
-        self.lexstatestack = []       # Stack of lexer states
         self.lexstateinfo = None      # State information
         self.lexstateignore = {}      # Dictionary of ignored characters for each state
+        self.lexstateskip = {}        # Dictionary mapping lexer states to (chars, regex)
+                                      # that skip runs of ignored input
         self.lexstateerrorf = {}      # Dictionary of error functions for each state
         self.lexstateeoff = {}        # Dictionary of eof functions for each state
+        self.lexstatedispatch = {}    # Dictionary mapping lexer states to (table, other).
+                                      # table maps each character below 256 to the master
+                                      # regexs of the rules that can start with it, and
+                                      # other holds those for the rest (only with the re
+                                      # engine)
+        self.lexstatedfa = {}         # Dictionary mapping lexer states to LexerDFAs
+                                      # (only with the dfa engine)
+        self.lexstateshared = {}      # Dictionary mapping lexer states to (chars, other):
+                                      # the characters below 256 that more than one rule
+                                      # can start with, and whether more than one can
+                                      # start with the others (only with the re engine)
+        self.lexstatereach = {}       # Dictionary mapping lexer states to the _ReachDFAs
+                                      # of Lexer.horizon(), made when first needed
         self.lexreflags = 0           # Optional re compile flags
-        self.lexdata = None           # Actual input data (as a string)
-        self.lexpos = 0               # Current position in input text
-        self.lexlen = 0               # Length of the input text
-        self.lexerrorf = None         # Error rule (if any)
-        self.lexeoff = None           # EOF rule (if any)
-        self.lextokens = None         # List of valid tokens
-        self.lexignore = ''           # Ignored characters
+        self.lextokens = None         # Set of valid tokens
+        self.lextokens_all = None     # Set of valid tokens and literals
+        self.lextypenames = ()        # Tokens and literals in order (for type codes)
+        self.lexlineindex = False     # Line numbers of tokens come from a LineIndex
         self.lexliterals = ''         # Literal characters that can be passed through
+        self.lexkeywords = {}         # Dictionary mapping keywords to token types
+        self.lexkeywordtype = None    # Type of the tokens that are looked up in lexkeywords
         self.lexmodule = None         # Module
-        self.lineno = 1               # Current line number
+        self.lexencoding = 'utf-8'    # Encoding of bytes input
+        self.lextokclass = LexToken   # Class of the tokens
+        self.lexerrclass = ErrorToken # Class of the tokens passed to t_error()
+        self.lexbytespec = None       # Bytes version of the spec (if made yet)
+        self.lexstrspec = None        # The spec this one is the bytes version of
 
-    def clone(self, object=None):
-        c = copy.copy(self)
+    # ------------------------------------------------------------
+    # lexer() - Make a new lexer for this spec, optionally with input
+    # ------------------------------------------------------------
+    def lexer(self, data=None):
+        lexobj = DFALexer(self) if self.lexstatedfa else Lexer(self)
+        if data is not None:
+            lexobj.input(data)
+        return lexobj
 
-        # If the object parameter has been supplied, it means we are attaching the
-        # lexer to a new object.  In this case, we have to rebind all methods in
-        # the lexstatere and lexstateerrorf tables.
+    # ------------------------------------------------------------
+    # bind() - Return a copy of the spec in which all of the rule
+    # functions (including the error functions) are replaced by the
+    # methods of the same name on object.  The regular expressions
+    # are shared with this spec.
+    # ------------------------------------------------------------
+    def bind(self, object):
+        spec = copy.copy(self)
+        bound = {}
 
-        if object:
-            newtab = {}
-            for key, ritem in self.lexstatere.items():
+        # Rebind the functions of a list of master regexes (once for each list)
+        def rebind(ritem):
+            if id(ritem) not in bound:
                 newre = []
                 for cre, findex in ritem:
                     newfindex = []
@@ -137,34 +242,271 @@ class Lexer:
                             newfindex.append(f)
                             continue
                         newfindex.append((getattr(object, f[0].__name__), f[1]))
-                newre.append((cre, newfindex))
-                newtab[key] = newre
-            c.lexstatere = newtab
-            c.lexstateerrorf = {}
-            for key, ef in self.lexstateerrorf.items():
-                c.lexstateerrorf[key] = getattr(object, ef.__name__)
-            c.lexmodule = object
+                    newre.append((cre, newfindex))
+                bound[id(ritem)] = (ritem, newre)
+            return bound[id(ritem)][1]
+
+        spec.lexstatere = { key: rebind(ritem) for key, ritem in self.lexstatere.items() }
+        spec.lexstatedispatch = { key: ({ c: rebind(ritem) for c, ritem in table.items() }, rebind(other))
+                                  for key, (table, other) in self.lexstatedispatch.items() }
+        spec.lexstateerrorf = {}
+        for key, ef in self.lexstateerrorf.items():
+            spec.lexstateerrorf[key] = getattr(object, ef.__name__) if ef else ef
+        spec.lexstatedfa = { key: dfa.bind(object) for key, dfa in self.lexstatedfa.items() }
+        spec.lexmodule = object
+        spec.lexbytespec = None
+        if self.lexstrspec:
+            spec.lexstrspec = self.lexstrspec.bind(object)
+            spec.lexstrspec.lexbytespec = spec
+        return spec
+
+    # ------------------------------------------------------------
+    # bytespec() - Return the version of the spec that scans bytes,
+    # making it the first time
+    # ------------------------------------------------------------
+    def bytespec(self):
+        if self.lexstrspec:
+            return self
+        if self.lexbytespec:
+            return self.lexbytespec
+        encoding = self.lexencoding
+        spec = copy.copy(self)
+        regexs = {}
+        encoded = {}
+        dfas = {}
+
+        # Encode the regexes of a list of master regexes (once for each list)
+        def encode(ritem):
+            if id(ritem) not in encoded:
+                newre = []
+                for cre, findex in ritem:
+                    if cre not in regexs:
+                        regexs[cre] = re.compile(cre.pattern.encode(encoding), cre.flags & ~re.UNICODE)
+                    newre.append((regexs[cre], findex))
+                encoded[id(ritem)] = (ritem, newre)
+            return encoded[id(ritem)][1]
+
+        spec.lexstatere = { state: encode(ritem) for state, ritem in self.lexstatere.items() }
+
+        # Bytes below 128 are the same characters.  The others may be part
+        # of the encoding of any character from 128 on.
+        spec.lexstatedispatch = {}
+        for state, (table, other) in self.lexstatedispatch.items():
+            other = encode(other)
+            spec.lexstatedispatch[state] = ({ n: encode(table[chr(n)]) if n < 128 else other
+                                              for n in range(256) }, other)
+        spec.lexstateignore = { state: self.lexstateignore.get(state, '').encode(encoding)
+                                for state in self.lexstatere }
+        spec.lexstateshared = { state: ({ n for n in range(256) if (chr(n) in chars if n < 128 else other) },
+                                        False)
+                                for state, (chars, other) in self.lexstateshared.items() }
+        spec.lexstatereach = {}
+        spec.lexstateskip = { state: (chars.encode(encoding),
+                                      re.compile(cre.pattern.encode(encoding), cre.flags & ~re.UNICODE))
+                              for state, (chars, cre) in self.lexstateskip.items() }
+        spec.lexliterals = ''.join(c for c in self.lexliterals
+                                   if len(c.encode(encoding)) == 1).encode(encoding)
+        spec.lexkeywords = BytesKeywords((word.encode(encoding), toktype)
+                                         for word, toktype in self.lexkeywords.items())
+        spec.lexstatedfa = {}
+        for state, dfa in self.lexstatedfa.items():
+            if dfa not in dfas:
+                dfas[dfa] = dfa.encode(encoding)
+            spec.lexstatedfa[state] = dfas[dfa]
+        spec.lextokclass = type('BytesToken', (BytesToken,), { 'encoding': encoding })
+        spec.lexerrclass = type('ErrorToken', (ErrorToken,), { 'encoding': encoding })
+        spec.lexstrspec = self
+        self.lexbytespec = spec
+        return spec
+
+# -----------------------------------------------------------------------------
+#                        === Lexing Engine ===
+#
+# The following Lexer class implements the lexer runtime.  A lexer scans one
+# input at a time using the rules of its spec.   There are only a few public
+# methods and attributes:
+#
+#    input()          -  Store a new string (or bytes) in the lexer
+#    input_stream()   -  Read the input from a file or an iterator of chunks
+#    token()          -  Get the next token
+#    tokenize_all()   -  Lex a whole string into a TokenArrays
+#    relex()          -  Update a TokenArrays after an edit of its text
+#    clone()          -  Clone the lexer
+#
+#    find_lineno()    -  Line number of a position in the input
+#    find_column()    -  Column of a position in the input
+#
+#    lineno           -  Current line number
+#    lexpos           -  Current position in the input
+#    spec             -  The LexerSpec holding the compiled rules
+#
+# The tables of the spec can also be read through the lexer under their old
+# names (lexstatere, lexstateinfo, lextokens and so on).
+# -----------------------------------------------------------------------------
+
+def _spec_attribute(name):
+    return property(lambda self: getattr(self.spec, name),
+                    doc=f'The {name} attribute of the lexer spec')
+
+class Lexer:
+    def __init__(self, spec=None):
+        self.spec = LexerSpec() if spec is None else spec
+        self.lexdata = None           # Actual input data (as a string)
+        self.lexpos = 0               # Current position in input text
+        self.lexlen = 0               # Length of the input text
+        self.lexbase = 0              # Position of lexdata[0] in the input
+        self.lexstream = None         # LexerStream that refills lexdata (if any)
+        self.lexlines = None          # LineIndex of the input (if made yet)
+        self.tokclass = LexToken      # Class of the tokens
+        self.errclass = ErrorToken    # Class of the tokens passed to t_error()
+        self.lineno = 1               # Current line number
+        self.lexstate = 'INITIAL'     # Current lexer state
+        self.lexstatestack = []       # Stack of lexer states
+        self.lexre = None             # Master regular expressions of the current state
+        self.lexdispatch = {}         # Master regexs by first character (see LexerSpec)
+        self.lexother = None          # Master regexs for characters not in lexdispatch
+        self.lexshared = ((), False)  # Characters more than one rule can start with (see LexerSpec)
+        self.lexreach = None          # _ReachDFA of horizon() (made when first needed)
+        self.lexretext = None         # Current regular expression strings
+        self.lexignore = ''           # Ignored characters
+        self.lexskipchars = ''        # Characters that start a run of ignored input
+        self.lexskip = None           # Match function of the regex that skips such a run
+        self.lexerrorf = None         # Error rule (if any)
+        self.lexeoff = None           # EOF rule (if any)
+        if 'INITIAL' in self.spec.lexstatere:
+            self.begin('INITIAL')
+
+    lexstatere      = _spec_attribute('lexstatere')
+    lexstateretext  = _spec_attribute('lexstateretext')
+    lexstaterenames = _spec_attribute('lexstaterenames')
+    lexstateinfo    = _spec_attribute('lexstateinfo')
+    lexstateignore  = _spec_attribute('lexstateignore')
+    lexstateskip    = _spec_attribute('lexstateskip')
+    lexstateerrorf  = _spec_attribute('lexstateerrorf')
+    lexstateeoff    = _spec_attribute('lexstateeoff')
+    lexstatedfa     = _spec_attribute('lexstatedfa')
+    lexreflags      = _spec_attribute('lexreflags')
+    lextokens       = _spec_attribute('lextokens')
+    lextokens_all   = _spec_attribute('lextokens_all')
+    lextypenames    = _spec_attribute('lextypenames')
+    lexlineindex    = _spec_attribute('lexlineindex')
+    lexliterals     = _spec_attribute('lexliterals')
+    lexkeywords     = _spec_attribute('lexkeywords')
+    lexkeywordtype  = _spec_attribute('lexkeywordtype')
+    lexmodule       = _spec_attribute('lexmodule')
+
+    # ------------------------------------------------------------
+    # clone() - Copy the lexer along with the state of its input.
+    #
+    # The copy shares the spec with this lexer.  If the object parameter
+    # has been supplied, it means we are attaching the lexer to a new
+    # object, and the copy gets a spec with the rules bound to it.
+    # ------------------------------------------------------------
+    def clone(self, object=None):
+        c = copy.copy(self)
+        c.lexstatestack = list(self.lexstatestack)
+        if object:
+            c.spec = self.spec.bind(object)
+            c.begin(c.lexstate)
         return c
 
     # ------------------------------------------------------------
-    # input() - Push a new string into the lexer
+    # input() - Push a new string into the lexer.  bytes, bytearray,
+    # memoryview and mmap objects are lexed without decoding them
+    # (see LexerSpec.bytespec()).  A file object or an iterator is
+    # read with input_stream().
     # ------------------------------------------------------------
     def input(self, s):
+        if not isinstance(s, (str,) + BufferTypes) and (hasattr(s, 'read') or hasattr(s, '__next__')):
+            self.input_stream(s)
+            return
+        self.use_spec_for(s)
         self.lexdata = s
         self.lexpos = 0
         self.lexlen = len(s)
+        self.lexbase = 0
+        self.lexstream = None
+        self.lexlines = None
+        if self.spec.lexlineindex:
+            self.lexlines = LineIndex(s, self.tokclass, self.errclass)
+            self.tokclass = self.lexlines.tokenclass
+            self.errclass = self.lexlines.errorclass
+
+    # ------------------------------------------------------------
+    # use_spec_for() - Switch to the str or the bytes version of
+    # the spec, whichever can scan data
+    # ------------------------------------------------------------
+    def use_spec_for(self, data):
+        spec = self.spec
+        if isinstance(data, str):
+            spec = spec.lexstrspec or spec
+        else:
+            spec = spec.bytespec()
+        if spec is not self.spec:
+            self.spec = spec
+            self.begin(self.lexstate)
+        self.tokclass = spec.lextokclass
+        self.errclass = spec.lexerrclass
+
+    # ------------------------------------------------------------
+    # input_stream() - Lex the text of a file object (read chunksize
+    # characters at a time) or of an iterable of strings.  Only a
+    # window of the input is kept in lexdata (see LexerStream).
+    # ------------------------------------------------------------
+    def input_stream(self, source, chunksize=65536, maxtoken=65536):
+        if self.spec.lexlineindex:
+            raise ValueError('A lexer with lineindex=True needs all of its input at once')
+        self.lexdata = ''
+        self.lexpos = 0
+        self.lexlen = 0
+        self.lexbase = 0
+        self.lexstream = LexerStream(source, chunksize, maxtoken)
+        self.lexlines = None
+
+    # ------------------------------------------------------------
+    # lines - The LineIndex of the input, made when it's first used
+    # ------------------------------------------------------------
+    @property
+    def lines(self):
+        if self.lexlines is None:
+            self.lexlines = LineIndex(self.lexdata)
+        return self.lexlines
+
+    # ------------------------------------------------------------
+    # find_lineno() and find_column() - Return the line number and
+    # column (both from 1) of a position in the input.  These
+    # don't depend on lineno being kept up to date by the rules.
+    # ------------------------------------------------------------
+    def find_lineno(self, pos):
+        return self.lines.lineno(pos)
+
+    def find_column(self, pos):
+        return self.lines.column(pos)
 
     # ------------------------------------------------------------
     # begin() - Changes the lexing state
     # ------------------------------------------------------------
     def begin(self, state):
-        if state not in self.lexstatere:
+        spec = self.spec
+        if state not in spec.lexstatere:
             raise ValueError(f'Undefined state {state!r}')
-        self.lexre = self.lexstatere[state]
-        self.lexretext = self.lexstateretext[state]
-        self.lexignore = self.lexstateignore.get(state, '')
-        self.lexerrorf = self.lexstateerrorf.get(state, None)
-        self.lexeoff = self.lexstateeoff.get(state, None)
+        self.lexre = spec.lexstatere[state]
+        self.lexretext = spec.lexstateretext[state]
+        if state in spec.lexstatedispatch:
+            self.lexdispatch, self.lexother = spec.lexstatedispatch[state]
+        else:
+            self.lexdispatch, self.lexother = {}, self.lexre
+        self.lexshared = spec.lexstateshared.get(state, ((), False))
+        self.lexreach = spec.lexstatereach.get(state)
+        self.lexignore = spec.lexstateignore.get(state, '')
+        if state in spec.lexstateskip:
+            self.lexskipchars, skipre = spec.lexstateskip[state]
+            self.lexskip = skipre.match
+        else:
+            self.lexskipchars = self.lexignore[:0]
+            self.lexskip = None
+        self.lexerrorf = spec.lexstateerrorf.get(state, None)
+        self.lexeoff = spec.lexstateeoff.get(state, None)
         self.lexstate = state
 
     # ------------------------------------------------------------
@@ -192,126 +534,1630 @@ class Lexer:
     def skip(self, n):
         self.lexpos += n
 
+    # ------------------------------------------------------------
+    # skip_illegal() - Skip ahead over the bad character at lexpos
+    # and all of those after it up to the next place where a rule,
+    # a literal or an ignored character matches.  Returns the text
+    # skipped.  An error rule that calls this instead of skip(1)
+    # is called once for each run of bad input instead of once for
+    # each character.  Like token(), it reads more of a stream when
+    # a rule may still match a token that goes on past the window.
+    # ------------------------------------------------------------
+    def skip_illegal(self):
+        lexdata  = self.lexdata
+        lexbase  = self.lexbase
+        lexend   = len(lexdata)
+        ignore   = self.lexignore
+        literals = self.lexliterals
+        regexs   = [lexre.match for lexre, _ in self.lexre]
+        stream   = self.lexstream
+        start    = self.lexpos - lexbase
+        lexpos   = start + 1
+        while True:
+            if lexpos < lexend:
+                c = lexdata[lexpos]
+                if c in ignore or c in literals or any(match(lexdata, lexpos) for match in regexs):
+                    break
+                if stream is None or self.horizon(lexpos) < lexend:
+                    lexpos += 1
+                    continue
+            if stream is None or not stream.grow(self):
+                break
+            lexdata = self.lexdata
+            lexend  = len(lexdata)
+        self.lexpos = lexpos + lexbase
+        text = lexdata[start:lexpos]
+        if not isinstance(text, str):
+            text = str(text, self.spec.lexencoding, 'replace')
+        return text
+
+    # ------------------------------------------------------------
+    # horizon() - Return how far the rules of the current state may
+    # look at lexdata when matching at lexpos: the index of the last
+    # character that re could look at, or len(lexdata) if it could
+    # go on past the end.  The answer may be further than re really
+    # looks, never shorter (see _form_reach()).
+    # ------------------------------------------------------------
+    def horizon(self, lexpos):
+        dfa = self.lexreach
+        if dfa is None:
+            spec = self.spec
+            dfa = self.lexreach = spec.lexstatereach[self.lexstate] = _form_reach(spec, self.lexstate)
+        lexdata = self.lexdata
+        lexend  = len(lexdata)
+        row = dfa.start
+        pos = lexpos
+        while True:
+            try:
+                while pos < lexend:
+                    row = row[lexdata[pos]]
+                    if not row:
+                        return pos
+                    pos += 1
+                return lexend
+            except KeyError:
+                # A character that the row hasn't seen yet
+                row = dfa.extend(row, lexdata[pos])
+                if not row:
+                    return pos
+                pos += 1
+
     # ------------------------------------------------------------
     # token() - Return the next token from the Lexer
     #
     # Note: This function has been carefully implemented to be as fast
     # as possible.  Don't make changes unless you really know what
     # you are doing
+    #
+    # The local lexpos is an index into lexdata.  self.lexpos and the
+    # lexpos of the tokens are positions in the whole input, which
+    # are lexbase more (see input_stream()).
     # ------------------------------------------------------------
     def token(self):
         # Make local copies of frequently referenced attributes
-        lexpos    = self.lexpos
+        lexbase   = self.lexbase
+        lexpos    = self.lexpos - lexbase
         lexlen    = self.lexlen
+        skipchars = self.lexskipchars
+        lexskip   = self.lexskip
         lexignore = self.lexignore
         lexdata   = self.lexdata
+        lexstream = self.lexstream
+        lexend    = len(lexdata) if lexstream is not None and not lexstream.eof else -1
+        dispatch  = self.lexdispatch
+        lexother  = self.lexother
+        tokclass  = self.tokclass
+        keywords  = self.spec.lexkeywords
+        kwtype    = self.spec.lexkeywordtype
+
+        while True:
+            while lexpos < lexlen:
+                # Skip ignored characters and t_ignore_ matches.  A single ignored
+                # character is stepped over and a longer run is skipped with one
+                # match of the skip regex.
+                c = lexdata[lexpos]
+                if c in skipchars:
+                    if c in lexignore:
+                        lexpos += 1
+                        if lexpos >= lexlen or lexdata[lexpos] not in skipchars:
+                            continue
+                    m = lexskip(lexdata, lexpos)
+                    if m:
+                        if lexend >= 0 and self.horizon(lexpos) == lexend and lexstream.grow(self):
+                            # The run may go on past the end of the window of a stream
+                            lexdata = self.lexdata
+                            lexlen  = self.lexlen
+                            lexend  = len(lexdata) if not lexstream.eof else -1
+                            continue
+                        lexpos = m.end()
+                        continue
+                    c = lexdata[lexpos]
 
-        while lexpos < lexlen:
-            # This code provides some short-circuit code for whitespace, tabs, and other ignored characters
-            if lexdata[lexpos] in lexignore:
-                lexpos += 1
-                continue
+                # Look for a regular expression match among the rules that can
+                # start with the character at lexpos
+                for lexre, lexindexfunc in dispatch.get(c, lexother):
+                    m = lexre.match(lexdata, lexpos)
+                    if not m:
+                        continue
+                    end = m.end()
+                    if lexend >= 0 and self.horizon(lexpos) == lexend and lexstream.grow(self):
+                        # The token may go on past the end of the window of a stream,
+                        # or a rule before it may have failed there, so match it
+                        # again with more of the input
+                        lexdata = self.lexdata
+                        lexlen  = self.lexlen
+                        lexend  = len(lexdata) if not lexstream.eof else -1
+                        break
 
-            # Look for a regular expression match
-            for lexre, lexindexfunc in self.lexre:
-                m = lexre.match(lexdata, lexpos)
-                if not m:
-                    continue
+                    # Create a token for return
+                    tok = tokclass()
+                    tok.value = value = m.group()
+                    tok.lineno = self.lineno
+                    tok.lexpos = lexpos + lexbase
+
+                    func, toktype = lexindexfunc[m.lastindex]
+                    if toktype == kwtype:
+                        toktype = keywords.get(value, kwtype)
+                    tok.type = toktype
+
+                    if not func:
+                        # If no token type was set, it's an ignored token
+                        if toktype:
+                            self.lexpos = end + lexbase
+                            return tok
+                        else:
+                            lexpos = end
+                            break
+
+                    lexpos = end
+
+                    # If token is processed by a function, call it
+
+                    tok.lexer = self      # Set additional attributes useful in token rules
+                    self.lexmatch = m
+                    self.lexpos = lexpos + lexbase
+                    newtok = func(tok)
+                    del tok.lexer
+                    del self.lexmatch
+
+                    # Every function must return a token, if nothing, we just move to next token
+                    if not newtok:
+                        lexpos    = self.lexpos - lexbase   # This is here in case user has updated lexpos.
+                        skipchars = self.lexskipchars       # This is here in case there was a state change
+                        lexskip   = self.lexskip
+                        lexignore = self.lexignore
+                        dispatch  = self.lexdispatch
+                        lexother  = self.lexother
+                        break
+                    return newtok
+                else:
+                    # No match, see if in literals
+                    if lexdata[lexpos] in self.lexliterals:
+                        tok = tokclass()
+                        tok.value = lexdata[lexpos:lexpos + 1]
+                        tok.lineno = self.lineno
+                        tok.type = tok.value
+                        tok.lexpos = lexpos + lexbase
+                        self.lexpos = lexpos + lexbase + 1
+                        return tok
 
-                # Create a token for return
-                tok = LexToken()
-                tok.value = m.group()
-                tok.lineno = self.lineno
-                tok.lexpos = lexpos
+                    # A rule may match a token that goes on past the end of the
+                    # window of a stream
+                    if lexend >= 0 and self.horizon(lexpos) == lexend and lexstream.grow(self):
+                        lexdata = self.lexdata
+                        lexlen  = self.lexlen
+                        lexend  = len(lexdata) if not lexstream.eof else -1
+                        continue
 
-                i = m.lastindex
-                func, tok.type = lexindexfunc[i]
+                    # No match. Call t_error() if defined.
+                    if self.lexerrorf:
+                        tok = self.errclass(lexdata, lexpos)
+                        tok.lineno = self.lineno
+                        tok.type = 'error'
+                        tok.lexer = self
+                        tok.lexpos = lexpos + lexbase
+                        self.lexpos = lexpos + lexbase
+                        newtok = self.lexerrorf(tok)
+                        if lexpos + lexbase == self.lexpos:
+                            # Error method didn't change text position at all. This is an error.
+                            raise LexError(f"Scanning error. Illegal character {_char(lexdata, lexpos)!r}",
+                                           lexdata[lexpos:])
+                        lexpos = self.lexpos - lexbase
+                        if not newtok:
+                            if lexstream is not None:
+                                # skip_illegal() may have read more of a stream
+                                lexdata = self.lexdata
+                                lexlen  = self.lexlen
+                                lexend  = len(lexdata) if not lexstream.eof else -1
+                            continue
+                        return newtok
+
+                    self.lexpos = lexpos + lexbase
+                    raise LexError(f"Illegal character {_char(lexdata, lexpos)!r} at index {lexpos + lexbase}",
+                                   lexdata[lexpos:])
+
+            # Read more of a stream.  The first window picks the spec for the
+            # type of the input (see use_spec_for()).
+            if lexstream is None or not lexstream.fill(self, lexpos):
+                break
+            lexbase   = self.lexbase
+            lexpos    = self.lexpos - lexbase
+            lexlen    = self.lexlen
+            lexdata   = self.lexdata
+            lexend    = len(lexdata) if not lexstream.eof else -1
+            skipchars = self.lexskipchars
+            lexskip   = self.lexskip
+            lexignore = self.lexignore
+            dispatch  = self.lexdispatch
+            lexother  = self.lexother
+            tokclass  = self.tokclass
+            keywords  = self.spec.lexkeywords
+            kwtype    = self.spec.lexkeywordtype
 
-                if not func:
-                    # If no token type was set, it's an ignored token
-                    if tok.type:
-                        self.lexpos = m.end()
-                        return tok
-                    else:
+        if self.lexeoff:
+            tok = tokclass()
+            tok.type = 'eof'
+            tok.value = ''
+            tok.lineno = self.lineno
+            tok.lexpos = lexpos + lexbase
+            tok.lexer = self
+            self.lexpos = lexpos + lexbase
+            newtok = self.lexeoff(tok)
+            return newtok
+
+        self.lexpos = lexpos + lexbase + 1
+        if self.lexdata is None:
+            raise RuntimeError('No input string given with input()')
+        return None
+
+    # ------------------------------------------------------------
+    # tokenize_all() - Lex all of data and return the tokens as a
+    # TokenArrays object.
+    # ------------------------------------------------------------
+    def tokenize_all(self, data):
+        self.input(data)
+        result = TokenArrays(data, self.spec.lextypenames, self.spec.lexencoding)
+        result.mark(0, self)
+        result.lineno = self.lineno
+        self.scan(result, 0, self.lexlen)
+        if self.spec.lexlineindex:
+            result.linenos = self.lexlines.linenos(result.starts)
+        return result
+
+    # ------------------------------------------------------------
+    # scan() - Lex the tokens of the input (held in memory) that
+    # start at lexpos or later and before stop, adding them to the
+    # TokenArrays result.  Returns True if it got to the end of the
+    # input, and otherwise leaves self.lexpos where it stopped.
+    #
+    # Tokens of string rules go straight into the arrays without a
+    # LexToken.  Rule functions get a LexToken as usual.  Anything
+    # that no rule matches (literals, errors) is left to unmatched()
+    # and the eof rule to token().  The places where the lexer may
+    # have looked past the end of a token (each character skipped by
+    # the error rule, backtracking in the DFA, and a token where
+    # another rule could have started as well, which horizon() says
+    # how far to) are noted in result.lookahead for relex().
+    # ------------------------------------------------------------
+    def scan(self, result, lexpos, stop):
+        data      = self.lexdata
+        typecodes = result.typecodes
+        types     = result.types.append
+        starts    = result.starts.append
+        ends      = result.ends.append
+        linenos   = result.linenos.append
+        lexlen    = self.lexlen
+        skipchars = self.lexskipchars
+        lexskip   = self.lexskip
+        lexignore = self.lexignore
+        keywords  = self.spec.lexkeywords
+        kwtype    = self.spec.lexkeywordtype
+        state     = self.lexstate
+        stack     = list(self.lexstatestack)
+        trackline = not self.spec.lexlineindex   # Note where rules change lineno
+        shared, othershared = self.lexshared
+
+        while True:
+            while lexpos < stop:
+                c = data[lexpos]
+                if c in skipchars:
+                    if c in lexignore:
+                        lexpos += 1
+                        if lexpos >= lexlen or data[lexpos] not in skipchars:
+                            continue
+                    m = lexskip(data, lexpos)
+                    if m:
                         lexpos = m.end()
+                        continue
+                    c = data[lexpos]
+
+                dispatch = self.lexdispatch
+                for lexre, lexindexfunc in dispatch.get(c, self.lexother):
+                    m = lexre.match(data, lexpos)
+                    if not m:
+                        continue
+
+                    # Where more than one rule can start, one that failed
+                    # may have looked past the token
+                    if c in shared or (othershared and c not in dispatch):
+                        horizon = self.horizon(lexpos)
+                        if horizon > m.end():
+                            result.lookahead.append((lexpos, self.lexstate, horizon))
+
+                    func, toktype = lexindexfunc[m.lastindex]
+                    if toktype == kwtype:
+                        toktype = keywords.get(m.group(), kwtype)
+                    if not func:
+                        end = m.end()
+                        if toktype:
+                            types(typecodes[toktype])
+                            starts(lexpos)
+                            ends(end)
+                            linenos(self.lineno)
+                        lexpos = end
                         break
 
-                lexpos = m.end()
+                    tok = self.tokclass()
+                    tok.value = m.group()
+                    tok.lineno = self.lineno
+                    tok.lexpos = lexpos
+                    tok.type = toktype
+                    tok.lexer = self
+                    self.lexmatch = m
+                    self.lexpos = m.end()
+                    newtok = func(tok)
+                    del tok.lexer
+                    del self.lexmatch
+                    lexpos = self.lexpos
+                    skipchars = self.lexskipchars
+                    lexskip = self.lexskip
+                    lexignore = self.lexignore
+                    shared, othershared = self.lexshared
+                    if newtok:
+                        result.append(newtok, lexpos)
+                        if trackline and self.lineno != newtok.lineno:
+                            result.endlines[len(result.types) - 1] = self.lineno
+                    if self.lexstate != state or self.lexstatestack != stack:
+                        state, stack = result.mark(len(result.types) + (not newtok), self)
+                    break
+                else:
+                    error = data[lexpos] not in self.lexliterals
+                    errstate = self.lexstate
+                    tok = self.unmatched(lexpos)
+                    if error:
+                        result.lookahead.extend((p, errstate, None) for p in range(lexpos, self.lexpos))
+                    lexpos = self.lexpos
+                    skipchars = self.lexskipchars
+                    lexskip = self.lexskip
+                    lexignore = self.lexignore
+                    shared, othershared = self.lexshared
+                    if tok:
+                        result.append(tok, lexpos)
+                        if trackline and self.lineno != tok.lineno:
+                            result.endlines[len(result.types) - 1] = self.lineno
+                    if self.lexstate != state or self.lexstatestack != stack:
+                        state, stack = result.mark(len(result.types) + (not tok), self)
 
-                # If token is processed by a function, call it
+            self.lexpos = lexpos
+            if lexpos < lexlen:
+                return False
+            tok = self.token()
+            if not tok:
+                break
+            lexpos = self.lexpos
+            skipchars = self.lexskipchars
+            lexskip = self.lexskip
+            lexignore = self.lexignore
+            shared, othershared = self.lexshared
+            result.append(tok, lexpos)
+            if trackline and self.lineno != tok.lineno:
+                result.endlines[len(result.types) - 1] = self.lineno
+            if self.lexstate != state or self.lexstatestack != stack:
+                state, stack = result.mark(len(result.types), self)
+
+        return True
 
-                tok.lexer = self      # Set additional attributes useful in token rules
-                self.lexmatch = m
-                self.lexpos = lexpos
-                newtok = func(tok)
-                del tok.lexer
-                del self.lexmatch
+    # ------------------------------------------------------------
+    # unmatched() - Handle the character at lexpos, where no rule
+    # matches, as token() does: return it as a literal or call the
+    # error rule.  Leaves self.lexpos after it.  Only for input that
+    # is held in memory.
+    # ------------------------------------------------------------
+    def unmatched(self, lexpos):
+        lexdata = self.lexdata
+        if lexdata[lexpos] in self.lexliterals:
+            tok = self.tokclass()
+            tok.value = lexdata[lexpos:lexpos + 1]
+            tok.lineno = self.lineno
+            tok.type = tok.value
+            tok.lexpos = lexpos
+            self.lexpos = lexpos + 1
+            return tok
 
-                # Every function must return a token, if nothing, we just move to next token
-                if not newtok:
-                    lexpos    = self.lexpos         # This is here in case user has updated lexpos.
-                    lexignore = self.lexignore      # This is here in case there was a state change
+        if self.lexerrorf:
+            tok = self.errclass(lexdata, lexpos)
+            tok.lineno = self.lineno
+            tok.type = 'error'
+            tok.lexer = self
+            tok.lexpos = lexpos
+            self.lexpos = lexpos
+            newtok = self.lexerrorf(tok)
+            if lexpos == self.lexpos:
+                # Error method didn't change text position at all. This is an error.
+                raise LexError(f"Scanning error. Illegal character {_char(lexdata, lexpos)!r}",
+                               lexdata[lexpos:])
+            return newtok
+
+        self.lexpos = lexpos
+        raise LexError(f"Illegal character {_char(lexdata, lexpos)!r} at index {lexpos}",
+                       lexdata[lexpos:])
+
+    # ------------------------------------------------------------
+    # relex() - Return the tokens of the text of tokens (a TokenArrays
+    # from tokenize_all() or relex()) after an edit that replaces
+    # the deleted characters at offset with inserted.
+    #
+    # Lexing starts again one token before the first token that the
+    # edit touches, in the state recorded there.  It stops as soon as
+    # the lexer gets past the edit to a point where it went on in
+    # the old tokens, in the same state.  The old tokens from there
+    # on are kept with their positions and line numbers shifted.
+    # The range changed of the result holds the numbers of the
+    # tokens that were lexed again.
+    #
+    # Where no rule matched, the regexes may have looked at any of
+    # the text that follows (an unterminated string, say).  Those
+    # places are checked again, and lexing starts before the first
+    # one where a rule now matches.  Lexing also starts before any
+    # token that the DFA found by backtracking from the edit, and
+    # before any token where a rule that failed (a block comment
+    # that didn't end, before the '/' was taken) may have looked as
+    # far as the edit.  Otherwise a token is taken to depend on no
+    # more than one character past its end.
+    #
+    # Only lexstate, lexstatestack and lineno are restored.  Rules
+    # that keep other things on the lexer, or the regex of a rule
+    # that no other rule starts like (or a skip regex) that looks
+    # further ahead than its match, may need more of the input
+    # lexed again than this does.
+    # ------------------------------------------------------------
+    def relex(self, tokens, offset, deleted, inserted):
+        data = tokens.data
+        if not isinstance(data, (str, bytes)):
+            data = bytes(data)
+        newdata = data[:offset] + inserted + data[offset + deleted:]
+        delta = len(inserted) - deleted
+        editend = offset + len(inserted)
+        starts = tokens.starts
+        ends = tokens.ends
+        linenos = tokens.linenos
+        n = len(tokens)
+        self.input(newdata)
+
+        # Find the point to start from
+        k = max(bisect_left(ends, offset) - 1, 0)
+        start = ends[k - 1] if k else 0
+        for pos, state, horizon in tokens.lookahead:
+            if pos >= start:
+                break
+            if horizon is None:
+                affected = any(lexre.match(newdata, pos) for lexre, _ in self.spec.lexstatere[state])
+            else:
+                affected = horizon >= offset
+            if affected:
+                k = bisect_right(ends, pos)
+                start = ends[k - 1] if k else 0
+                break
+
+        # Restore the lexer to it
+        state, stack = tokens.state(k)
+        self.begin(state)
+        self.lexstatestack = list(stack)
+        self.lineno = tokens.endline(k - 1) if k else tokens.lineno
+
+        result = TokenArrays(newdata, tokens.typenames, tokens.encoding or self.spec.lexencoding)
+        result.lineno = tokens.lineno
+        result.types = tokens.types[:k]
+        result.starts = starts[:k]
+        result.ends = ends[:k]
+        result.linenos = linenos[:k]
+        result.values = { i: v for i, v in tokens.values.items() if i < k }
+        result.endlines = { i: v for i, v in tokens.endlines.items() if i < k }
+        marks = bisect_right(tokens.markindex, k)
+        result.markindex = tokens.markindex[:marks]
+        result.markstate = tokens.markstate[:marks]
+        result.lookahead = [item for item in tokens.lookahead if item[0] < start]
+
+        # Lex up to the end of the edit, and then a token at a time until
+        # the lexer is back in step with the old tokens
+        m = n
+        done = self.scan(result, start, editend)
+        while not done:
+            if len(result.types) > k:
+                end = result.ends[-1]
+                i = bisect_left(ends, end - delta)
+                if (end == self.lexpos and i < n and ends[i] == end - delta
+                    and tokens.state(i + 1) == (self.lexstate, tuple(self.lexstatestack))):
+                    m = i + 1
                     break
-                return newtok
+            done = self.scan(result, self.lexpos, self.lexpos + 1)
+        changed = len(result.types)
+        result.changed = range(k, changed)
+        if self.spec.lexlineindex:
+            result.linenos[k:] = self.lines.linenos(result.starts[k:])
+
+        # Shift the rest of the old tokens
+        if m < n:
+            if self.spec.lexlineindex:
+                linedelta = (_count_newlines(inserted, 0, len(inserted))
+                             - _count_newlines(data, offset, offset + deleted))
+            else:
+                linedelta = self.lineno - tokens.endline(m - 1)
+            result.extend(tokens, m, delta, linedelta)
+        return result
+
+    # ------------------------------------------------------------
+    # tokenize_parallel() - Lex all of data (a str or bytes) as
+    # tokenize_all() does, in a pool of worker processes.
+    #
+    # The input is cut into pieces (workers * 4 by default) after a
+    # newline that doesn't look like it's inside a string: one with
+    # an even number of each of the quote characters between it and
+    # the cut before.  The workers are forked, so they share data and
+    # the spec with this process, and each lexes its piece of data
+    # starting in the INITIAL state on line 1.  The pieces are then
+    # joined up in order with their line numbers shifted.
+    #
+    # Where a piece doesn't join up with the one before (a token ran
+    # over the cut, or the lexer wasn't in the INITIAL state there)
+    # the tokens of the piece are used from the first point where the
+    # lexer went on at the same position and in the same state as
+    # the lexer that lexed the piece before.  If there is no such
+    # point, this process lexes the piece again.  Either way the
+    # result is the same as that of tokenize_all().
+    #
+    # That only holds if the rules don't keep state of their own,
+    # such as a brace counter in t.lexer.level, since each worker
+    # starts its piece with the attributes that this lexer had at the
+    # start.  So if the lexer has attributes that a new lexer doesn't
+    # have (before or after a worker lexes its piece), or a worker
+    # sees the rules set an attribute of the object or module that
+    # the rule functions belong to, the pieces are dropped and all of
+    # data is lexed with tokenize_all() instead.  A module attribute
+    # that ends up back at its old value, or an object changed in
+    # place (appending to a list, say), isn't seen.
+    #
+    # Output of the rule functions in the workers may come out in any
+    # order, and changes they make to the lexer or the module stay
+    # in the workers.  Where processes can't be forked, or there is
+    # only one piece, this is the same as tokenize_all().
+    # ------------------------------------------------------------
+    def tokenize_parallel(self, data, workers=None, chunks=None, quotes='"'):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        global _parallel_job
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if chunks is None:
+            chunks = workers * 4
+        if (not isinstance(data, (str, bytes)) or workers < 2 or
+            'fork' not in multiprocessing.get_all_start_methods()):
+            return self.tokenize_all(data)
+        cuts = _split_points(data, chunks, quotes)
+        if len(cuts) < 3 or any(key[0] == 'lexer' for key in _rule_state(self)):
+            return self.tokenize_all(data)
+
+        self.input(data)
+        spec = self.spec
+        lexpos = 0
+        snapshot = (self.lexstate, tuple(self.lexstatestack))
+        lineno = self.lineno
+        _parallel_job = (self, data, snapshot, lineno)
+        try:
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                pieces = list(pool.map(_tokenize_piece, cuts[:-1], cuts[1:]))
+        finally:
+            _parallel_job = None
+        if any(stateful for *_, stateful in pieces):
+            return self.tokenize_all(data)
+
+        result = TokenArrays(data, spec.lextypenames, spec.lexencoding)
+        result.mark(0, self)
+        result.lineno = lineno
+        for start, stop, (tokens, endpos, endstate, endlineno, _) in zip(cuts, cuts[1:], pieces):
+            if lexpos == start and tokens.state(0) == snapshot:
+                first = 0
+                linedelta = lineno - tokens.lineno
             else:
+                first = bisect_left(tokens.ends, lexpos) + 1
+                if (first > len(tokens) or tokens.ends[first - 1] != lexpos or
+                    tokens.state(first) != snapshot):
+                    first = None
+                elif first < len(tokens):
+                    linedelta = lineno - tokens.endline(first - 1)
+                elif endpos == lexpos:
+                    continue
+                else:
+                    first = None
+
+            if first is None:
+                # Lex this piece here
+                self.begin(snapshot[0])
+                self.lexstatestack = list(snapshot[1])
+                self.lineno = lineno
+                self.scan(result, lexpos, stop)
+                lexpos = self.lexpos
+                snapshot = (self.lexstate, tuple(self.lexstatestack))
+                lineno = self.lineno
+                continue
+
+            result.extend(tokens, first, 0, linedelta)
+            lexpos = endpos
+            snapshot = endstate
+            lineno = endlineno + linedelta
+
+        self.begin(snapshot[0])
+        self.lexstatestack = list(snapshot[1])
+        self.lineno = lineno
+        self.lexpos = lexpos
+        if spec.lexlineindex:
+            result.linenos = self.lexlines.linenos(result.starts)
+        return result
+
+    # Iterator interface
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        t = self.token()
+        if t is None:
+            raise StopIteration
+        return t
+
+# -----------------------------------------------------------------------------
+# _split_points()
+#
+# Return the positions at which Lexer.tokenize_parallel() cuts data into
+# about count pieces, starting with 0 and ending with len(data).  Each cut is
+# just after a newline, with an even number of each of the characters in
+# quotes (not counting those after a backslash) since the cut before.
+# -----------------------------------------------------------------------------
+
+def _split_points(data, count, quotes):
+    if isinstance(data, str):
+        newline, backslash = '\n', '\\'
+    else:
+        newline, backslash = b'\n', b'\\'
+        quotes = [bytes([q]) for q in quotes.encode('latin-1')]
+    size = len(data)
+    points = [0]
+    for i in range(1, count):
+        start = points[-1]
+        pos = data.find(newline, max(size * i // count, start))
+        odd = set()
+        while pos >= 0:
+            for q in quotes:
+                if (data.count(q, start, pos) - data.count(backslash + q, start, pos)) % 2:
+                    odd ^= {q}
+            if not odd:
+                break
+            start = pos
+            pos = data.find(newline, pos + 1)
+        if pos < 0 or pos + 1 >= size:
+            break
+        points.append(pos + 1)
+    points.append(size)
+    return points
+
+# The lexer, input, starting state and line number of the workers of
+# Lexer.tokenize_parallel(), which they get by being forked
+_parallel_job = None
+
+# Lex the piece of the input from start to stop in a worker.  Returns the
+# tokens, the position, state and line number that the lexer ended at, and
+# whether the rules could have kept state of their own (see _rule_state()).
+def _tokenize_piece(start, stop):
+    parent, data, snapshot, lineno = _parallel_job
+    lexer = parent.clone()
+    lexer.input(data)
+    if start == 0:
+        lexer.begin(snapshot[0])
+        lexer.lexstatestack = list(snapshot[1])
+        lexer.lineno = lineno
+    else:
+        lexer.begin('INITIAL')
+        lexer.lexstatestack = []
+        lexer.lineno = 1
+    spec = lexer.spec
+    tokens = TokenArrays(data, spec.lextypenames, spec.lexencoding)
+    tokens.mark(0, lexer)
+    tokens.lineno = lexer.lineno
+    before = _rule_state(lexer)
+    lexer.scan(tokens, start, stop)
+    after = _rule_state(lexer)
+    stateful = (any(key[0] == 'lexer' for key in after) or after.keys() != before.keys() or
+                any(after[key] is not value for key, value in before.items()))
+    tokens.data = None
+    return tokens, lexer.lexpos, (lexer.lexstate, tuple(lexer.lexstatestack)), lexer.lineno, stateful
+
+# Return the attributes that the rules of lexer could keep state of their own
+# in: those of the lexer that a new lexer doesn't have (keyed by ('lexer',
+# name)), and those of the objects (or the module globals) that the rule
+# functions belong to
+def _rule_state(lexer):
+    spec = lexer.spec
+    standard = vars(spec.lexer())
+    state = { ('lexer', name): value for name, value in vars(lexer).items() if name not in standard }
+    funcs = [func for ritem in spec.lexstatere.values() for _, findex in ritem
+                  for func, _ in filter(None, findex) if func]
+    funcs += [func for func in spec.lexstateerrorf.values() if func]
+    funcs += [func for func in spec.lexstateeoff.values() if func]
+    seen = set()
+    for func in funcs:
+        owner = getattr(func, '__self__', None)
+        namespace = getattr(owner, '__dict__', None) if owner is not None else getattr(func, '__globals__', None)
+        if namespace is None or id(namespace) in seen:
+            continue
+        seen.add(id(namespace))
+        state.update(((id(namespace), name), value) for name, value in namespace.items())
+    return state
+
+# -----------------------------------------------------------------------------
+#                         === Streaming Input ===
+#
+# A LexerStream feeds a lexer the text of a file or of an iterator of chunks
+# without reading all of it into memory.  lexdata then holds a window of the
+# input that starts at the position lexbase.  Whenever token() gets to lexlen,
+# the stream drops the part of the window before the lexer, appends chunks
+# until the window holds at least 2 * maxtoken characters, and sets lexlen to
+# maxtoken characters before the end of the window (or to the end, once the
+# input is used up).  A token may start anywhere before lexlen and run on past
+# it, so tokens of up to maxtoken characters are matched whole however the
+# input was split into chunks.
+#
+# That alone isn't enough for longer matches.  A token may run on to the end
+# of the window, and a rule may fail there that would have matched with more
+# of the input: a block comment that the window cuts off, say, after which a
+# rule of lower priority matches the '/' it starts with.  So before a match
+# (or no match) at lexpos is taken, Lexer.horizon() runs a DFA made from all of
+# the rules of the state to find how far any of them could have looked, and
+# if that is the end of the window, the stream reads more of the input onto
+# the end of it (at least doubling it) and the lexer matches again.  The DFA
+# errs on the side of looking further than re does (see _form_reach()), so a
+# token is only taken once nothing past the end of the window could change
+# it, and the tokens are the ones token() makes for the whole input.  The
+# cost is a walk of that DFA for each token while the input isn't used up,
+# and that a rule which may go on over any text (a greedy '.*' with DOTALL, or
+# a backreference) makes the stream read up to where it would end, the end of
+# the input at worst.  Rule functions that look at lexdata themselves
+# only see the window.
+#
+# The lexpos of the tokens and the lexpos of the lexer are positions in the
+# whole input, as usual.  A rule function that looks at lexdata directly has
+# to subtract lexbase from them.  find_lineno(), find_column(), lineindex=True
+# and tokenize_all() need all of the input in memory.  A clone of the lexer
+# reads from the same stream.
+# -----------------------------------------------------------------------------
+
+def _read_chunks(source, chunksize):
+    while True:
+        chunk = source.read(chunksize)
+        if not chunk:
+            return
+        yield chunk
+
+class LexerStream:
+    def __init__(self, source, chunksize=65536, maxtoken=65536):
+        if hasattr(source, 'read'):
+            self.chunks = _read_chunks(source, chunksize)
+        else:
+            self.chunks = iter(source)
+        self.maxtoken = maxtoken      # Longest token that is always matched whole
+        self.eof = False              # Set once the source is used up
+
+    # ------------------------------------------------------------
+    # fill() - Move the window of lexer up to lexpos (an index into
+    # lexdata) and read more of the input.  Returns False at the
+    # end of the input.
+    # ------------------------------------------------------------
+    def fill(self, lexer, lexpos):
+        if self.eof:
+            return False
+        data = self.read(lexer.lexdata[lexpos:], 2 * self.maxtoken)
+        if data:
+            lexer.use_spec_for(data)
+
+        lexer.lexbase += lexpos
+        lexer.lexdata = data
+        lexer.lexlen = len(data) if self.eof else len(data) - self.maxtoken
+        lexer.lexpos = lexer.lexbase
+        return True
+
+    # ------------------------------------------------------------
+    # grow() - Read more of the input onto the end of the window of
+    # lexer (at least doubling it) for a match that ran on to the
+    # end of the window.  Returns False at the end of the input.
+    # ------------------------------------------------------------
+    def grow(self, lexer):
+        if self.eof:
+            return False
+        data = self.read(lexer.lexdata, 2 * len(lexer.lexdata))
+        lexer.lexdata = data
+        lexer.lexlen = len(data) if self.eof else len(data) - self.maxtoken
+        return True
+
+    # Append chunks to data until it holds at least size characters
+    def read(self, data, size):
+        parts = [data] if data else []
+        length = len(data)
+        while length < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.eof = True
+                break
+            parts.append(chunk)
+            length += len(chunk)
+        return parts[0][:0].join(parts) if parts else data
+
+# -----------------------------------------------------------------------------
+#                           === Line Index ===
+#
+# A LineIndex holds the positions of the newlines of an input and gives the
+# line number and column of any position with a binary search.  The newlines
+# are found in one pass with str.find() the first time that a position is
+# looked up.
+#
+# Normally the line number of a token is the lineno of the lexer when the
+# token is made, which the rules have to keep up to date (with a t_newline
+# function, for example).  With lex(lineindex=True), the lexer makes a
+# LineIndex for each input instead, and the lineno and column of its tokens
+# are looked up in the index when they are first read.  Nothing is done for
+# line numbers while lexing, so newlines can simply be ignored
+# (t_ignore_newline = r'\n+').  In this mode setting the lineno of a token
+# has no effect.
+# -----------------------------------------------------------------------------
+
+class LineIndex:
+    def __init__(self, data, tokenbase=LexToken, errorbase=ErrorToken):
+        self.data = data
+        self.newlines = None          # Positions of the newlines (array)
+
+        lines = self
+        def lineclass(base):
+            class LineToken(base):
+                lineno = property(lambda tok: lines.lineno(tok.lexpos), lambda tok, value: None)
+                column = property(lambda tok: lines.column(tok.lexpos))
+            return LineToken
+        self.tokenclass = lineclass(tokenbase)   # Class of tokens that look up their lineno here
+        self.errorclass = lineclass(errorbase)   # The same for the tokens passed to t_error()
+
+    def find_newlines(self):
+        data = self.data
+        newlines = array('i' if len(data) < 2**31 else 'q')
+        if isinstance(data, memoryview):
+            newlines.extend(m.start() for m in re.finditer(b'\n', data))
+        else:
+            nl = '\n' if isinstance(data, str) else b'\n'
+            find = data.find
+            pos = find(nl, 0)
+            while pos >= 0:
+                newlines.append(pos)
+                pos = find(nl, pos + 1)
+        self.newlines = newlines
+        return newlines
+
+    def lineno(self, pos):
+        newlines = self.newlines
+        if newlines is None:
+            newlines = self.find_newlines()
+        return bisect_left(newlines, pos) + 1
+
+    def column(self, pos):
+        newlines = self.newlines
+        if newlines is None:
+            newlines = self.find_newlines()
+        n = bisect_left(newlines, pos)
+        return pos - newlines[n-1] if n else pos + 1
+
+    # Return an array of the line numbers of a sequence of positions
+    def linenos(self, positions):
+        newlines = self.newlines
+        if newlines is None:
+            newlines = self.find_newlines()
+        return array('i', [bisect_left(newlines, pos) + 1 for pos in positions])
+
+# -----------------------------------------------------------------------------
+#                           === Token Arrays ===
+#
+# Lexer.tokenize_all() returns the tokens of a whole input as a TokenArrays
+# object: four parallel arrays of integers instead of a LexToken per token.
+#
+#    types            -  Type code of each token (an index into typenames)
+#    starts           -  Position of each token (lexpos)
+#    ends             -  Position after each token, where the lexer went on
+#    linenos          -  Line number of each token
+#
+# The type codes of the tokens and literals of a spec are the same for every
+# input (see LexerSpec.lextypenames).  A type that a rule function makes up
+# gets the next free code in the one TokenArrays.
+#
+# The value of a token is only made when it's asked for, as data[start:end]
+# (decoded with encoding if data isn't a string).  The few values that are
+# something else (such as the numbers made by a t_NUMBER function) are kept
+# in the dictionary values.  Indexing and iteration give LexTokens, made one
+# at a time.
+#
+# The arrays also record the lexer state (lexstate and lexstatestack) at the
+# point after each token where the lexer went on, which is where
+# Lexer.relex() can start lexing again.  Since the state seldom changes, only
+# the changes are kept: state(n) is the state after token n-1 (or at the
+# start, for n = 0).
+# -----------------------------------------------------------------------------
+
+class TokenArrays:
+    def __init__(self, data, typenames, encoding='utf-8'):
+        self.data = data
+        self.encoding = None if isinstance(data, str) else encoding
+        self.typenames = list(typenames)
+        self.typecodes = { name: code for code, name in enumerate(self.typenames) }
+        offsets = 'i' if len(data) < 2**31 else 'q'
+        self.types = array('i')
+        self.starts = array(offsets)
+        self.ends = array(offsets)
+        self.linenos = array('i')
+        self.values = {}
+        self.endlines = {}            # Line number after token n, where a rule
+                                      # function changed it
+        self.lineno = 1               # Line number at the start of the input
+        self.markindex = [0]          # Token numbers where the state changes
+        self.markstate = [('INITIAL', ())]  # (lexstate, lexstatestack) from each of those on
+        self.lookahead = []           # (position, lexstate, horizon) of matches that
+                                      # looked ahead to horizon (None if unknown)
+        self.changed = None           # Range of the tokens that relex() lexed again
+
+    # Add a token, ending at end
+    def append(self, tok, end):
+        code = self.typecodes.get(tok.type)
+        if code is None:
+            code = self.typecodes[tok.type] = len(self.typenames)
+            self.typenames.append(tok.type)
+        text = self.data[tok.lexpos:end]
+        if self.encoding:
+            text = str(text, self.encoding, 'replace')
+        if tok.value != text:
+            self.values[len(self.types)] = tok.value
+        self.types.append(code)
+        self.starts.append(tok.lexpos)
+        self.ends.append(end)
+        self.linenos.append(tok.lineno)
+
+    def __len__(self):
+        return len(self.types)
+
+    # ------------------------------------------------------------
+    # extend() - Add the tokens of another TokenArrays from token
+    # number first on, with their positions shifted by delta and
+    # their line numbers by linedelta.  The lexer is taken to have
+    # been in the same state after token first-1 of both.
+    # ------------------------------------------------------------
+    def extend(self, tokens, first, delta=0, linedelta=0):
+        shift = len(self.types) - first
+        names = tokens.typenames
+        if self.typenames[:len(names)] == names:
+            self.types.extend(tokens.types[first:])
+        else:
+            for name in names:
+                if name not in self.typecodes:
+                    self.typecodes[name] = len(self.typenames)
+                    self.typenames.append(name)
+            codes = [self.typecodes[name] for name in names]
+            self.types.extend(codes[t] for t in tokens.types[first:])
+        if delta:
+            self.starts.extend(pos + delta for pos in tokens.starts[first:])
+            self.ends.extend(pos + delta for pos in tokens.ends[first:])
+        else:
+            self.starts.extend(tokens.starts[first:])
+            self.ends.extend(tokens.ends[first:])
+        if linedelta:
+            self.linenos.extend(line + linedelta for line in tokens.linenos[first:])
+        else:
+            self.linenos.extend(tokens.linenos[first:])
+        self.values.update((i + shift, v) for i, v in tokens.values.items() if i >= first)
+        self.endlines.update((i + shift, line + linedelta) for i, line in tokens.endlines.items() if i >= first)
+        for i, snapshot in zip(tokens.markindex, tokens.markstate):
+            if i > first:
+                self.markindex.append(i + shift)
+                self.markstate.append(snapshot)
+        begin = tokens.ends[first - 1] if first else 0
+        self.lookahead.extend((pos + delta, state, horizon if horizon is None else horizon + delta)
+                              for pos, state, horizon in tokens.lookahead if pos >= begin)
+
+    # Record the state of lexer as the state after token n-1 and return
+    # (lexstate, a copy of lexstatestack)
+    def mark(self, n, lexer):
+        snapshot = (lexer.lexstate, tuple(lexer.lexstatestack))
+        if self.markindex and self.markindex[-1] == n:
+            self.markstate[-1] = snapshot
+        else:
+            self.markindex.append(n)
+            self.markstate.append(snapshot)
+        return lexer.lexstate, list(lexer.lexstatestack)
+
+    def state(self, n):
+        return self.markstate[bisect_right(self.markindex, n) - 1]
+
+    # The line number of the lexer after token n
+    def endline(self, n):
+        return self.endlines.get(n, self.linenos[n])
+
+    def type(self, n):
+        return self.typenames[self.types[n]]
+
+    def value(self, n):
+        if n in self.values:
+            return self.values[n]
+        text = self.data[self.starts[n]:self.ends[n]]
+        if self.encoding:
+            text = str(text, self.encoding, 'replace')
+        return text
+
+    def __getitem__(self, n):
+        if n < 0:
+            n += len(self.types)
+        tok = LexToken()
+        tok.type = self.typenames[self.types[n]]
+        tok.value = self.value(n)
+        tok.lineno = self.linenos[n]
+        tok.lexpos = self.starts[n]
+        return tok
+
+    def __iter__(self):
+        for n in range(len(self.types)):
+            yield self[n]
+
+    # ------------------------------------------------------------
+    # reader() - Return an object with a token() method that
+    # returns the tokens one at a time, which can be passed to
+    # LRParser.parse() as the lexer
+    # ------------------------------------------------------------
+    def reader(self):
+        return TokenReader(self)
+
+    # ------------------------------------------------------------
+    # numpy() - Return the four arrays as NumPy arrays.  The NumPy
+    # arrays share memory with the arrays of this object.  Needs
+    # NumPy.
+    # ------------------------------------------------------------
+    def numpy(self):
+        import numpy
+        return tuple(numpy.frombuffer(a, dtype='i%d' % a.itemsize)
+                     for a in (self.types, self.starts, self.ends, self.linenos))
+
+class TokenReader:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.lineno = 1
+        self.lexpos = 0
+        self.next = 0
+
+    def input(self, data):
+        pass
+
+    def token(self):
+        if self.next >= len(self.tokens):
+            return None
+        tok = self.tokens[self.next]
+        self.next += 1
+        self.lineno = tok.lineno
+        self.lexpos = self.tokens.ends[self.next - 1]
+        return tok
+
+# -----------------------------------------------------------------------------
+#                        === DFA Scanning Engine ===
+#
+# With lex(engine='dfa'), the rules of each state are also compiled into one
+# deterministic finite automaton, and the lexer finds the next token with a
+# single pass of the DFA over the input instead of with the master regexes.
+# The DFA finds the longest match of all of the rules.  When several rules
+# match the same text, the first one wins, in the same order as in the master
+# regexes (functions in the order they are defined, then strings by decreasing
+# regex length).  This is how lex and flex work, but not how the re engine
+# works, where the first rule that matches wins even if a later rule would
+# match more text.  With the re engine "iffy" lexes as t_IF followed by "fy",
+# and with the DFA engine it lexes as one t_NAME.
+#
+# Rules that a DFA can't handle (backreferences, lookaround, anchors, lazy or
+# possessive repeats, case-insensitive or locale matching) are matched with
+# re at each position instead, and the longest of all of the matches wins.
+#
+# A rule function sees the same lexer.lexmatch as with the re engine, except
+# that the match object is made only when the function asks for it, and that
+# it holds just the groups of that one rule.
+#
+# The DFA takes the same time per character however many rules there are,
+# while the master regex tries the rules that can start with a character one
+# after the other.  With a few rules for each first character (as in Snailz)
+# the re engine is faster.  With many rules that start alike, such as a rule
+# for each command of a language, the DFA engine is faster: about 1.5 times
+# with 100 rules that start with the same prefix and 8 times with 300 (see
+# example/bench_dfa.py).
+# -----------------------------------------------------------------------------
+
+class DFALexer(Lexer):
+    def __init__(self, spec=None):
+        self.lexmatchargs = None      # (regex, start, end) of the rule being run
+        Lexer.__init__(self, spec)
+
+    def __getattr__(self, name):
+        if name == 'lexmatch':
+            args = self.__dict__.get('lexmatchargs')
+            if args:
+                cre, start, end = args
+                return cre.fullmatch(self.lexdata, start, end)
+        raise AttributeError(f'{type(self).__name__!r} object has no attribute {name!r}')
+
+    def begin(self, state):
+        Lexer.begin(self, state)
+        self.lexdfa = self.spec.lexstatedfa[state]
+
+    # ------------------------------------------------------------
+    # token() - Return the next token from the Lexer
+    #
+    # The inner loop runs the DFA until no transition is possible.
+    # It doesn't check for accepting rows on the way.  If the row
+    # where it stops doesn't accept, LexerDFA.backtrack() goes
+    # back to the last one that did.  A KeyError means that the
+    # row has no entry yet for a (non-ASCII) character.  Tokens
+    # may run on past lexlen, which is short of the end of lexdata
+    # when reading a stream.  A token where the DFA runs on to the
+    # end of lexdata is matched again with more of the stream, and
+    # so is one where a rule that isn't in the DFA may have looked
+    # that far (see horizon()).
+    # ------------------------------------------------------------
+    def token(self):
+        lexbase   = self.lexbase
+        lexpos    = self.lexpos - lexbase
+        lexlen    = self.lexlen
+        skipchars = self.lexskipchars
+        lexskip   = self.lexskip
+        lexignore = self.lexignore
+        lexdata   = self.lexdata
+        lexend    = len(lexdata) if lexdata is not None else 0
+        lexstream = self.lexstream
+        streamend = lexend if lexstream is not None and not lexstream.eof else -1
+        tokclass  = self.tokclass
+        keywords  = self.spec.lexkeywords
+        kwtype    = self.spec.lexkeywordtype
+
+        while True:
+            while lexpos < lexlen:
+                if lexdata[lexpos] in skipchars:
+                    if lexdata[lexpos] in lexignore:
+                        lexpos += 1
+                        if lexpos >= lexlen or lexdata[lexpos] not in skipchars:
+                            continue
+                    m = lexskip(lexdata, lexpos)
+                    if m:
+                        if streamend >= 0 and self.horizon(lexpos) == streamend and lexstream.grow(self):
+                            # The run may go on past the end of the window of a stream
+                            lexdata   = self.lexdata
+                            lexlen    = self.lexlen
+                            lexend    = len(lexdata)
+                            streamend = lexend if not lexstream.eof else -1
+                            continue
+                        lexpos = m.end()
+                        continue
+
+                dfa = self.lexdfa
+                row = dfa.start
+                pos = lexpos
+                while True:
+                    try:
+                        while pos < lexend:
+                            nextrow = row[lexdata[pos]]
+                            if not nextrow:
+                                break
+                            row = nextrow
+                            pos += 1
+                        break
+                    except KeyError:
+                        # A character that the row hasn't seen yet
+                        nextrow = dfa.extend(row, lexdata[pos])
+                        if not nextrow:
+                            break
+                        row = nextrow
+                        pos += 1
+
+                reached = pos
+                rule = row.get('')
+                if rule is None and pos > lexpos:
+                    rule, pos = dfa.backtrack(lexdata, lexpos, pos)
+
+                # Rules that aren't in the DFA
+                if dfa.fallback:
+                    for priority, cre in dfa.fallback:
+                        m = cre.match(lexdata, lexpos)
+                        if m:
+                            end = m.end()
+                            if rule is None or end > pos or (end == pos and priority < rule):
+                                rule = priority
+                                pos = end
+
+                # A token that goes on past the end of the window of a stream is
+                # matched again with more of the input, and so is one where a
+                # rule that isn't in the DFA may have failed at the end
+                if ((reached == streamend or pos == streamend
+                     or (streamend >= 0 and dfa.fallback and self.horizon(lexpos) == streamend))
+                        and lexstream.grow(self)):
+                    lexdata   = self.lexdata
+                    lexlen    = self.lexlen
+                    lexend    = len(lexdata)
+                    streamend = lexend if not lexstream.eof else -1
+                    continue
+
+                if rule is not None:
+                    func, toktype = dfa.rules[rule]
+                    if toktype == kwtype:
+                        toktype = keywords.get(lexdata[lexpos:pos], kwtype)
+                    if not func:
+                        # If no token type was set, it's an ignored token
+                        if toktype:
+                            tok = tokclass()
+                            tok.value = lexdata[lexpos:pos]
+                            tok.lineno = self.lineno
+                            tok.lexpos = lexpos + lexbase
+                            tok.type = toktype
+                            self.lexpos = pos + lexbase
+                            return tok
+                        lexpos = pos
+                        continue
+
+                    # If token is processed by a function, call it
+                    tok = tokclass()
+                    tok.value = lexdata[lexpos:pos]
+                    tok.lineno = self.lineno
+                    tok.lexpos = lexpos + lexbase
+                    tok.type = toktype
+                    tok.lexer = self
+                    self.lexmatchargs = (dfa.matchre[rule], lexpos, pos)
+                    self.lexpos = pos + lexbase
+                    newtok = func(tok)
+                    del tok.lexer
+                    self.lexmatchargs = None
+
+                    # Every function must return a token, if nothing, we just move to next token
+                    if not newtok:
+                        lexpos    = self.lexpos - lexbase   # This is here in case user has updated lexpos.
+                        skipchars = self.lexskipchars       # This is here in case there was a state change
+                        lexskip   = self.lexskip
+                        lexignore = self.lexignore
+                        continue
+                    return newtok
+
                 # No match, see if in literals
                 if lexdata[lexpos] in self.lexliterals:
-                    tok = LexToken()
-                    tok.value = lexdata[lexpos]
+                    tok = tokclass()
+                    tok.value = lexdata[lexpos:lexpos + 1]
                     tok.lineno = self.lineno
                     tok.type = tok.value
-                    tok.lexpos = lexpos
-                    self.lexpos = lexpos + 1
+                    tok.lexpos = lexpos + lexbase
+                    self.lexpos = lexpos + lexbase + 1
                     return tok
 
+                # A rule that isn't in the DFA may match a token that goes on
+                # past the end of the window of a stream
+                if streamend >= 0 and dfa.fallback and self.horizon(lexpos) == streamend and lexstream.grow(self):
+                    lexdata   = self.lexdata
+                    lexlen    = self.lexlen
+                    lexend    = len(lexdata)
+                    streamend = lexend if not lexstream.eof else -1
+                    continue
+
                 # No match. Call t_error() if defined.
                 if self.lexerrorf:
-                    tok = LexToken()
-                    tok.value = self.lexdata[lexpos:]
+                    tok = self.errclass(lexdata, lexpos)
                     tok.lineno = self.lineno
                     tok.type = 'error'
                     tok.lexer = self
-                    tok.lexpos = lexpos
-                    self.lexpos = lexpos
+                    tok.lexpos = lexpos + lexbase
+                    self.lexpos = lexpos + lexbase
                     newtok = self.lexerrorf(tok)
-                    if lexpos == self.lexpos:
+                    if lexpos + lexbase == self.lexpos:
                         # Error method didn't change text position at all. This is an error.
-                        raise LexError(f"Scanning error. Illegal character {lexdata[lexpos]!r}",
+                        raise LexError(f"Scanning error. Illegal character {_char(lexdata, lexpos)!r}",
                                        lexdata[lexpos:])
-                    lexpos = self.lexpos
+                    lexpos = self.lexpos - lexbase
                     if not newtok:
+                        if lexstream is not None:
+                            # skip_illegal() may have read more of a stream
+                            lexdata   = self.lexdata
+                            lexlen    = self.lexlen
+                            lexend    = len(lexdata)
+                            streamend = lexend if not lexstream.eof else -1
                         continue
                     return newtok
 
-                self.lexpos = lexpos
-                raise LexError(f"Illegal character {lexdata[lexpos]!r} at index {lexpos}",
+                self.lexpos = lexpos + lexbase
+                raise LexError(f"Illegal character {_char(lexdata, lexpos)!r} at index {lexpos + lexbase}",
                                lexdata[lexpos:])
 
+            # Read more of a stream
+            if lexstream is None or not lexstream.fill(self, lexpos):
+                break
+            lexbase   = self.lexbase
+            lexpos    = self.lexpos - lexbase
+            lexlen    = self.lexlen
+            lexdata   = self.lexdata
+            lexend    = len(lexdata)
+            streamend = lexend if not lexstream.eof else -1
+            skipchars = self.lexskipchars
+            lexskip   = self.lexskip
+            lexignore = self.lexignore
+            tokclass  = self.tokclass
+            keywords  = self.spec.lexkeywords
+            kwtype    = self.spec.lexkeywordtype
+
         if self.lexeoff:
-            tok = LexToken()
+            tok = tokclass()
             tok.type = 'eof'
             tok.value = ''
             tok.lineno = self.lineno
-            tok.lexpos = lexpos
+            tok.lexpos = lexpos + lexbase
             tok.lexer = self
-            self.lexpos = lexpos
+            self.lexpos = lexpos + lexbase
             newtok = self.lexeoff(tok)
             return newtok
 
-        self.lexpos = lexpos + 1
+        self.lexpos = lexpos + lexbase + 1
         if self.lexdata is None:
             raise RuntimeError('No input string given with input()')
         return None
 
-    # Iterator interface
-    def __iter__(self):
-        return self
+    # ------------------------------------------------------------
+    # scan() - The same as Lexer.scan(), with the DFA in place of
+    # the master regexes
+    # ------------------------------------------------------------
+    def scan(self, result, lexpos, stop):
+        data      = self.lexdata
+        typecodes = result.typecodes
+        types     = result.types.append
+        starts    = result.starts.append
+        ends      = result.ends.append
+        linenos   = result.linenos.append
+        lexlen    = self.lexlen
+        skipchars = self.lexskipchars
+        lexskip   = self.lexskip
+        lexignore = self.lexignore
+        keywords  = self.spec.lexkeywords
+        kwtype    = self.spec.lexkeywordtype
+        state     = self.lexstate
+        stack     = list(self.lexstatestack)
+        trackline = not self.spec.lexlineindex   # Note where rules change lineno
+
+        while True:
+            while lexpos < stop:
+                if data[lexpos] in skipchars:
+                    if data[lexpos] in lexignore:
+                        lexpos += 1
+                        if lexpos >= lexlen or data[lexpos] not in skipchars:
+                            continue
+                    m = lexskip(data, lexpos)
+                    if m:
+                        lexpos = m.end()
+                        continue
 
-    def __next__(self):
-        t = self.token()
-        if t is None:
-            raise StopIteration
-        return t
+                dfa = self.lexdfa
+                row = dfa.start
+                pos = lexpos
+                while True:
+                    try:
+                        while pos < lexlen:
+                            nextrow = row[data[pos]]
+                            if not nextrow:
+                                break
+                            row = nextrow
+                            pos += 1
+                        break
+                    except KeyError:
+                        nextrow = dfa.extend(row, data[pos])
+                        if not nextrow:
+                            break
+                        row = nextrow
+                        pos += 1
+
+                rule = row.get('')
+                if rule is None and pos > lexpos:
+                    result.lookahead.append((lexpos, self.lexstate, pos))
+                    rule, pos = dfa.backtrack(data, lexpos, pos)
+
+                if dfa.fallback:
+                    for priority, cre in dfa.fallback:
+                        m = cre.match(data, lexpos)
+                        if m:
+                            end = m.end()
+                            if rule is None or end > pos or (end == pos and priority < rule):
+                                rule = priority
+                                pos = end
+
+                    # The rules matched with re may have looked past the token
+                    if rule is not None:
+                        horizon = self.horizon(lexpos)
+                        if horizon > pos:
+                            result.lookahead.append((lexpos, self.lexstate, horizon))
+
+                if rule is None:
+                    error = data[lexpos] not in self.lexliterals
+                    errstate = self.lexstate
+                    tok = self.unmatched(lexpos)
+                    if error:
+                        result.lookahead.extend((p, errstate, None) for p in range(lexpos, self.lexpos))
+                    lexpos = self.lexpos
+                    skipchars = self.lexskipchars
+                    lexskip = self.lexskip
+                    lexignore = self.lexignore
+                    if tok:
+                        result.append(tok, lexpos)
+                        if trackline and self.lineno != tok.lineno:
+                            result.endlines[len(result.types) - 1] = self.lineno
+                    if self.lexstate != state or self.lexstatestack != stack:
+                        state, stack = result.mark(len(result.types) + (not tok), self)
+                    continue
+
+                func, toktype = dfa.rules[rule]
+                if toktype == kwtype:
+                    toktype = keywords.get(data[lexpos:pos], kwtype)
+                if not func:
+                    if toktype:
+                        types(typecodes[toktype])
+                        starts(lexpos)
+                        ends(pos)
+                        linenos(self.lineno)
+                    lexpos = pos
+                    continue
+
+                tok = self.tokclass()
+                tok.value = data[lexpos:pos]
+                tok.lineno = self.lineno
+                tok.lexpos = lexpos
+                tok.type = toktype
+                tok.lexer = self
+                self.lexmatchargs = (dfa.matchre[rule], lexpos, pos)
+                self.lexpos = pos
+                newtok = func(tok)
+                del tok.lexer
+                self.lexmatchargs = None
+                lexpos = self.lexpos
+                skipchars = self.lexskipchars
+                lexskip = self.lexskip
+                lexignore = self.lexignore
+                if newtok:
+                    result.append(newtok, lexpos)
+                    if trackline and self.lineno != newtok.lineno:
+                        result.endlines[len(result.types) - 1] = self.lineno
+                if self.lexstate != state or self.lexstatestack != stack:
+                    state, stack = result.mark(len(result.types) + (not newtok), self)
+
+            self.lexpos = lexpos
+            if lexpos < lexlen:
+                return False
+            tok = self.token()
+            if not tok:
+                break
+            lexpos = self.lexpos
+            skipchars = self.lexskipchars
+            lexskip = self.lexskip
+            lexignore = self.lexignore
+            result.append(tok, lexpos)
+            if trackline and self.lineno != tok.lineno:
+                result.endlines[len(result.types) - 1] = self.lineno
+            if self.lexstate != state or self.lexstatestack != stack:
+                state, stack = result.mark(len(result.types), self)
+
+        return True
+
+# -----------------------------------------------------------------------------
+# LexerDFA
+#
+# The DFA of one lexer state.  Each row of the DFA is a dictionary mapping
+# characters to the next row, or to 0 if there is no transition.  The row of
+# a set of NFA states that includes the final state of a rule maps '' to the
+# number (priority) of the first such rule.  The transitions on all of the
+# ASCII characters are made when the DFA is built.  Transitions on other
+# characters are made and added to the rows the first time the lexer meets
+# them, which keeps Unicode classes such as \w from blowing up the table.
+# Adding to the rows is the only change ever made to a DFA, and it's done
+# under a lock so that lexers in several threads can share it.
+# -----------------------------------------------------------------------------
+
+class LexerDFA:
+    def __init__(self, nfa, rules, matchre, fallback, bytes=False):
+        self.nfa = nfa                # The _NFA the DFA is built from
+        self.rules = rules            # (func, tokname) of each rule, by priority
+        self.matchre = matchre        # Compiled regex of each rule, for lexmatch
+        self.fallback = fallback      # (priority, regex) of the rules not in the DFA
+        self.bytes = bytes            # Rows are indexed by byte values, not characters
+        self.rows = []                # All of the rows
+        self.rowsets = {}             # id(row) -> frozenset of NFA states
+        self.setrows = {}             # frozenset of NFA states -> row
+        self.lock = threading.Lock()
+        self.start = self._row(nfa.closure((0,)))
+
+    # Return the row of a set of NFA states, making it if needed.  A new
+    # row gets all of its ASCII transitions (all 256 for bytes), which can
+    # make more rows.
+    def _row(self, nfaset):
+        row = self.setrows.get(nfaset)
+        if row is not None:
+            return row
+        row = self._new_row(nfaset)
+        pending = [row]
+        while pending:
+            row = pending.pop()
+            targets = {}
+            for s in self.rowsets[id(row)]:
+                for pred, mask, t in self.nfa.edges[s]:
+                    while mask:
+                        low = mask & -mask
+                        targets.setdefault(low.bit_length() - 1, set()).add(t)
+                        mask ^= low
+                    if self.bytes:
+                        for c in range(128, 256):
+                            if pred(chr(c)):
+                                targets.setdefault(c, set()).add(t)
+            for c in range(256 if self.bytes else 128):
+                key = c if self.bytes else chr(c)
+                tset = targets.get(c)
+                if not tset:
+                    row[key] = 0
+                    continue
+                tset = self.nfa.closure(tset)
+                nextrow = self.setrows.get(tset)
+                if nextrow is None:
+                    nextrow = self._new_row(tset)
+                    pending.append(nextrow)
+                row[key] = nextrow
+        return self.setrows[nfaset]
+
+    def _new_row(self, nfaset):
+        row = {}
+        accepts = [self.nfa.final[s] for s in nfaset if s in self.nfa.final]
+        if accepts:
+            row[''] = min(accepts)
+        self.rows.append(row)
+        self.rowsets[id(row)] = nfaset
+        self.setrows[nfaset] = row
+        return row
+
+    # Add the transition of row on the non-ASCII character c.  Returns the
+    # next row, or 0 if there is none.
+    def extend(self, row, c):
+        with self.lock:
+            nextrow = row.get(c)
+            if nextrow is None:
+                targets = set()
+                for s in self.rowsets[id(row)]:
+                    for pred, mask, t in self.nfa.edges[s]:
+                        if pred(c):
+                            targets.add(t)
+                nextrow = self._row(self.nfa.closure(targets)) if targets else 0
+                row[c] = nextrow
+            return nextrow
+
+    # Run the DFA over data[start:stop] again and return the rule and the
+    # end of the longest match along the way (rule is None if none).
+    def backtrack(self, data, start, stop):
+        row = self.start
+        rule = None
+        end = start
+        for pos in range(start, stop):
+            row = row[data[pos]]
+            if '' in row:
+                rule = row['']
+                end = pos + 1
+        return rule, end
+
+    # Return a copy of the DFA with the rule functions bound to object.  The
+    # copy shares the rows.
+    def bind(self, object):
+        dfa = copy.copy(self)
+        dfa.rules = [(getattr(object, f.__name__), t) if f else (f, t) for f, t in self.rules]
+        return dfa
+
+    # Return a DFA for the same rules that scans bytes.  The regexes are
+    # encoded with encoding and compiled as bytes patterns, and a byte is
+    # matched as the character with the same code (so \w, \d and \s only
+    # match ASCII, as in bytes patterns).
+    def encode(self, encoding):
+        nfa = _NFA()
+        matchre = []
+        fallback = []
+        for priority, cre in enumerate(self.matchre):
+            cre = re.compile(cre.pattern.encode(encoding), cre.flags & ~re.UNICODE)
+            matchre.append(cre)
+            if not _nfa_rule(nfa, cre, priority):
+                fallback.append((priority, cre))
+        return LexerDFA(nfa, self.rules, matchre, fallback, bytes=True)
 
 # -----------------------------------------------------------------------------
 #                           ==== Lex Builder ===
@@ -369,6 +2215,10 @@ def _form_master_re(relist, reflags, ldict, toknames):
                     lexindexfunc[i] = (None, None)
                 else:
                     lexindexfunc[i] = (None, toknames[f])
+            elif f in toknames:
+                # The end of one of the operators (see _form_operator_res())
+                lexindexnames[i] = f
+                lexindexfunc[i] = (None, toknames[f])
 
         return [(lexre, lexindexfunc)], [regex], [lexindexnames]
     except Exception:
@@ -403,6 +2253,678 @@ def _statetoken(s, names):
     return (states, tokenname)
 
 
+# -----------------------------------------------------------------------------
+# _NFA
+#
+# A nondeterministic finite automaton built from the regexes of the rules of
+# one state (Thompson's construction) on the way to a LexerDFA.  State 0 is
+# the start state.  Each edge is a tuple (pred, mask, target) where pred(c) is
+# true for the characters c of the edge and mask has bit n set if pred(chr(n))
+# is true, for the ASCII characters.
+# -----------------------------------------------------------------------------
+
+class _NFA:
+    def __init__(self, loose=False):
+        self.edges = []               # Character edges of each state
+        self.eps = []                 # Empty edges of each state
+        self.final = {}               # Final states -> rule priority (loose: True if the
+                                      # rule is followed exactly)
+        self.loose = loose            # Go on at least as far as re would (see _form_reach())
+        self.fold = False             # Match both cases (loose only)
+        self.approx = 0               # Number of nodes not followed exactly (loose only)
+        self.state()
+
+    def state(self):
+        self.edges.append([])
+        self.eps.append([])
+        return len(self.edges) - 1
+
+    def edge(self, start, pred):
+        if self.fold:
+            base = pred
+            pred = lambda c: base(c) or base(c.lower()) or base(c.upper())
+        end = self.state()
+        mask = 0
+        for n in range(128):
+            if pred(chr(n)):
+                mask |= 1 << n
+        self.edges[start].append((pred, mask, end))
+        return end
+
+    # Forget all of the states from n on
+    def truncate(self, n):
+        del self.edges[n:]
+        del self.eps[n:]
+
+    # Return the frozenset of states reachable from states by empty edges
+    def closure(self, states):
+        result = set(states)
+        stack = list(states)
+        while stack:
+            for t in self.eps[stack.pop()]:
+                if t not in result:
+                    result.add(t)
+                    stack.append(t)
+        return frozenset(result)
+
+# Raised for a regex that can't be put in a DFA
+class _NoDFA(Exception):
+    pass
+
+# Predicates for the character categories (\d, \s, \w and their opposites)
+_unicode_categories = {
+    sre_parse.CATEGORY_DIGIT: str.isdecimal,
+    sre_parse.CATEGORY_SPACE: str.isspace,
+    sre_parse.CATEGORY_WORD: lambda c: c.isalnum() or c == '_',
+}
+
+_ascii_categories = {
+    sre_parse.CATEGORY_DIGIT: lambda c: '0' <= c <= '9',
+    sre_parse.CATEGORY_SPACE: lambda c: c in ' \t\n\r\f\v',
+    sre_parse.CATEGORY_WORD: lambda c: c < '\x80' and (c.isalnum() or c == '_'),
+}
+
+_negated_categories = {
+    sre_parse.CATEGORY_NOT_DIGIT: sre_parse.CATEGORY_DIGIT,
+    sre_parse.CATEGORY_NOT_SPACE: sre_parse.CATEGORY_SPACE,
+    sre_parse.CATEGORY_NOT_WORD: sre_parse.CATEGORY_WORD,
+}
+
+def _category(cat, flags):
+    categories = _ascii_categories if flags & re.ASCII else _unicode_categories
+    if cat in categories:
+        return categories[cat]
+    if cat in _negated_categories:
+        pred = categories[_negated_categories[cat]]
+        return lambda c: not pred(c)
+    raise _NoDFA(f'category {cat}')
+
+# Return a predicate for the items of a character class [...]
+def _charset(items, flags):
+    negate = False
+    chars = set()
+    ranges = []
+    preds = []
+    for op, av in items:
+        if op == sre_parse.NEGATE:
+            negate = True
+        elif op == sre_parse.LITERAL:
+            chars.add(chr(av))
+        elif op == sre_parse.RANGE:
+            ranges.append((chr(av[0]), chr(av[1])))
+        elif op == sre_parse.CATEGORY:
+            preds.append(_category(av, flags))
+        else:
+            raise _NoDFA(f'{op} in a character class')
+
+    def pred(c):
+        return ((c in chars or any(lo <= c <= hi for lo, hi in ranges)
+                 or any(p(c) for p in preds)) != negate)
+    return pred
+
+# Add the NFA states for a parsed regex (a list of nodes) after state start
+# and return the state where it ends.  In a loose NFA, a node that a DFA
+# can't follow matches anything from there on.  The empty edges of a state
+# are in the order that re tries them in.
+def _nfa_pattern(nfa, pattern, start, flags):
+    for op, av in pattern:
+        try:
+            start = _nfa_node(nfa, op, av, start, flags)
+        except _NoDFA:
+            if not nfa.loose:
+                raise
+            nfa.approx += 1
+            loop = nfa.state()
+            nfa.eps[start].append(loop)
+            nfa.eps[nfa.edge(loop, lambda ch: True)].append(loop)
+            return loop
+    return start
+
+# Python 3.11 has possessive repeats, which a loose NFA takes as greedy ones
+_possessive_repeat = getattr(sre_parse, 'POSSESSIVE_REPEAT', None)
+
+def _nfa_node(nfa, op, av, start, flags):
+    if op == sre_parse.LITERAL:
+        c = chr(av)
+        return nfa.edge(start, lambda ch: ch == c)
+    if op == sre_parse.NOT_LITERAL:
+        c = chr(av)
+        return nfa.edge(start, lambda ch: ch != c)
+    if op == sre_parse.ANY:
+        if flags & re.DOTALL:
+            return nfa.edge(start, lambda ch: True)
+        return nfa.edge(start, lambda ch: ch != '\n')
+    if op == sre_parse.IN:
+        return nfa.edge(start, _charset(av, flags))
+    if op == sre_parse.BRANCH:
+        end = nfa.state()
+        for alt in av[1]:
+            s = nfa.state()
+            nfa.eps[start].append(s)
+            nfa.eps[_nfa_pattern(nfa, alt, s, flags)].append(end)
+        return end
+    if op == sre_parse.SUBPATTERN:
+        group, add_flags, del_flags, p = av
+        if nfa.loose and (add_flags or del_flags):
+            # Case folding is left on to the end of the rule
+            if add_flags & (re.IGNORECASE | re.LOCALE):
+                nfa.approx += 1
+                nfa.fold = True
+            return _nfa_pattern(nfa, p, start, (flags | add_flags) & ~del_flags)
+        if add_flags or del_flags:
+            raise _NoDFA('inline flags')
+        return _nfa_pattern(nfa, p, start, flags)
+    if nfa.loose:
+        if op == sre_parse.AT:
+            nfa.approx += 1
+            return start
+        if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            # A lookahead goes on over the text it looks at, a lookbehind
+            # looks back at text that is already matched
+            nfa.approx += 1
+            direction, p = av
+            if direction > 0:
+                side = nfa.state()
+                nfa.eps[start].append(side)
+                _nfa_pattern(nfa, p, side, flags)
+            return start
+        if op == _possessive_repeat:
+            nfa.approx += 1
+            op = sre_parse.MAX_REPEAT
+    if op == sre_parse.MAX_REPEAT or (nfa.loose and op == sre_parse.MIN_REPEAT):
+        lo, hi, item = av
+        if lo > 100 or (hi != sre_parse.MAXREPEAT and hi > 100):
+            raise _NoDFA('repeat count too large')
+        for _ in range(lo):
+            start = _nfa_pattern(nfa, item, start, flags)
+        # Each time round, a greedy repeat tries the item before what comes
+        # after it, and a lazy one (MIN_REPEAT) the other way round
+        lazy = op == sre_parse.MIN_REPEAT
+        end = nfa.state()
+        if hi == sre_parse.MAXREPEAT:
+            loop = nfa.state()
+            body = nfa.state()
+            nfa.eps[start].append(loop)
+            nfa.eps[loop].extend((end, body) if lazy else (body, end))
+            nfa.eps[_nfa_pattern(nfa, item, body, flags)].append(loop)
+            return end
+        for _ in range(hi - lo):
+            body = nfa.state()
+            nfa.eps[start].extend((end, body) if lazy else (body, end))
+            start = _nfa_pattern(nfa, item, body, flags)
+        nfa.eps[start].append(end)
+        return end
+    raise _NoDFA(str(op))
+
+# -----------------------------------------------------------------------------
+# _form_dfa()
+#
+# Build the LexerDFA of a state from its rules, a list of (name, regex) in
+# order of priority.  Returns the DFA and the names of the rules that are
+# matched with re instead.
+# -----------------------------------------------------------------------------
+def _form_dfa(rules, reflags, ldict, toknames):
+    nfa = _NFA()
+    entries = []
+    matchre = []
+    fallback = []
+    fallback_names = []
+    for priority, (name, regex) in enumerate(rules):
+        handle = ldict.get(name, None)
+        if type(handle) in (types.FunctionType, types.MethodType):
+            entries.append((handle, toknames[name]))
+        elif name.find('ignore_') > 0:
+            entries.append((None, None))
+        else:
+            entries.append((None, toknames[name]))
+        cre = re.compile('(?P<%s>%s)' % (name, regex), reflags)
+        matchre.append(cre)
+        if not _nfa_rule(nfa, cre, priority):
+            fallback.append((priority, cre))
+            fallback_names.append(name)
+
+    return LexerDFA(nfa, entries, matchre, fallback), fallback_names
+
+# Add the NFA states of the compiled regex of a rule, accepting with the
+# given priority.  Returns False (adding nothing) if the DFA can't handle it.
+def _nfa_rule(nfa, cre, priority):
+    nstates = len(nfa.edges)
+    try:
+        pattern = sre_parse.parse(cre.pattern, cre.flags)
+        flags = pattern.state.flags
+        if flags & (re.IGNORECASE | re.LOCALE):
+            raise _NoDFA('flags')
+        if isinstance(cre.pattern, bytes):
+            flags |= re.ASCII
+        start = nfa.state()
+        nfa.final[_nfa_pattern(nfa, pattern, start, flags)] = priority
+        nfa.eps[0].append(start)
+        return True
+    except _NoDFA:
+        nfa.truncate(nstates)
+        return False
+
+# -----------------------------------------------------------------------------
+# _form_reach()
+#
+# Build the _ReachDFA that Lexer.horizon() runs to find how far the rules of a
+# state may look at the input.  It follows the regexes that the lexer matches
+# at a position all at once: the skip regex and the master regexes (which re
+# tries in turn, as one alternation), and with the dfa engine also each of the
+# rules that aren't in the DFA (see DFALexer.token()).  The NFA is a loose one:
+# anchors and lookbehinds match the empty string, a lookahead goes on over the
+# text it looks at as well, rules with IGNORECASE match both cases, possessive
+# repeats are taken as greedy ones, and anything else that a DFA can't follow
+# (a backreference, say) matches any text from there on.  So wherever re may
+# look at a character, the DFA gets there too.
+# -----------------------------------------------------------------------------
+def _form_reach(spec, state):
+    regexes = [cre for cre, _ in spec.lexstatere[state]]
+    if state in spec.lexstateskip:
+        regexes.insert(0, spec.lexstateskip[state][1])
+    calls = [regexes]
+    if state in spec.lexstatedfa:
+        calls += [[cre] for _, cre in spec.lexstatedfa[state].fallback]
+
+    nfa = _NFA(loose=True)
+    starts = []
+    group = []
+    for n, regexes in enumerate(calls):
+        for cre in regexes:
+            pattern = sre_parse.parse(cre.pattern, cre.flags)
+            flags = pattern.state.flags
+            if isinstance(cre.pattern, bytes):
+                flags |= re.ASCII
+            # Each rule of a master regex gets its own final state
+            if len(pattern) == 1 and pattern[0][0] == sre_parse.BRANCH:
+                alts = pattern[0][1][1]
+            else:
+                alts = [pattern]
+            for alt in alts:
+                approx = nfa.approx
+                if flags & (re.IGNORECASE | re.LOCALE):
+                    nfa.approx += 1
+                    nfa.fold = True
+                start = nfa.state()
+                end = _nfa_pattern(nfa, alt, start, flags)
+                nfa.fold = False
+                nfa.final[end] = nfa.approx == approx
+                starts.append(start)
+        group += [n] * (len(nfa.edges) - len(group))
+    return _ReachDFA(nfa, starts, group, bytes=spec.lexstrspec is not None)
+
+# -----------------------------------------------------------------------------
+# _ReachDFA
+#
+# A DFA made as it is needed from a loose _NFA (see _form_reach()), in which
+# a row is the list of the NFA states that re may be in, in the order it tries
+# them (as in a Pike VM).  Once a match of a rule that the NFA follows exactly
+# ends, re takes it, so the states after it that are there for the same call
+# of match() are dropped.  The NFA states of each call are numbered by group.
+# A row maps a character to the next row, or to 0 where re stops looking, and
+# '' to its NFA states.
+# -----------------------------------------------------------------------------
+class _ReachDFA:
+    def __init__(self, nfa, starts, group, bytes=False):
+        self.nfa = nfa                # The loose _NFA
+        self.group = group            # The match() call of each NFA state
+        self.bytes = bytes            # Rows are indexed by byte values, not characters
+        self.rows = {}                # tuple of NFA states -> row
+        self.lock = threading.Lock()
+        self.start = self._row(starts)
+
+    # Return the row for the NFA states reached by the empty edges from
+    # states (in order)
+    def _row(self, states):
+        nfa = self.nfa
+        result = []
+        seen = set()
+        cut = set()
+        stack = list(reversed(states))
+        while stack:
+            s = stack.pop()
+            if s in seen or self.group[s] in cut:
+                continue
+            seen.add(s)
+            result.append(s)
+            if nfa.final.get(s):
+                cut.add(self.group[s])
+            stack.extend(reversed(nfa.eps[s]))
+        key = tuple(s for s in result if nfa.edges[s])
+        if not key:
+            return 0
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = { '': key }
+        return row
+
+    # Add the transition of row on the character c.  Returns the next row,
+    # or 0 if there is none.
+    def extend(self, row, c):
+        with self.lock:
+            nextrow = row.get(c)
+            if nextrow is None:
+                ch = chr(c) if self.bytes else c
+                targets = [t for s in row['']
+                             for pred, mask, t in self.nfa.edges[s] if pred(ch)]
+                nextrow = row[c] = self._row(targets)
+            return nextrow
+
+# -----------------------------------------------------------------------------
+# _form_operator_res()
+#
+# Build the regexes that match the longest of the operators (fixed strings) at
+# a position, given a dictionary mapping each operator to a group name.  There
+# is one regex for each character that operators start with, so that the
+# first character dispatch only takes the one for the character at lexpos.
+# The operators are put in a trie and the regex follows it: the branch for
+# the next character is tried (before the end of a shorter operator), and
+# then the one for the character after that, and so on.  Each operator ends
+# with an empty group of its name, which is the last group matched
+# (m.lastindex), so the lexer gets the token type of the operator from
+# lexindexfunc without looking at the text.  For example = == and > give
+# (with the group names shortened)
+#
+#    =(?:=(?P<op1>)|(?P<op0>))
+#    >(?P<op2>)
+#
+# The regexes go into the master regex without a group around them.
+# -----------------------------------------------------------------------------
+def _form_operator_res(names):
+    trie = {}
+    for text, name in names.items():
+        node = trie
+        for c in text:
+            node = node.setdefault(c, {})
+        node[''] = name
+
+    # Return the branches of the regex for the operators that go on from node
+    def form(node):
+        branches = []
+        for c, child in sorted(node.items()):
+            if c:
+                branches.append(re.escape(c) + tail(child))
+        return branches
+
+    def tail(node):
+        branches = form(node)
+        if '' in node:
+            branches.append('(?P<%s>)' % node[''])
+        return branches[0] if len(branches) == 1 else '(?:%s)' % '|'.join(branches)
+
+    return form(trie)
+
+# The part of a master regex for a rule
+def _master_part(name, regex):
+    if name == 'operators':
+        return '(?:%s)' % regex
+    return '(?P<%s>%s)' % (name, regex)
+
+# -----------------------------------------------------------------------------
+# _place_operators()
+#
+# Put the operators of a state in among its string rules (given as (name,
+# regex) pairs, in order), where they would go if each were a string rule with
+# the regex re.escape(text): by decreasing regex length, after the string
+# rules of the same length.  Each run of operators that ends up together
+# becomes the regexes of _form_operator_res() for them, as rules named
+# 'operators'.  names maps each operator to its group name.  Returns the
+# rules, and a dictionary mapping each operator regex to the operators (and
+# group names) that it matches.
+# -----------------------------------------------------------------------------
+def _place_operators(strsym, names):
+    order = [(len(rule[1]), 0, i, rule) for i, rule in enumerate(strsym)]
+    order += [(len(re.escape(text)), 1, i, text) for i, text in enumerate(names)]
+    order.sort(key=lambda item: (-item[0], item[1], item[2]))
+
+    rules = []
+    opgroups = {}
+    run = []
+    for _, kind, _, item in order + [(0, 0, 0, None)]:
+        if kind:
+            run.append(item)
+            continue
+        for c in sorted({ text[0] for text in run }):
+            group = { text: names[text] for text in run if text[0] == c }
+            regex, = _form_operator_res(group)
+            rules.append(('operators', regex))
+            opgroups[regex] = group
+        run = []
+        if item:
+            rules.append(item)
+    return rules, opgroups
+
+# The rules for a DFA, with a rule for each of the operators in place of the
+# operators rules (the DFA is a trie of them anyway)
+def _dfa_rules(rules, opgroups):
+    dfa_rules = []
+    for name, regex in rules:
+        if name == 'operators':
+            dfa_rules.extend((opname, re.escape(text)) for text, opname in opgroups[regex].items())
+        else:
+            dfa_rules.append((name, regex))
+    return dfa_rules
+
+# -----------------------------------------------------------------------------
+# _keyword_type()
+#
+# Find the token type that is looked up in the keywords: that of the first
+# rule (in order of priority, with the INITIAL state first) whose regex
+# matches the whole of every keyword.  This is the identifier rule.  Returns
+# None if no rule matches them all.
+# -----------------------------------------------------------------------------
+def _keyword_type(rules, keywords, reflags, toknames):
+    for state in rules:
+        for name, regex in rules[state]:
+            if name.find('ignore_') > 0 or name == 'operators':
+                continue
+            try:
+                cre = re.compile(regex, reflags)
+            except re.error:
+                continue
+            if all(cre.fullmatch(word) for word in keywords):
+                return toknames[name]
+    return None
+
+# -----------------------------------------------------------------------------
+# _form_skip_re()
+#
+# Build the regex that skips a run of ignored input in a state: the ignored
+# characters and the matches of t_ignore_ rules, in any order.  Returns
+# (chars, regex) where chars holds the characters that a run can start with,
+# or None if nothing is ignored in the state.
+#
+# A t_ignore_ rule only goes into the regex if it can't clash with any other
+# rule.  It has to be a sequence of single characters (each of which may be
+# repeated) that starts with one from a small set, and no other rule may be
+# able to start with one of those.  Wherever the rule matches, the lexer would
+# then take the same match (for either engine) and skip it.  The other
+# t_ignore_ rules are left to the master regex as before.
+# -----------------------------------------------------------------------------
+
+_space_chars = '\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004' \
+               '\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000'
+
+def _form_skip_re(ignore, rules, reflags, ldict):
+    alts = []
+    chars = ignore
+    if ignore:
+        alts.append('[%s]' % ''.join(re.escape(c) for c in ignore))
+
+    for name, regex in rules:
+        if name.find('ignore_') <= 0 or type(ldict.get(name)) in (types.FunctionType, types.MethodType):
+            continue
+        first = _first_chars(regex, reflags)
+        if not first:
+            continue
+        if any(_can_start(other, reflags, first) for oname, other in rules if oname != name):
+            continue
+        alts.append('(?:%s)' % regex)
+        chars += ''.join(sorted(first - set(chars)))
+
+    if not alts:
+        return None
+    return chars, re.compile('(?:%s)+' % '|'.join(alts), reflags)
+
+# Return the set of characters that a match of regex starts with, if regex is
+# a sequence of single characters and repeats of one and the set is small.
+# Otherwise return None.
+def _first_chars(regex, flags):
+    try:
+        pattern = sre_parse.parse(regex, flags)
+    except re.error:
+        return None
+    flags = pattern.state.flags
+    if flags & (re.IGNORECASE | re.LOCALE) or not len(pattern):
+        return None
+    single = (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN, sre_parse.ANY)
+    for op, av in pattern:
+        if op == sre_parse.MAX_REPEAT and len(av[2]) == 1 and av[2][0][0] in single:
+            continue
+        if op not in single:
+            return None
+
+    op, av = pattern[0]
+    if op == sre_parse.MAX_REPEAT:
+        if av[0] < 1:
+            return None
+        op, av = av[2][0]
+    if op == sre_parse.LITERAL:
+        return {chr(av)}
+    if op != sre_parse.IN:
+        return None
+    chars = set()
+    for op, av in av:
+        if op == sre_parse.LITERAL:
+            chars.add(chr(av))
+        elif op == sre_parse.RANGE and av[1] - av[0] < 256:
+            chars.update(chr(n) for n in range(av[0], av[1] + 1))
+        elif op == sre_parse.CATEGORY and av == sre_parse.CATEGORY_SPACE:
+            chars.update(' \t\n\r\f\v' if flags & re.ASCII else _space_chars)
+        else:
+            return None
+    return chars
+
+# Return True if a match of regex could start with one of chars (or if it's
+# not known)
+def _can_start(regex, flags, chars):
+    try:
+        pattern = sre_parse.parse(regex, flags)
+    except re.error:
+        return True
+    pred = _first_pred(list(pattern), pattern.state.flags)
+    return pred is None or any(pred(c) for c in chars)
+
+# Return a predicate for the first character of a match of the parsed regex
+# nodes, or None if it's not known
+def _first_pred(nodes, flags):
+    if not nodes or flags & (re.IGNORECASE | re.LOCALE):
+        return None
+    op, av = nodes[0]
+    rest = nodes[1:]
+    if op == sre_parse.LITERAL:
+        return lambda ch: ch == chr(av)
+    if op == sre_parse.NOT_LITERAL:
+        return lambda ch: ch != chr(av)
+    if op == sre_parse.ANY:
+        return lambda ch: True
+    if op == sre_parse.IN:
+        try:
+            return _charset(av, flags)
+        except _NoDFA:
+            return None
+    if op == sre_parse.AT:
+        return _first_pred(rest, flags)
+    if op == sre_parse.SUBPATTERN:
+        if av[1] or av[2]:
+            return None
+        return _first_pred(list(av[3]) + rest, flags)
+    if op == sre_parse.BRANCH:
+        preds = [_first_pred(list(alt) + rest, flags) for alt in av[1]]
+    elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        preds = [_first_pred(list(av[2]) + rest, flags)]
+        if av[0] == 0:
+            preds.append(_first_pred(rest, flags))
+    else:
+        return None
+    if None in preds:
+        return None
+    return lambda ch: any(pred(ch) for pred in preds)
+
+# -----------------------------------------------------------------------------
+# _form_dispatch()
+#
+# Build the first character dispatch of a state from its rules, a list of
+# (name, regex) in order of priority.  Returns (table, other) where table maps
+# each character below 256 to the master regexes of the rules that can start
+# with it (in order), and other holds the master regexes of the rules that
+# can start with a character from 256 on.  The lexer only tries the rules
+# for the character at lexpos.  The other rules can't match there, so the
+# first rule that matches is the same as with all of them.  Also returns
+# (chars, other) for LexerSpec.lexstateshared.
+# -----------------------------------------------------------------------------
+def _form_dispatch(rules, reflags, ldict, toknames):
+    preds = []
+    ascii = []
+    for name, regex in rules:
+        try:
+            pattern = sre_parse.parse(regex, reflags)
+            nodes, flags = list(pattern), pattern.state.flags
+            pred = _first_pred(nodes, flags)
+        except re.error:
+            pred = None
+        preds.append(pred)
+        ascii.append(pred is not None and _first_ascii(nodes, flags))
+
+    subsets = {}
+    def master(indexes):
+        if indexes not in subsets:
+            relist = [_master_part(*rules[i]) for i in indexes]
+            subsets[indexes] = _form_master_re(relist, reflags, ldict, toknames)[0]
+        return subsets[indexes]
+
+    table = {}
+    shared = set()
+    for n in range(256):
+        c = chr(n)
+        indexes = tuple(i for i, pred in enumerate(preds) if pred is None or pred(c))
+        table[c] = master(indexes)
+        if len(indexes) > 1:
+            shared.add(c)
+    indexes = tuple(i for i, a in enumerate(ascii) if not a)
+    other = master(indexes)
+    return table, other, (shared, len(indexes) > 1)
+
+# Return True if the first character of a match of the parsed regex nodes
+# is known to be ASCII
+def _first_ascii(nodes, flags):
+    if not nodes or flags & (re.IGNORECASE | re.LOCALE):
+        return False
+    op, av = nodes[0]
+    rest = nodes[1:]
+    if op == sre_parse.LITERAL:
+        return av < 128
+    if op == sre_parse.IN:
+        for iop, iav in av:
+            if iop == sre_parse.LITERAL and iav < 128:
+                continue
+            if iop == sre_parse.RANGE and iav[1] < 128:
+                continue
+            if iop == sre_parse.CATEGORY and flags & re.ASCII and iav in _ascii_categories:
+                continue
+            return False
+        return True
+    if op == sre_parse.AT:
+        return _first_ascii(rest, flags)
+    if op == sre_parse.SUBPATTERN:
+        return not (av[1] or av[2]) and _first_ascii(list(av[3]) + rest, flags)
+    if op == sre_parse.BRANCH:
+        return all(_first_ascii(list(alt) + rest, flags) for alt in av[1])
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        return (_first_ascii(list(av[2]) + rest, flags) and
+                (av[0] > 0 or _first_ascii(rest, flags)))
+    return False
+
 # -----------------------------------------------------------------------------
 # LexerReflect()
 #
@@ -424,6 +2946,7 @@ class LexerReflect(object):
     def get_all(self):
         self.get_tokens()
         self.get_literals()
+        self.get_keywords()
         self.get_states()
         self.get_rules()
 
@@ -431,6 +2954,8 @@ class LexerReflect(object):
     def validate_all(self):
         self.validate_tokens()
         self.validate_literals()
+        self.validate_keywords()
+        self.validate_operators()
         self.validate_rules()
         return self.error
 
@@ -483,6 +3008,52 @@ class LexerReflect(object):
             self.log.error('Invalid literals specification. literals must be a sequence of characters')
             self.error = True
 
+    # Get the keywords (t_keywords)
+    def get_keywords(self):
+        self.keywords = self.ldict.get('t_keywords', None)
+        if not self.keywords:
+            self.keywords = {}
+
+    # Validate the keywords.  A list or tuple of keywords gives each the
+    # token type of its name in upper case.
+    def validate_keywords(self):
+        keywords = self.keywords
+        if isinstance(keywords, (list, tuple)):
+            if not all(isinstance(word, str) for word in keywords):
+                self.log.error('Invalid keywords specification. t_keywords must be a list of strings')
+                self.error = True
+            keywords = { word: word.upper() for word in keywords if isinstance(word, str) }
+        elif not isinstance(keywords, dict):
+            self.log.error('t_keywords must be a dictionary, list or tuple')
+            self.error = True
+            keywords = {}
+
+        for word, toktype in keywords.items():
+            if not isinstance(word, str) or not word:
+                self.log.error(f'Invalid keyword {word!r}. Must be a nonempty string')
+                self.error = True
+            elif toktype not in self.tokens:
+                self.log.error(f'Keyword {word!r} has token type {toktype!r} that is not in tokens')
+                self.error = True
+        self.keywords = keywords
+
+    # Validate the operators of each state (t_operators, t_state_operators)
+    def validate_operators(self):
+        for state, operators in list(self.operators.items()):
+            if not isinstance(operators, dict):
+                self.log.error(f'The operators of state {state!r} must be a dictionary mapping strings to token types')
+                self.error = True
+                del self.operators[state]
+                continue
+
+            for text, toktype in operators.items():
+                if not isinstance(text, str) or not text:
+                    self.log.error(f'Invalid operator {text!r}. Must be a nonempty string')
+                    self.error = True
+                elif toktype not in self.tokens:
+                    self.log.error(f'Operator {text!r} has token type {toktype!r} that is not in tokens')
+                    self.error = True
+
     def get_states(self):
         self.states = self.ldict.get('states', None)
         # Build statemap
@@ -524,6 +3095,7 @@ class LexerReflect(object):
         self.ignore   = {}        # Ignore strings by state
         self.errorf   = {}        # Error functions by state
         self.eoff     = {}        # EOF functions by state
+        self.operators = {}       # Operators by state
 
         for s in self.stateinfo:
             self.funcsym[s] = []
@@ -537,6 +3109,15 @@ class LexerReflect(object):
         for f in tsymbols:
             t = self.ldict[f]
             states, tokname = _statetoken(f, self.stateinfo)
+            if tokname == 'keywords':
+                if f != 't_keywords':
+                    self.log.error('%s: The keywords are the same in every state. Use t_keywords', f)
+                    self.error = True
+                continue
+            if tokname == 'operators':
+                for s in states:
+                    self.operators[s] = t
+                continue
             self.toknames[f] = tokname
 
             if hasattr(t, '__call__'):
@@ -646,7 +3227,7 @@ class LexerReflect(object):
                         self.log.error("Make sure '#' in rule %r is escaped with '\\#'", name)
                     self.error = True
 
-            if not self.funcsym[state] and not self.strsym[state]:
+            if not self.funcsym[state] and not self.strsym[state] and not self.operators.get(state):
                 self.log.error("No rules defined for state %r", state)
                 self.error = True
 
@@ -715,13 +3296,14 @@ class LexerReflect(object):
 # Build all of the regular expression rules from definitions in the supplied module
 # -----------------------------------------------------------------------------
 def lex(*, module=None, object=None, debug=False, 
-        reflags=int(re.VERBOSE), debuglog=None, errorlog=None):
+        reflags=int(re.VERBOSE), debuglog=None, errorlog=None, engine='re',
+        lineindex=False, encoding='utf-8'):
 
     global lexer
 
     ldict = None
     stateinfo  = {'INITIAL': 'inclusive'}
-    lexobj = Lexer()
+    spec = LexerSpec()
     global token, input
 
     if errorlog is None:
@@ -731,6 +3313,9 @@ def lex(*, module=None, object=None, debug=False,
         if debuglog is None:
             debuglog = PlyLogger(sys.stderr)
 
+    if engine not in ('re', 'dfa'):
+        raise ValueError(f'Unknown lexer engine {engine!r}')
+
     # Get the module dictionary used for the lexer
     if object:
         module = object
@@ -758,39 +3343,59 @@ def lex(*, module=None, object=None, debug=False,
         debuglog.info('lex: states   = %r', linfo.stateinfo)
 
     # Build a dictionary of valid token names
-    lexobj.lextokens = set()
+    spec.lextokens = set()
     for n in linfo.tokens:
-        lexobj.lextokens.add(n)
+        spec.lextokens.add(n)
 
     # Get literals specification
     if isinstance(linfo.literals, (list, tuple)):
-        lexobj.lexliterals = type(linfo.literals[0])().join(linfo.literals)
+        spec.lexliterals = type(linfo.literals[0])().join(linfo.literals)
     else:
-        lexobj.lexliterals = linfo.literals
+        spec.lexliterals = linfo.literals
 
-    lexobj.lextokens_all = lexobj.lextokens | set(lexobj.lexliterals)
+    spec.lextokens_all = spec.lextokens | set(spec.lexliterals)
+    spec.lextypenames = tuple(dict.fromkeys(list(linfo.tokens) + list(spec.lexliterals)))
 
     # Get the stateinfo dictionary
     stateinfo = linfo.stateinfo
 
+    # Name the group at the end of each operator after its token type
+    opnames = {}
+    count = 0
+    for state, operators in linfo.operators.items():
+        opnames[state] = {}
+        for text, toktype in operators.items():
+            name = 'operators_%d' % count
+            opnames[state][text] = name
+            linfo.toknames[name] = toktype
+            count += 1
+
     regexs = {}
+    rules = {}
+    opgroups = {}
     # Build the master regular expressions
     for state in stateinfo:
         regex_list = []
+        rule_list = []
 
         # Add rules defined by functions first
         for fname, f in linfo.funcsym[state]:
             regex_list.append('(?P<%s>%s)' % (fname, _get_regex(f)))
+            rule_list.append((fname, _get_regex(f)))
             if debug:
                 debuglog.info("lex: Adding rule %s -> '%s' (state '%s')", fname, _get_regex(f), state)
 
-        # Now add all of the simple rules
-        for name, r in linfo.strsym[state]:
-            regex_list.append('(?P<%s>%s)' % (name, r))
+        # Now add all of the simple rules, with the operators in among them
+        strsym, groups = _place_operators(linfo.strsym[state], opnames.get(state, {}))
+        opgroups.update(groups)
+        for name, r in strsym:
+            regex_list.append(_master_part(name, r))
+            rule_list.append((name, r))
             if debug:
                 debuglog.info("lex: Adding rule %s -> '%s' (state '%s')", name, r, state)
 
         regexs[state] = regex_list
+        rules[state] = rule_list
 
     # Build the master regular expressions
 
@@ -799,9 +3404,9 @@ def lex(*, module=None, object=None, debug=False,
 
     for state in regexs:
         lexre, re_text, re_names = _form_master_re(regexs[state], reflags, ldict, linfo.toknames)
-        lexobj.lexstatere[state] = lexre
-        lexobj.lexstateretext[state] = re_text
-        lexobj.lexstaterenames[state] = re_names
+        spec.lexstatere[state] = lexre
+        spec.lexstateretext[state] = re_text
+        spec.lexstaterenames[state] = re_names
         if debug:
             for i, text in enumerate(re_text):
                 debuglog.info("lex: state '%s' : regex[%d] = '%s'", state, i, text)
@@ -809,35 +3414,61 @@ def lex(*, module=None, object=None, debug=False,
     # For inclusive states, we need to add the regular expressions from the INITIAL state
     for state, stype in stateinfo.items():
         if state != 'INITIAL' and stype == 'inclusive':
-            lexobj.lexstatere[state].extend(lexobj.lexstatere['INITIAL'])
-            lexobj.lexstateretext[state].extend(lexobj.lexstateretext['INITIAL'])
-            lexobj.lexstaterenames[state].extend(lexobj.lexstaterenames['INITIAL'])
+            spec.lexstatere[state].extend(spec.lexstatere['INITIAL'])
+            spec.lexstateretext[state].extend(spec.lexstateretext['INITIAL'])
+            spec.lexstaterenames[state].extend(spec.lexstaterenames['INITIAL'])
+            rules[state].extend(rules['INITIAL'])
+
+    # Find the identifier rule whose tokens are looked up in the keywords
+    if linfo.keywords:
+        kwtype = _keyword_type(rules, linfo.keywords, reflags, linfo.toknames)
+        if kwtype is None:
+            errorlog.error('No rule matches all of the keywords')
+            raise SyntaxError("Can't build lexer")
+        spec.lexkeywords = dict(linfo.keywords)
+        spec.lexkeywordtype = kwtype
+        if debug:
+            debuglog.info('lex: keywords = %r (looked up in %s tokens)', spec.lexkeywords, kwtype)
+
+    # Build the first character dispatch
+    if engine == 're':
+        for state in rules:
+            table, other, shared = _form_dispatch(rules[state], reflags, ldict, linfo.toknames)
+            spec.lexstatedispatch[state] = (table, other)
+            spec.lexstateshared[state] = shared
+
+    # Build the DFAs
+    if engine == 'dfa':
+        for state in rules:
+            dfa, fallback = _form_dfa(_dfa_rules(rules[state], opgroups), reflags, ldict, linfo.toknames)
+            spec.lexstatedfa[state] = dfa
+            if debug:
+                debuglog.info("lex: state '%s' : dfa with %d rows", state, len(dfa.rows))
+                for name in fallback:
+                    debuglog.info("lex: state '%s' : rule %s is matched with re", state, name)
 
-    lexobj.lexstateinfo = stateinfo
-    lexobj.lexre = lexobj.lexstatere['INITIAL']
-    lexobj.lexretext = lexobj.lexstateretext['INITIAL']
-    lexobj.lexreflags = reflags
+    spec.lexstateinfo = stateinfo
+    spec.lexreflags = reflags
+    spec.lexlineindex = lineindex
+    spec.lexencoding = encoding
 
     # Set up ignore variables
-    lexobj.lexstateignore = linfo.ignore
-    lexobj.lexignore = lexobj.lexstateignore.get('INITIAL', '')
+    spec.lexstateignore = linfo.ignore
 
     # Set up error functions
-    lexobj.lexstateerrorf = linfo.errorf
-    lexobj.lexerrorf = linfo.errorf.get('INITIAL', None)
-    if not lexobj.lexerrorf:
+    spec.lexstateerrorf = linfo.errorf
+    if not linfo.errorf.get('INITIAL', None):
         errorlog.warning('No t_error rule is defined')
 
     # Set up eof functions
-    lexobj.lexstateeoff = linfo.eoff
-    lexobj.lexeoff = linfo.eoff.get('INITIAL', None)
+    spec.lexstateeoff = linfo.eoff
 
     # Check state information for ignore and error rules
     for s, stype in stateinfo.items():
         if stype == 'exclusive':
             if s not in linfo.errorf:
                 errorlog.warning("No error rule is defined for exclusive state %r", s)
-            if s not in linfo.ignore and lexobj.lexignore:
+            if s not in linfo.ignore and linfo.ignore.get('INITIAL', ''):
                 errorlog.warning("No ignore rule is defined for exclusive state %r", s)
         elif stype == 'inclusive':
             if s not in linfo.errorf:
@@ -845,6 +3476,15 @@ def lex(*, module=None, object=None, debug=False,
             if s not in linfo.ignore:
                 linfo.ignore[s] = linfo.ignore.get('INITIAL', '')
 
+    # Build the regexes that skip runs of ignored input
+    for state in rules:
+        skip = _form_skip_re(linfo.ignore.get(state, ''), rules[state], reflags, ldict)
+        if skip:
+            spec.lexstateskip[state] = skip
+
+    # Make the lexer for the spec
+    lexobj = spec.lexer()
+
     # Create global versions of the token() and input() functions
     token = lexobj.token
     input = lexobj.input
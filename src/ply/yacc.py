@@ -64,7 +64,14 @@
 import re
 import types
 import sys
+import os
 import inspect
+import pickle
+import mmap
+import struct
+import importlib.util
+import threading
+from array import array
 
 #-----------------------------------------------------------------------------
 #                     === User configurable parameters ===
@@ -76,9 +83,17 @@ yaccdebug   = False            # Debugging mode.  If set, yacc generates a
                                # a 'parser.out' file in the current directory
 
 debug_file  = 'parser.out'     # Default name of the debugging file
+pickle_protocol = pickle.HIGHEST_PROTOCOL  # Protocol to use when writing pickle files
 error_count = 3                # Number of symbols that must be shifted to leave recovery mode
 resultlimit = 40               # Size limit of results when running in debug mode.
 
+yaccdevel   = False            # Set to True if developing yacc.  This turns off optimized
+                               # implementations of certain functions.
+
+# Version of the saved parsing tables.  Bump this whenever the layout of
+# the table files changes so that stale files get rebuilt.
+__tabversion__ = '4.1'
+
 MAXINT = sys.maxsize
 
 # This object is a stand-in for a logging object created by the
@@ -116,6 +131,10 @@ class NullLogger(object):
 class YaccError(Exception):
     pass
 
+# Exception raised when a saved table file was written by a different version
+class VersionError(YaccError):
+    pass
+
 # Format the result message that the parser produces when running in debug mode.
 def format_result(r):
     repr_str = repr(r)
@@ -168,56 +187,410 @@ class YaccSymbol:
 # a tuple of (startline,endline) representing the range of lines
 # for a symbol.  The lexspan() method returns a tuple (lexpos,endlexpos)
 # representing the range of positional information for a symbol.
+#
+# The object is a view onto the parser's symbol stack rather than a copy of
+# it.  While a rule runs, the symbols of its right hand side are still on top
+# of the stack.  .base is the position of the symbol just below them, so p[n]
+# is stack[base+n] for n > 0, p[-n] reaches below the rule as stack[base+1-n],
+# and p[0] is the new symbol .sym.   The parser reuses one instance for every
+# reduction, so only the .slice property (which builds a list) should be used
+# to keep hold of the symbols after the rule returns.
 
 class YaccProduction:
-    def __init__(self, s, stack=None):
-        self.slice = s
+    def __init__(self, stack=None):
+        self.sym = None
         self.stack = stack
+        self.base = 0
+        self.size = 0
         self.lexer = None
         self.parser = None
 
+    @property
+    def slice(self):
+        base = self.base
+        return [self.sym] + self.stack[base+1:base+self.size]
+
+    # Return the symbol at position n, counting negative positions from the
+    # end of the production like a list would
+    def _symbol(self, n):
+        if n < 0:
+            n += self.size
+        if n == 0:
+            return self.sym
+        if 0 < n < self.size:
+            return self.stack[self.base + n]
+        raise IndexError('production index out of range')
+
     def __getitem__(self, n):
         if isinstance(n, slice):
             return [s.value for s in self.slice[n]]
-        elif n >= 0:
-            return self.slice[n].value
+        elif n > 0:
+            return self.stack[self.base + n].value
+        elif n == 0:
+            return self.sym.value
         else:
-            return self.stack[n].value
+            return self.stack[self.base + 1 + n].value
 
     def __setitem__(self, n, v):
-        self.slice[n].value = v
-
-    def __getslice__(self, i, j):
-        return [s.value for s in self.slice[i:j]]
+        if n == 0:
+            self.sym.value = v
+        else:
+            self._symbol(n).value = v
 
     def __len__(self):
-        return len(self.slice)
+        return self.size
 
     def lineno(self, n):
-        return getattr(self.slice[n], 'lineno', 0)
+        return getattr(self._symbol(n), 'lineno', 0)
 
     def set_lineno(self, n, lineno):
-        self.slice[n].lineno = lineno
+        self._symbol(n).lineno = lineno
 
     def linespan(self, n):
-        startline = getattr(self.slice[n], 'lineno', 0)
-        endline = getattr(self.slice[n], 'endlineno', startline)
+        sym = self._symbol(n)
+        startline = getattr(sym, 'lineno', 0)
+        endline = getattr(sym, 'endlineno', startline)
         return startline, endline
 
     def lexpos(self, n):
-        return getattr(self.slice[n], 'lexpos', 0)
+        return getattr(self._symbol(n), 'lexpos', 0)
 
     def set_lexpos(self, n, lexpos):
-        self.slice[n].lexpos = lexpos
+        self._symbol(n).lexpos = lexpos
 
     def lexspan(self, n):
-        startpos = getattr(self.slice[n], 'lexpos', 0)
-        endpos = getattr(self.slice[n], 'endlexpos', startpos)
+        sym = self._symbol(n)
+        startpos = getattr(sym, 'lexpos', 0)
+        endpos = getattr(sym, 'endlexpos', startpos)
         return startpos, endpos
 
     def error(self):
         raise SyntaxError
 
+# -----------------------------------------------------------------------------
+# @positional
+#
+# This decorator changes the calling convention of a grammar rule.  Instead of
+# a YaccProduction, the function receives the values of the symbols on the right
+# hand side as positional arguments and its return value becomes the value of
+# the left hand side:
+#
+#     @positional
+#     def p_expr_plus(left, op, right):
+#         'expr : expr PLUS expr'
+#         return left + right
+#
+# A rule with alternatives of different lengths can use default arguments or
+# *args.  Such rules have no access to the lexer, the parser or position info.
+# -----------------------------------------------------------------------------
+
+def positional(f):
+    f.positional = True
+    return f
+
+# -----------------------------------------------------------------------------
+#                             == LRPackedTable ==
+#
+# An integer-coded copy of the action and goto tables for use by
+# LRParser.parsepackeddebug().  Terminals and nonterminals are interned to small
+# integers (column numbers) and each table is stored as one flat array('i')
+# in which the row for a state starts at the offset given by action_base or
+# goto_base.
+#
+# The packed tables are not a faster path.  The parser still has to map the
+# name of each token to its column with a dictionary lookup, and indexing an
+# array costs more than the dictionary lookup of the dictionary tables, so
+# parsing with them is about 10% slower (see example/bench_reduce.py).  They
+# are there for their size: the arrays hold no Python objects, and they can be
+# written to a binary file that all of the worker processes map (see
+# LRMappedTable).
+#
+# Action entries are encoded as follows:
+#
+#        n > 0 and n != ACCEPT   - Shift and go to state n
+#        n < 0                   - Reduce using rule -n
+#        ACCEPT                  - Accept the input
+#        0                       - Syntax error
+#
+# State 0 is never the target of a shift, so 0 is free to mean "error".
+#
+# The tables can be laid out in one of two ways:
+#
+#    dense      Every row is stored in full, one row after the other.  An
+#               action lookup is action[action_base[state] + code], and
+#               action_check is left empty.
+#
+#    compressed Row displacement ("comb") compression as used by bison.  The
+#               most common reduction of each state is taken out of its row
+#               and becomes the default action of the state.  The remaining
+#               entries of all rows are then overlaid in a single array, each
+#               row shifted by its base offset so that the occupied entries
+#               never collide.  action_check records which state owns each
+#               slot.  Any lookup that lands on a slot owned by another state
+#               yields the default action of the state.
+#
+# In the compressed layout an action lookup is
+#
+#        i = action_base[state] + code
+#        t = action[i] if action_check[i] == state else action_default[state]
+#
+# See action_lookup().  As with bison, using default reductions means that a
+# syntax error may be detected after some extra reductions have been performed,
+# but never after an erroneous token has been shifted.  The 'error' token and
+# nonassoc errors are always stored explicitly so that error recovery behaves
+# as it does with the dictionary tables.
+#
+# The goto table is only ever consulted for entries that exist, so it is packed
+# the same way but needs neither a check array nor defaults.
+# -----------------------------------------------------------------------------
+
+ACCEPT = 0x7fffffff
+
+# Overlay the rows of a table into one array.  rows is a list of dictionaries
+# mapping column numbers to values.  Returns (values, check, base).
+def _pack_rows(rows, ncols, compress):
+    values = array('i')
+    check = array('i')
+    base = array('i', [0]) * len(rows)
+    if not compress:
+        # Each row only holds its own entries, so no check is needed
+        for st, row in enumerate(rows):
+            base[st] = len(values)
+            values.extend([row.get(c, 0) for c in range(ncols)])
+        return values, check, base
+
+    used = []                           # used[i] is True if slot i is taken
+    first_free = 0                      # All slots below this one are taken
+    # Place the fullest rows first.  They are the hardest to fit.
+    order = sorted(range(len(rows)), key=lambda st: -len(rows[st]))
+    for st in order:
+        row = rows[st]
+        if not row:
+            continue
+        cols = sorted(row)
+        b = max(first_free - cols[0], 0)
+        while True:
+            for c in cols:
+                i = b + c
+                if i < len(used) and used[i]:
+                    break
+            else:
+                break
+            b += 1
+        end = b + cols[-1] + 1
+        if end > len(used):
+            used.extend([False] * (end - len(used)))
+            values.extend([0] * (end - len(values)))
+            check.extend([-1] * (end - len(check)))
+        for c in cols:
+            used[b + c] = True
+            values[b + c] = row[c]
+            check[b + c] = st
+        base[st] = b
+        while first_free < len(used) and used[first_free]:
+            first_free += 1
+
+    # Pad so that base + column never runs past the end of the arrays
+    end = max(base) + ncols if rows else 0
+    if end > len(values):
+        values.extend([0] * (end - len(values)))
+        check.extend([-1] * (end - len(check)))
+    return values, check, base
+
+class LRPackedTable:
+    def __init__(self, action, goto, productions, compress=False):
+        # The 'error' token always has a column of its own, even if no rule uses
+        # it, so that error recovery finds its entries and not the defaults
+        terms = { 'error' }
+        for row in action.values():
+            terms.update(row)
+        nonterms = set()
+        for row in goto.values():
+            nonterms.update(row)
+
+        self.nstates      = len(action)
+        self.compressed   = compress
+        self.terminals    = sorted(terms)
+        self.nonterminals = sorted(nonterms)
+        self.termcodes    = { name: n for n, name in enumerate(self.terminals) }
+        self.nontermcodes = { name: n for n, name in enumerate(self.nonterminals) }
+
+        # Tokens that the grammar doesn't know about get their own column that
+        # never holds anything but errors
+        self.unknown = len(self.terminals)
+
+        # Goto column of the left hand side of each rule (-1 for the start rule)
+        self.prodcodes = [self.nontermcodes.get(p.name, -1) for p in productions]
+
+        errorcode = self.termcodes.get('error')
+        self.action_default = array('i', [0]) * self.nstates
+        rows = []
+        for st in range(self.nstates):
+            row = {}
+            for name, t in action[st].items():
+                if t is None:
+                    row[self.termcodes[name]] = 0      # nonassoc error
+                else:
+                    row[self.termcodes[name]] = ACCEPT if t == 0 else t
+
+            if compress:
+                # The most common reduction (lowest rule number on ties) becomes the
+                # default action of the state
+                counts = {}
+                for t in row.values():
+                    if t < 0:
+                        counts[t] = counts.get(t, 0) + 1
+                if counts:
+                    default = min(counts, key=lambda t: (-counts[t], -t))
+                    self.action_default[st] = default
+                    row = { c: t for c, t in row.items() if t != default }
+                    if errorcode is not None:
+                        row.setdefault(errorcode, 0)
+                else:
+                    row = { c: t for c, t in row.items() if t != 0 }
+            rows.append(row)
+
+        self.action, self.action_check, self.action_base = _pack_rows(rows, len(self.terminals) + 1, compress)
+
+        rows = []
+        for st in range(self.nstates):
+            rows.append({ self.nontermcodes[name]: j for name, j in goto[st].items() })
+        self.goto, _, self.goto_base = _pack_rows(rows, len(self.nonterminals), compress)
+
+        # The defaulted reduction of each state, 0 if none.  This is the same rule
+        # as LRParser.set_defaulted_states() and is only kept so that it can be
+        # saved along with the tables (see LRMappedTable).
+        self.defaulted = array('i', [0]) * self.nstates
+        for st in range(self.nstates):
+            rules = list(action[st].values())
+            if len(rules) == 1 and rules[0] is not None and rules[0] < 0:
+                self.defaulted[st] = rules[0]
+
+    # Return the action for the given state and terminal code
+    def action_lookup(self, state, code):
+        i = self.action_base[state] + code
+        if not self.compressed or self.action_check[i] == state:
+            return self.action[i]
+        return self.action_default[state]
+
+    # Return the goto state for the given state and nonterminal code
+    def goto_lookup(self, state, code):
+        return self.goto[self.goto_base[state] + code]
+
+    # Size of the tables in bytes, not counting the symbol name maps
+    def table_size(self):
+        arrays = (self.action, self.action_check, self.action_base, self.action_default,
+                  self.goto, self.goto_base)
+        return sum(len(a) * a.itemsize for a in arrays)
+
+    # Ratio between the size of the fully expanded tables and table_size()
+    def compression_ratio(self):
+        ncols = len(self.terminals) + 1 + len(self.nonterminals)
+        dense = self.nstates * ncols * self.action.itemsize
+        return dense / max(self.table_size(), 1)
+
+# -----------------------------------------------------------------------------
+#                             == LRMappedTable ==
+#
+# An LRPackedTable read from a binary table file written by LRTable.write_binary().
+# The file is mapped into memory and the integer arrays are used in place as
+# memoryviews, so nothing is copied or unpickled into dictionaries.  All of the
+# processes that map the same file share one physical copy of the tables in the
+# page cache.  Only the symbol names and the productions are read into objects.
+#
+# The layout of the file is:
+#
+#        magic    8 bytes    BINARY_MAGIC
+#        size     4 bytes    Size of the header (unsigned, little endian)
+#        header   size bytes Pickled dictionary describing the tables
+#        padding             Up to the next multiple of 8 bytes
+#        arrays              The arrays of BINARY_ARRAYS, one after the other,
+#                            as native C ints
+#
+# The arrays are stored in the byte order of the machine that wrote them.  A
+# file from a machine with a different byte order or int size is treated like
+# an out of date file and rebuilt.
+# -----------------------------------------------------------------------------
+
+BINARY_MAGIC = b'PLYLRTB\n'
+BINARY_ARRAYS = ('action', 'action_check', 'action_base', 'action_default',
+                 'goto', 'goto_base', 'defaulted', 'prodcodes')
+
+class LRMappedTable(LRPackedTable):
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.mmap[:8] != BINARY_MAGIC:
+            raise VersionError('%s is not a yacc binary table file' % filename)
+        size, = struct.unpack('<I', self.mmap[8:12])
+        header = pickle.loads(self.mmap[12:12+size])
+        if header['tabversion'] != __tabversion__:
+            raise VersionError('yacc table file version is out of date')
+        if header['byteorder'] != sys.byteorder or header['itemsize'] != array('i').itemsize:
+            raise VersionError('yacc table file was written on a different kind of machine')
+
+        self.signature    = header['signature']
+        self.productions  = header['productions']
+        self.nstates      = header['nstates']
+        self.compressed   = header['compressed']
+        self.terminals    = header['terminals']
+        self.nonterminals = header['nonterminals']
+        self.termcodes    = { name: n for n, name in enumerate(self.terminals) }
+        self.nontermcodes = { name: n for n, name in enumerate(self.nonterminals) }
+        self.unknown      = len(self.terminals)
+
+        view = memoryview(self.mmap)
+        offset = (12 + size + 7) & ~7
+        for name, length in zip(BINARY_ARRAYS, header['lengths']):
+            end = offset + length * header['itemsize']
+            setattr(self, name, view[offset:end].cast('i'))
+            offset = end
+
+# -----------------------------------------------------------------------------
+#                               == LRSession ==
+#
+# The mutable state of one parse: the state and symbol stacks, the current
+# state, the token function and the error recovery flag.  Each call of
+# LRParser.parse() makes a new session and leaves the LRParser untouched, so
+# one parser can be used by any number of threads at once.  Each thread must
+# pass its own lexer to parse() (see LexerSpec.lexer()).
+#
+# The session is the object that grammar rules see as p.parser.  Attributes
+# that it doesn't have itself, such as the tables, come from the LRParser.
+# Rules may also set attributes of their own on p.parser (p.parser.foo = ...)
+# to share state during the parse.  These go in the session's __dict__, so
+# they last for one parse only and aren't seen by other threads.
+# The session of the parse running in each thread is kept in _sessions.
+# -----------------------------------------------------------------------------
+
+_sessions = threading.local()
+
+class LRSession:
+    __slots__ = ('parser', 'statestack', 'symstack', 'state', 'token', 'errorok', '__dict__')
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.statestack = []
+        self.symstack = []
+        self.state = 0
+        self.token = None
+        self.errorok = True
+
+    def __getattr__(self, name):
+        return getattr(self.parser, name)
+
+    def errok(self):
+        self.errorok = True
+
+    def restart(self):
+        del self.statestack[:]
+        del self.symstack[:]
+        sym = YaccSymbol()
+        sym.type = '$end'
+        self.symstack.append(sym)
+        self.statestack.append(0)
+
 # -----------------------------------------------------------------------------
 #                               == LRParser ==
 #
@@ -230,62 +603,1765 @@ class LRParser:
         self.action = lrtab.lr_action
         self.goto = lrtab.lr_goto
         self.errorfunc = errorf
+        self.packed = getattr(lrtab, 'lr_packed', None)
         self.set_defaulted_states()
-        self.errorok = True
+
+    # Switch the parser over to integer-coded tables, optionally compressed.
+    # See LRPackedTable.  A parser made from a binary table file is always
+    # packed and has no dictionary tables to pack.
+    def pack_tables(self, compress=False):
+        if self.action is None:
+            return
+        self.packed = LRPackedTable(self.action, self.goto, self.productions, compress)
+        self.set_defaulted_states()
+
+    # The parser object itself holds no state of a parse (see LRSession).  These
+    # act on the parse that is running in the calling thread, so that p_error()
+    # functions can keep calling errok() and friends on the parser.
+    def _session(self):
+        session = getattr(_sessions, 'session', None)
+        if session is None or session.parser is not self:
+            raise YaccError('No parse is running in this thread')
+        return session
 
     def errok(self):
-        self.errorok = True
+        self._session().errok()
 
     def restart(self):
-        del self.statestack[:]
-        del self.symstack[:]
+        self._session().restart()
+
+    errorok    = property(lambda self: self._session().errorok)
+    state      = property(lambda self: self._session().state)
+    statestack = property(lambda self: self._session().statestack)
+    symstack   = property(lambda self: self._session().symstack)
+    token      = property(lambda self: self._session().token)
+
+    # Defaulted state support.
+    # This method identifies parser states where there is only one possible reduction action.
+    # For such states, the parser can make a choose to make a rule reduction without consuming
+    # the next look-ahead token.  This delayed invocation of the tokenizer can be useful in
+    # certain kinds of advanced parsing situations where the lexer and parser interact with
+    # each other or change states (i.e., manipulation of scope, lexer states, etc.).
+    #
+    # See:  http://www.gnu.org/software/bison/manual/html_node/Default-Reductions.html#Default-Reductions
+    def set_defaulted_states(self):
+        if self.action is None:
+            # Tables read from a binary file come with their defaulted states
+            defaulted = self.packed.defaulted
+            self.defaulted_states = { st: defaulted[st] for st in range(len(defaulted)) if defaulted[st] }
+            self.packed_defaulted = defaulted
+            return
+
+        self.defaulted_states = {}
+        for state, actions in self.action.items():
+            rules = list(actions.values())
+            if len(rules) == 1 and rules[0] is not None and rules[0] < 0:
+                self.defaulted_states[state] = rules[0]
+        self._pack_defaulted_states()
+
+    def disable_defaulted_states(self):
+        self.defaulted_states = {}
+        self._pack_defaulted_states()
+
+    # The packed engine keeps the defaulted states as a list indexed by state
+    def _pack_defaulted_states(self):
+        if self.packed is not None:
+            self.packed_defaulted = [0] * self.packed.nstates
+            for state, rule in self.defaulted_states.items():
+                self.packed_defaulted[state] = rule
+
+    # parse().
+    #
+    # This is the core parsing engine.  To operate, it requires a lexer object.
+    # Two options are provided.  The debug flag turns on debugging so that you can
+    # see the various rule reductions and parsing steps.  tracking turns on position
+    # tracking.  In this mode, symbols will record the starting/ending line number and
+    # character index.
+    #
+    # The actual work is done by one of several specialized versions of the parsing
+    # engine.  The right one is picked once here so that the inner loop of the common
+    # case (no debugging, no tracking) has no per-token checks for either feature.
+
+    def parse(self, input=None, lexer=None, debug=False, tracking=False):
+        # A grammar rule may start another parse in the same thread.  The session
+        # of the outer parse has to be current again once it is done.
+        outer = getattr(_sessions, 'session', None)
+        try:
+            if debug or yaccdevel:
+                if isinstance(debug, int):
+                    debug = PlyLogger(sys.stderr)
+                if self.packed is not None:
+                    return self.parsepackeddebug(input, lexer, debug, tracking)
+                return self.parsedebug(input, lexer, debug, tracking)
+            if self.packed is not None:
+                if tracking:
+                    return self.parsepackedopt(input, lexer, debug, tracking)
+                return self.parsepackedopt_notrack(input, lexer, debug, tracking)
+            if tracking:
+                return self.parseopt(input, lexer, debug, tracking)
+            return self.parseopt_notrack(input, lexer, debug, tracking)
+        finally:
+            _sessions.session = outer
+
+    # -----------------------------------------------------------------------------
+    # parsedebug().
+    #
+    # This is the debugging enabled version of parse().  All changes made to the
+    # parsing engine should be made here.   Optimized versions of this function
+    # are automatically created by the ygen.py script.  This script cuts out
+    # sections enclosed in markers such as this:
+    #
+    #      #--! DEBUG
+    #      statements
+    #      #--! DEBUG
+    #
+    # -----------------------------------------------------------------------------
+
+    def parsedebug(self, input=None, lexer=None, debug=False, tracking=False):
+        #--! parsedebug-start
+        lookahead = None                         # Current lookahead symbol
+        lookaheadstack = []                      # Stack of lookahead symbols
+        actions = self.action                    # Local reference to action table (to avoid lookup on self.)
+        goto    = self.goto                      # Local reference to goto table (to avoid lookup on self.)
+        prod    = self.productions               # Local reference to production list (to avoid lookup on self.)
+        defaulted_states = self.defaulted_states # Local reference to defaulted states
+        pslice  = YaccProduction()               # Production object passed to grammar rules
+        errorcount = 0                           # Used during error recovery
+        session = _sessions.session = LRSession(self)  # Mutable state of this parse
+
+        #--! DEBUG
+        debug.info('PLY: PARSE DEBUG START')
+        #--! DEBUG
+
+        # If no lexer was given, we will try to use the lex module
+        if not lexer:
+            from . import lex
+            lexer = lex.lexer
+
+        # Set up the lexer and parser objects on pslice
+        pslice.lexer = lexer
+        pslice.parser = session
+
+        # If input was supplied, pass to lexer
+        if input is not None:
+            lexer.input(input)
+
+        # Set the token function
+        get_token = session.token = lexer.token
+
+        # Set up the state and symbol stacks
+        statestack = session.statestack     # Stack of parsing states
+        symstack = session.symstack         # Stack of grammar symbols
+        pslice.stack = symstack             # Put in the production
+        errtoken   = None                   # Err token
+
+        # The start state is assumed to be (0,$end)
+
+        statestack.append(0)
         sym = YaccSymbol()
         sym.type = '$end'
-        self.symstack.append(sym)
-        self.statestack.append(0)
+        symstack.append(sym)
+        state = 0
+        while True:
+            # Get the next symbol on the input.  If a lookahead symbol
+            # is already set, we just use that. Otherwise, we'll pull
+            # the next token off of the lookaheadstack or from the lexer
+
+            #--! DEBUG
+            debug.debug('State  : %s', state)
+            #--! DEBUG
+
+            if state not in defaulted_states:
+                if not lookahead:
+                    if not lookaheadstack:
+                        lookahead = get_token()     # Get the next token
+                    else:
+                        lookahead = lookaheadstack.pop()
+                    if not lookahead:
+                        lookahead = YaccSymbol()
+                        lookahead.type = '$end'
+
+                # Check the action table
+                ltype = lookahead.type
+                t = actions[state].get(ltype)
+            else:
+                t = defaulted_states[state]
+                #--! DEBUG
+                debug.debug('Defaulted state %s: Reduce using %d', state, -t)
+                #--! DEBUG
+
+            #--! DEBUG
+            debug.debug('Stack  : %s',
+                        ('%s . %s' % (' '.join([xx.type for xx in symstack][1:]), str(lookahead))).lstrip())
+            #--! DEBUG
+
+            if t is not None:
+                if t > 0:
+                    # shift a symbol on the stack
+                    statestack.append(t)
+                    state = t
+
+                    #--! DEBUG
+                    debug.debug('Action : Shift and goto state %s', t)
+                    #--! DEBUG
+
+                    symstack.append(lookahead)
+                    lookahead = None
+
+                    # Decrease error count on successful shift
+                    if errorcount:
+                        errorcount -= 1
+                    continue
+
+                if t < 0:
+                    # reduce a symbol on the stack, emit a production
+                    p = prod[-t]
+                    pname = p.name
+                    plen  = p.len
+
+                    # Get production function
+                    sym = YaccSymbol()
+                    sym.type = pname       # Production name
+                    sym.value = None
+
+                    #--! DEBUG
+                    if plen:
+                        debug.info('Action : Reduce rule [%s] with %s and goto state %d', p.str,
+                                   '['+','.join([format_stack_entry(_v.value) for _v in symstack[-plen:]])+']',
+                                   goto[statestack[-1-plen]][pname])
+                    else:
+                        debug.info('Action : Reduce rule [%s] with %s and goto state %d', p.str, [],
+                                   goto[statestack[-1]][pname])
+                    #--! DEBUG
+
+                    if plen:
+                        #--! TRACKING
+                        if tracking:
+                            t1 = symstack[-plen]
+                            sym.lineno = t1.lineno
+                            sym.lexpos = t1.lexpos
+                            t1 = symstack[-1]
+                            sym.endlineno = getattr(t1, 'endlineno', t1.lineno)
+                            sym.endlexpos = getattr(t1, 'endlexpos', t1.lexpos)
+                        #--! TRACKING
+
+                        # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+                        # The code enclosed in this section is duplicated
+                        # below as a performance optimization.  Make sure
+                        # changes get made in both locations.
+
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - plen - 1
+                        pslice.size = plen + 1
+
+                        try:
+                            # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                # Unrolled for the common lengths to avoid building an argument list
+                                if plen == 1:
+                                    sym.value = p.callable(symstack[-1].value)
+                                elif plen == 2:
+                                    sym.value = p.callable(symstack[-2].value, symstack[-1].value)
+                                elif plen == 3:
+                                    sym.value = p.callable(symstack[-3].value, symstack[-2].value, symstack[-1].value)
+                                else:
+                                    sym.value = p.callable(*[_v.value for _v in symstack[-plen:]])
+                            else:
+                                p.callable(pslice)
+                            del symstack[-plen:]
+                            del statestack[-plen:]
+                            #--! DEBUG
+                            debug.info('Result : %s', format_result(pslice[0]))
+                            #--! DEBUG
+                            symstack.append(sym)
+                            state = goto[statestack[-1]][pname]
+                            statestack.append(state)
+                        except SyntaxError:
+                            # If an error was set. Enter error recovery state
+                            lookaheadstack.append(lookahead)    # Save the current lookahead token
+                            symstack.pop()                      # Leave the rest of the production on the stack
+                            statestack.pop()                    # Pop back one state (before the reduce)
+                            state = statestack[-1]
+                            sym.type = 'error'
+                            sym.value = 'error'
+                            lookahead = sym
+                            errorcount = error_count
+                            session.errorok = False
+
+                        continue
+
+                    else:
+
+                        #--! TRACKING
+                        if tracking:
+                            sym.lineno = lexer.lineno
+                            sym.lexpos = lexer.lexpos
+                        #--! TRACKING
+
+                        # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+                        # The code enclosed in this section is duplicated
+                        # above as a performance optimization.  Make sure
+                        # changes get made in both locations.
+
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - 1
+                        pslice.size = 1
+
+                        try:
+                            # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                sym.value = p.callable()
+                            else:
+                                p.callable(pslice)
+                            #--! DEBUG
+                            debug.info('Result : %s', format_result(pslice[0]))
+                            #--! DEBUG
+                            symstack.append(sym)
+                            state = goto[statestack[-1]][pname]
+                            statestack.append(state)
+                        except SyntaxError:
+                            # If an error was set. Enter error recovery state
+                            lookaheadstack.append(lookahead)    # Save the current lookahead token
+                            statestack.pop()                    # Pop back one state (before the reduce)
+                            state = statestack[-1]
+                            sym.type = 'error'
+                            sym.value = 'error'
+                            lookahead = sym
+                            errorcount = error_count
+                            session.errorok = False
+
+                        continue
+
+                if t == 0:
+                    n = symstack[-1]
+                    result = getattr(n, 'value', None)
+
+                    #--! DEBUG
+                    debug.info('Done   : Returning %s', format_result(result))
+                    debug.info('PLY: PARSE DEBUG END')
+                    #--! DEBUG
+
+                    return result
+
+            if t is None:
+
+                #--! DEBUG
+                debug.error('Error  : %s',
+                            ('%s . %s' % (' '.join([xx.type for xx in symstack][1:]), str(lookahead))).lstrip())
+                #--! DEBUG
+
+                # We have some kind of parsing error here.  To handle
+                # this, we are going to push the current token onto
+                # the tokenstack and replace it with an 'error' token.
+                # If there are any synchronization rules, they may
+                # catch it.
+                #
+                # In addition to pushing the error token, we call call
+                # the user defined p_error() function if this is the
+                # first syntax error.  This function is only called if
+                # errorcount == 0.
+                if errorcount == 0 or session.errorok:
+                    errorcount = error_count
+                    session.errorok = False
+                    errtoken = lookahead
+                    if errtoken.type == '$end':
+                        errtoken = None               # End of file!
+                    if self.errorfunc:
+                        if errtoken and not hasattr(errtoken, 'lexer'):
+                            errtoken.lexer = lexer
+                        session.state = state
+                        tok = self.errorfunc(errtoken)
+                        if session.errorok:
+                            # User must have done some kind of panic
+                            # mode recovery on their own.  The
+                            # returned token is the next lookahead
+                            lookahead = tok
+                            errtoken = None
+                            continue
+                    else:
+                        if errtoken:
+                            if hasattr(errtoken, 'lineno'):
+                                lineno = lookahead.lineno
+                            else:
+                                lineno = 0
+                            if lineno:
+                                sys.stderr.write('yacc: Syntax error at line %d, token=%s\n' % (lineno, errtoken.type))
+                            else:
+                                sys.stderr.write('yacc: Syntax error, token=%s' % errtoken.type)
+                        else:
+                            sys.stderr.write('yacc: Parse error in input. EOF\n')
+                            return
+
+                else:
+                    errorcount = error_count
+
+                # case 1:  the statestack only has 1 entry on it.  If we're in this state, the
+                # entire parse has been rolled back and we're completely hosed.   The token is
+                # discarded and we just keep going.
+
+                if len(statestack) <= 1 and lookahead.type != '$end':
+                    lookahead = None
+                    errtoken = None
+                    state = 0
+                    # Nuke the pushback stack
+                    del lookaheadstack[:]
+                    continue
+
+                # case 2: the statestack has a couple of entries on it, but we're
+                # at the end of the file. nuke the top entry and generate an error token
+
+                # Start nuking entries on the stack
+                if lookahead.type == '$end':
+                    # Whoa. We're really hosed here. Bail out
+                    return
+
+                if lookahead.type != 'error':
+                    sym = symstack[-1]
+                    if sym.type == 'error':
+                        # Hmmm. Error is on top of stack, we'll just nuke input
+                        # symbol and continue
+                        #--! TRACKING
+                        if tracking:
+                            sym.endlineno = getattr(lookahead, 'lineno', sym.lineno)
+                            sym.endlexpos = getattr(lookahead, 'lexpos', sym.lexpos)
+                        #--! TRACKING
+                        lookahead = None
+                        continue
+
+                    # Create the error symbol for the first time and make it the new lookahead symbol
+                    t = YaccSymbol()
+                    t.type = 'error'
+
+                    if hasattr(lookahead, 'lineno'):
+                        t.lineno = t.endlineno = lookahead.lineno
+                    if hasattr(lookahead, 'lexpos'):
+                        t.lexpos = t.endlexpos = lookahead.lexpos
+                    t.value = lookahead
+                    lookaheadstack.append(lookahead)
+                    lookahead = t
+                else:
+                    sym = symstack.pop()
+                    #--! TRACKING
+                    if tracking:
+                        lookahead.lineno = sym.lineno
+                        lookahead.lexpos = sym.lexpos
+                    #--! TRACKING
+                    statestack.pop()
+                    state = statestack[-1]
+
+                continue
+
+            # If we'r here, something really bad happened
+            raise RuntimeError('yacc: internal parser error!!!\n')
+        #--! parsedebug-end
+
+    # -----------------------------------------------------------------------------
+    # parseopt().
+    #
+    # Optimized version of parsedebug() with features removed.  DO NOT EDIT THIS CODE
+    # DIRECTLY!  It is automatically generated by the ygen.py script.  Make
+    # changes to the parsedebug() method instead.
+    # -----------------------------------------------------------------------------
+
+    def parseopt(self, input=None, lexer=None, debug=False, tracking=False):
+        #--! parseopt-start
+        lookahead = None                         # Current lookahead symbol
+        lookaheadstack = []                      # Stack of lookahead symbols
+        actions = self.action                    # Local reference to action table (to avoid lookup on self.)
+        goto    = self.goto                      # Local reference to goto table (to avoid lookup on self.)
+        prod    = self.productions               # Local reference to production list (to avoid lookup on self.)
+        defaulted_states = self.defaulted_states # Local reference to defaulted states
+        pslice  = YaccProduction()               # Production object passed to grammar rules
+        errorcount = 0                           # Used during error recovery
+        session = _sessions.session = LRSession(self)  # Mutable state of this parse
+
+
+        # If no lexer was given, we will try to use the lex module
+        if not lexer:
+            from . import lex
+            lexer = lex.lexer
+
+        # Set up the lexer and parser objects on pslice
+        pslice.lexer = lexer
+        pslice.parser = session
+
+        # If input was supplied, pass to lexer
+        if input is not None:
+            lexer.input(input)
+
+        # Set the token function
+        get_token = session.token = lexer.token
+
+        # Set up the state and symbol stacks
+        statestack = session.statestack     # Stack of parsing states
+        symstack = session.symstack         # Stack of grammar symbols
+        pslice.stack = symstack             # Put in the production
+        errtoken   = None                   # Err token
+
+        # The start state is assumed to be (0,$end)
+
+        statestack.append(0)
+        sym = YaccSymbol()
+        sym.type = '$end'
+        symstack.append(sym)
+        state = 0
+        while True:
+            # Get the next symbol on the input.  If a lookahead symbol
+            # is already set, we just use that. Otherwise, we'll pull
+            # the next token off of the lookaheadstack or from the lexer
+
+
+            if state not in defaulted_states:
+                if not lookahead:
+                    if not lookaheadstack:
+                        lookahead = get_token()     # Get the next token
+                    else:
+                        lookahead = lookaheadstack.pop()
+                    if not lookahead:
+                        lookahead = YaccSymbol()
+                        lookahead.type = '$end'
+
+                # Check the action table
+                ltype = lookahead.type
+                t = actions[state].get(ltype)
+            else:
+                t = defaulted_states[state]
+
+
+            if t is not None:
+                if t > 0:
+                    # shift a symbol on the stack
+                    statestack.append(t)
+                    state = t
+
+
+                    symstack.append(lookahead)
+                    lookahead = None
+
+                    # Decrease error count on successful shift
+                    if errorcount:
+                        errorcount -= 1
+                    continue
+
+                if t < 0:
+                    # reduce a symbol on the stack, emit a production
+                    p = prod[-t]
+                    pname = p.name
+                    plen  = p.len
+
+                    # Get production function
+                    sym = YaccSymbol()
+                    sym.type = pname       # Production name
+                    sym.value = None
+
+
+                    if plen:
+                        #--! TRACKING
+                        if tracking:
+                            t1 = symstack[-plen]
+                            sym.lineno = t1.lineno
+                            sym.lexpos = t1.lexpos
+                            t1 = symstack[-1]
+                            sym.endlineno = getattr(t1, 'endlineno', t1.lineno)
+                            sym.endlexpos = getattr(t1, 'endlexpos', t1.lexpos)
+                        #--! TRACKING
+
+                        # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+                        # The code enclosed in this section is duplicated
+                        # below as a performance optimization.  Make sure
+                        # changes get made in both locations.
+
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - plen - 1
+                        pslice.size = plen + 1
+
+                        try:
+                            # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                # Unrolled for the common lengths to avoid building an argument list
+                                if plen == 1:
+                                    sym.value = p.callable(symstack[-1].value)
+                                elif plen == 2:
+                                    sym.value = p.callable(symstack[-2].value, symstack[-1].value)
+                                elif plen == 3:
+                                    sym.value = p.callable(symstack[-3].value, symstack[-2].value, symstack[-1].value)
+                                else:
+                                    sym.value = p.callable(*[_v.value for _v in symstack[-plen:]])
+                            else:
+                                p.callable(pslice)
+                            del symstack[-plen:]
+                            del statestack[-plen:]
+                            symstack.append(sym)
+                            state = goto[statestack[-1]][pname]
+                            statestack.append(state)
+                        except SyntaxError:
+                            # If an error was set. Enter error recovery state
+                            lookaheadstack.append(lookahead)    # Save the current lookahead token
+                            symstack.pop()                      # Leave the rest of the production on the stack
+                            statestack.pop()                    # Pop back one state (before the reduce)
+                            state = statestack[-1]
+                            sym.type = 'error'
+                            sym.value = 'error'
+                            lookahead = sym
+                            errorcount = error_count
+                            session.errorok = False
+
+                        continue
+
+                    else:
+
+                        #--! TRACKING
+                        if tracking:
+                            sym.lineno = lexer.lineno
+                            sym.lexpos = lexer.lexpos
+                        #--! TRACKING
+
+                        # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+                        # The code enclosed in this section is duplicated
+                        # above as a performance optimization.  Make sure
+                        # changes get made in both locations.
+
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - 1
+                        pslice.size = 1
+
+                        try:
+                            # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                sym.value = p.callable()
+                            else:
+                                p.callable(pslice)
+                            symstack.append(sym)
+                            state = goto[statestack[-1]][pname]
+                            statestack.append(state)
+                        except SyntaxError:
+                            # If an error was set. Enter error recovery state
+                            lookaheadstack.append(lookahead)    # Save the current lookahead token
+                            statestack.pop()                    # Pop back one state (before the reduce)
+                            state = statestack[-1]
+                            sym.type = 'error'
+                            sym.value = 'error'
+                            lookahead = sym
+                            errorcount = error_count
+                            session.errorok = False
+
+                        continue
+
+                if t == 0:
+                    n = symstack[-1]
+                    result = getattr(n, 'value', None)
+
+
+                    return result
+
+            if t is None:
+
+
+                # We have some kind of parsing error here.  To handle
+                # this, we are going to push the current token onto
+                # the tokenstack and replace it with an 'error' token.
+                # If there are any synchronization rules, they may
+                # catch it.
+                #
+                # In addition to pushing the error token, we call call
+                # the user defined p_error() function if this is the
+                # first syntax error.  This function is only called if
+                # errorcount == 0.
+                if errorcount == 0 or session.errorok:
+                    errorcount = error_count
+                    session.errorok = False
+                    errtoken = lookahead
+                    if errtoken.type == '$end':
+                        errtoken = None               # End of file!
+                    if self.errorfunc:
+                        if errtoken and not hasattr(errtoken, 'lexer'):
+                            errtoken.lexer = lexer
+                        session.state = state
+                        tok = self.errorfunc(errtoken)
+                        if session.errorok:
+                            # User must have done some kind of panic
+                            # mode recovery on their own.  The
+                            # returned token is the next lookahead
+                            lookahead = tok
+                            errtoken = None
+                            continue
+                    else:
+                        if errtoken:
+                            if hasattr(errtoken, 'lineno'):
+                                lineno = lookahead.lineno
+                            else:
+                                lineno = 0
+                            if lineno:
+                                sys.stderr.write('yacc: Syntax error at line %d, token=%s\n' % (lineno, errtoken.type))
+                            else:
+                                sys.stderr.write('yacc: Syntax error, token=%s' % errtoken.type)
+                        else:
+                            sys.stderr.write('yacc: Parse error in input. EOF\n')
+                            return
+
+                else:
+                    errorcount = error_count
+
+                # case 1:  the statestack only has 1 entry on it.  If we're in this state, the
+                # entire parse has been rolled back and we're completely hosed.   The token is
+                # discarded and we just keep going.
+
+                if len(statestack) <= 1 and lookahead.type != '$end':
+                    lookahead = None
+                    errtoken = None
+                    state = 0
+                    # Nuke the pushback stack
+                    del lookaheadstack[:]
+                    continue
+
+                # case 2: the statestack has a couple of entries on it, but we're
+                # at the end of the file. nuke the top entry and generate an error token
+
+                # Start nuking entries on the stack
+                if lookahead.type == '$end':
+                    # Whoa. We're really hosed here. Bail out
+                    return
+
+                if lookahead.type != 'error':
+                    sym = symstack[-1]
+                    if sym.type == 'error':
+                        # Hmmm. Error is on top of stack, we'll just nuke input
+                        # symbol and continue
+                        #--! TRACKING
+                        if tracking:
+                            sym.endlineno = getattr(lookahead, 'lineno', sym.lineno)
+                            sym.endlexpos = getattr(lookahead, 'lexpos', sym.lexpos)
+                        #--! TRACKING
+                        lookahead = None
+                        continue
+
+                    # Create the error symbol for the first time and make it the new lookahead symbol
+                    t = YaccSymbol()
+                    t.type = 'error'
+
+                    if hasattr(lookahead, 'lineno'):
+                        t.lineno = t.endlineno = lookahead.lineno
+                    if hasattr(lookahead, 'lexpos'):
+                        t.lexpos = t.endlexpos = lookahead.lexpos
+                    t.value = lookahead
+                    lookaheadstack.append(lookahead)
+                    lookahead = t
+                else:
+                    sym = symstack.pop()
+                    #--! TRACKING
+                    if tracking:
+                        lookahead.lineno = sym.lineno
+                        lookahead.lexpos = sym.lexpos
+                    #--! TRACKING
+                    statestack.pop()
+                    state = statestack[-1]
+
+                continue
+
+            # If we'r here, something really bad happened
+            raise RuntimeError('yacc: internal parser error!!!\n')
+        #--! parseopt-end
+
+    # -----------------------------------------------------------------------------
+    # parseopt_notrack().
+    #
+    # Optimized version of parsedebug() with features removed.  DO NOT EDIT THIS CODE
+    # DIRECTLY!  It is automatically generated by the ygen.py script.  Make
+    # changes to the parsedebug() method instead.
+    # -----------------------------------------------------------------------------
+
+    def parseopt_notrack(self, input=None, lexer=None, debug=False, tracking=False):
+        #--! parseopt-notrack-start
+        lookahead = None                         # Current lookahead symbol
+        lookaheadstack = []                      # Stack of lookahead symbols
+        actions = self.action                    # Local reference to action table (to avoid lookup on self.)
+        goto    = self.goto                      # Local reference to goto table (to avoid lookup on self.)
+        prod    = self.productions               # Local reference to production list (to avoid lookup on self.)
+        defaulted_states = self.defaulted_states # Local reference to defaulted states
+        pslice  = YaccProduction()               # Production object passed to grammar rules
+        errorcount = 0                           # Used during error recovery
+        session = _sessions.session = LRSession(self)  # Mutable state of this parse
+
+
+        # If no lexer was given, we will try to use the lex module
+        if not lexer:
+            from . import lex
+            lexer = lex.lexer
+
+        # Set up the lexer and parser objects on pslice
+        pslice.lexer = lexer
+        pslice.parser = session
+
+        # If input was supplied, pass to lexer
+        if input is not None:
+            lexer.input(input)
+
+        # Set the token function
+        get_token = session.token = lexer.token
+
+        # Set up the state and symbol stacks
+        statestack = session.statestack     # Stack of parsing states
+        symstack = session.symstack         # Stack of grammar symbols
+        pslice.stack = symstack             # Put in the production
+        errtoken   = None                   # Err token
+
+        # The start state is assumed to be (0,$end)
+
+        statestack.append(0)
+        sym = YaccSymbol()
+        sym.type = '$end'
+        symstack.append(sym)
+        state = 0
+        while True:
+            # Get the next symbol on the input.  If a lookahead symbol
+            # is already set, we just use that. Otherwise, we'll pull
+            # the next token off of the lookaheadstack or from the lexer
+
+
+            if state not in defaulted_states:
+                if not lookahead:
+                    if not lookaheadstack:
+                        lookahead = get_token()     # Get the next token
+                    else:
+                        lookahead = lookaheadstack.pop()
+                    if not lookahead:
+                        lookahead = YaccSymbol()
+                        lookahead.type = '$end'
+
+                # Check the action table
+                ltype = lookahead.type
+                t = actions[state].get(ltype)
+            else:
+                t = defaulted_states[state]
+
+
+            if t is not None:
+                if t > 0:
+                    # shift a symbol on the stack
+                    statestack.append(t)
+                    state = t
+
+
+                    symstack.append(lookahead)
+                    lookahead = None
+
+                    # Decrease error count on successful shift
+                    if errorcount:
+                        errorcount -= 1
+                    continue
+
+                if t < 0:
+                    # reduce a symbol on the stack, emit a production
+                    p = prod[-t]
+                    pname = p.name
+                    plen  = p.len
+
+                    # Get production function
+                    sym = YaccSymbol()
+                    sym.type = pname       # Production name
+                    sym.value = None
+
+
+                    if plen:
+
+                        # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+                        # The code enclosed in this section is duplicated
+                        # below as a performance optimization.  Make sure
+                        # changes get made in both locations.
+
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - plen - 1
+                        pslice.size = plen + 1
+
+                        try:
+                            # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                # Unrolled for the common lengths to avoid building an argument list
+                                if plen == 1:
+                                    sym.value = p.callable(symstack[-1].value)
+                                elif plen == 2:
+                                    sym.value = p.callable(symstack[-2].value, symstack[-1].value)
+                                elif plen == 3:
+                                    sym.value = p.callable(symstack[-3].value, symstack[-2].value, symstack[-1].value)
+                                else:
+                                    sym.value = p.callable(*[_v.value for _v in symstack[-plen:]])
+                            else:
+                                p.callable(pslice)
+                            del symstack[-plen:]
+                            del statestack[-plen:]
+                            symstack.append(sym)
+                            state = goto[statestack[-1]][pname]
+                            statestack.append(state)
+                        except SyntaxError:
+                            # If an error was set. Enter error recovery state
+                            lookaheadstack.append(lookahead)    # Save the current lookahead token
+                            symstack.pop()                      # Leave the rest of the production on the stack
+                            statestack.pop()                    # Pop back one state (before the reduce)
+                            state = statestack[-1]
+                            sym.type = 'error'
+                            sym.value = 'error'
+                            lookahead = sym
+                            errorcount = error_count
+                            session.errorok = False
+
+                        continue
+
+                    else:
+
+
+                        # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+                        # The code enclosed in this section is duplicated
+                        # above as a performance optimization.  Make sure
+                        # changes get made in both locations.
+
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - 1
+                        pslice.size = 1
+
+                        try:
+                            # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                sym.value = p.callable()
+                            else:
+                                p.callable(pslice)
+                            symstack.append(sym)
+                            state = goto[statestack[-1]][pname]
+                            statestack.append(state)
+                        except SyntaxError:
+                            # If an error was set. Enter error recovery state
+                            lookaheadstack.append(lookahead)    # Save the current lookahead token
+                            statestack.pop()                    # Pop back one state (before the reduce)
+                            state = statestack[-1]
+                            sym.type = 'error'
+                            sym.value = 'error'
+                            lookahead = sym
+                            errorcount = error_count
+                            session.errorok = False
+
+                        continue
+
+                if t == 0:
+                    n = symstack[-1]
+                    result = getattr(n, 'value', None)
+
+
+                    return result
+
+            if t is None:
+
+
+                # We have some kind of parsing error here.  To handle
+                # this, we are going to push the current token onto
+                # the tokenstack and replace it with an 'error' token.
+                # If there are any synchronization rules, they may
+                # catch it.
+                #
+                # In addition to pushing the error token, we call call
+                # the user defined p_error() function if this is the
+                # first syntax error.  This function is only called if
+                # errorcount == 0.
+                if errorcount == 0 or session.errorok:
+                    errorcount = error_count
+                    session.errorok = False
+                    errtoken = lookahead
+                    if errtoken.type == '$end':
+                        errtoken = None               # End of file!
+                    if self.errorfunc:
+                        if errtoken and not hasattr(errtoken, 'lexer'):
+                            errtoken.lexer = lexer
+                        session.state = state
+                        tok = self.errorfunc(errtoken)
+                        if session.errorok:
+                            # User must have done some kind of panic
+                            # mode recovery on their own.  The
+                            # returned token is the next lookahead
+                            lookahead = tok
+                            errtoken = None
+                            continue
+                    else:
+                        if errtoken:
+                            if hasattr(errtoken, 'lineno'):
+                                lineno = lookahead.lineno
+                            else:
+                                lineno = 0
+                            if lineno:
+                                sys.stderr.write('yacc: Syntax error at line %d, token=%s\n' % (lineno, errtoken.type))
+                            else:
+                                sys.stderr.write('yacc: Syntax error, token=%s' % errtoken.type)
+                        else:
+                            sys.stderr.write('yacc: Parse error in input. EOF\n')
+                            return
+
+                else:
+                    errorcount = error_count
+
+                # case 1:  the statestack only has 1 entry on it.  If we're in this state, the
+                # entire parse has been rolled back and we're completely hosed.   The token is
+                # discarded and we just keep going.
+
+                if len(statestack) <= 1 and lookahead.type != '$end':
+                    lookahead = None
+                    errtoken = None
+                    state = 0
+                    # Nuke the pushback stack
+                    del lookaheadstack[:]
+                    continue
+
+                # case 2: the statestack has a couple of entries on it, but we're
+                # at the end of the file. nuke the top entry and generate an error token
+
+                # Start nuking entries on the stack
+                if lookahead.type == '$end':
+                    # Whoa. We're really hosed here. Bail out
+                    return
+
+                if lookahead.type != 'error':
+                    sym = symstack[-1]
+                    if sym.type == 'error':
+                        # Hmmm. Error is on top of stack, we'll just nuke input
+                        # symbol and continue
+                        lookahead = None
+                        continue
+
+                    # Create the error symbol for the first time and make it the new lookahead symbol
+                    t = YaccSymbol()
+                    t.type = 'error'
+
+                    if hasattr(lookahead, 'lineno'):
+                        t.lineno = t.endlineno = lookahead.lineno
+                    if hasattr(lookahead, 'lexpos'):
+                        t.lexpos = t.endlexpos = lookahead.lexpos
+                    t.value = lookahead
+                    lookaheadstack.append(lookahead)
+                    lookahead = t
+                else:
+                    sym = symstack.pop()
+                    statestack.pop()
+                    state = statestack[-1]
+
+                continue
+
+            # If we'r here, something really bad happened
+            raise RuntimeError('yacc: internal parser error!!!\n')
+        #--! parseopt-notrack-end
+
+    # -----------------------------------------------------------------------------
+    # parsepackeddebug().
+    #
+    # The same engine as parsedebug(), working on the integer-coded tables of an
+    # LRPackedTable.  This is the master copy for parsepackedopt() and
+    # parsepackedopt_notrack(), which are generated from it by ygen.py.  Changes to
+    # the parsing algorithm must be made both here and in parsedebug().
+    # -----------------------------------------------------------------------------
+
+    def parsepackeddebug(self, input=None, lexer=None, debug=False, tracking=False):
+        #--! parsepackeddebug-start
+        lookahead = None                         # Current lookahead symbol
+        lookaheadstack = []                      # Stack of lookahead symbols
+        packed  = self.packed                    # Integer-coded tables
+        actions = packed.action                  # Flat action table
+        acheck  = packed.action_check if packed.compressed else None  # Owning state of each slot (compressed)
+        abase   = packed.action_base             # Offset of each state's row in actions
+        adefault = packed.action_default         # Default action of each state
+        goto    = packed.goto                    # Flat goto table
+        gbase   = packed.goto_base               # Offset of each state's row in goto
+        termcodes = packed.termcodes             # Terminal name -> column
+        unknown = packed.unknown                 # Column for tokens not used by the grammar
+        prodcodes = packed.prodcodes             # Rule number -> goto column of its left hand side
+        prod    = self.productions               # Local reference to production list (to avoid lookup on self.)
+        defaulted_states = self.packed_defaulted # Defaulted reduction for each state (0 if none)
+        pslice  = YaccProduction()               # Production object passed to grammar rules
+        errorcount = 0                           # Used during error recovery
+        session = _sessions.session = LRSession(self)  # Mutable state of this parse
+
+        #--! DEBUG
+        debug.info('PLY: PARSE DEBUG START')
+        #--! DEBUG
+
+        # If no lexer was given, we will try to use the lex module
+        if not lexer:
+            from . import lex
+            lexer = lex.lexer
+
+        # Set up the lexer and parser objects on pslice
+        pslice.lexer = lexer
+        pslice.parser = session
+
+        # If input was supplied, pass to lexer
+        if input is not None:
+            lexer.input(input)
+
+        # Set the token function
+        get_token = session.token = lexer.token
+
+        # Set up the state and symbol stacks
+        statestack = session.statestack     # Stack of parsing states
+        symstack = session.symstack         # Stack of grammar symbols
+        pslice.stack = symstack             # Put in the production
+        errtoken   = None                   # Err token
+
+        # The start state is assumed to be (0,$end)
+
+        statestack.append(0)
+        sym = YaccSymbol()
+        sym.type = '$end'
+        symstack.append(sym)
+        state = 0
+        while True:
+            # Get the next symbol on the input.  If a lookahead symbol
+            # is already set, we just use that. Otherwise, we'll pull
+            # the next token off of the lookaheadstack or from the lexer
+
+            #--! DEBUG
+            debug.debug('State  : %s', state)
+            #--! DEBUG
+
+            t = defaulted_states[state]
+            if not t:
+                if not lookahead:
+                    if not lookaheadstack:
+                        lookahead = get_token()     # Get the next token
+                    else:
+                        lookahead = lookaheadstack.pop()
+                    if not lookahead:
+                        lookahead = YaccSymbol()
+                        lookahead.type = '$end'
+
+                # Check the action table
+                ltype = lookahead.type
+                i = abase[state] + termcodes.get(ltype, unknown)
+                if acheck is None:
+                    t = actions[i]
+                else:
+                    t = actions[i] if acheck[i] == state else adefault[state]
+            #--! DEBUG
+            else:
+                debug.debug('Defaulted state %s: Reduce using %d', state, -t)
+            #--! DEBUG
+
+            #--! DEBUG
+            debug.debug('Stack  : %s',
+                        ('%s . %s' % (' '.join([xx.type for xx in symstack][1:]), str(lookahead))).lstrip())
+            #--! DEBUG
+
+            if t != 0:
+                if t > 0 and t != ACCEPT:
+                    # shift a symbol on the stack
+                    statestack.append(t)
+                    state = t
+
+                    #--! DEBUG
+                    debug.debug('Action : Shift and goto state %s', t)
+                    #--! DEBUG
+
+                    symstack.append(lookahead)
+                    lookahead = None
+
+                    # Decrease error count on successful shift
+                    if errorcount:
+                        errorcount -= 1
+                    continue
+
+                if t < 0:
+                    # reduce a symbol on the stack, emit a production
+                    p = prod[-t]
+                    pname = p.name
+                    pcode = prodcodes[-t]
+                    plen  = p.len
+
+                    # Get production function
+                    sym = YaccSymbol()
+                    sym.type = pname       # Production name
+                    sym.value = None
+
+                    #--! DEBUG
+                    if plen:
+                        debug.info('Action : Reduce rule [%s] with %s and goto state %d', p.str,
+                                   '['+','.join([format_stack_entry(_v.value) for _v in symstack[-plen:]])+']',
+                                   goto[gbase[statestack[-1-plen]] + pcode])
+                    else:
+                        debug.info('Action : Reduce rule [%s] with %s and goto state %d', p.str, [],
+                                   goto[gbase[statestack[-1]] + pcode])
+                    #--! DEBUG
+
+                    if plen:
+                        #--! TRACKING
+                        if tracking:
+                            t1 = symstack[-plen]
+                            sym.lineno = t1.lineno
+                            sym.lexpos = t1.lexpos
+                            t1 = symstack[-1]
+                            sym.endlineno = getattr(t1, 'endlineno', t1.lineno)
+                            sym.endlexpos = getattr(t1, 'endlexpos', t1.lexpos)
+                        #--! TRACKING
+
+                        # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+                        # The code enclosed in this section is duplicated
+                        # below as a performance optimization.  Make sure
+                        # changes get made in both locations.
+
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - plen - 1
+                        pslice.size = plen + 1
+
+                        try:
+                            # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                # Unrolled for the common lengths to avoid building an argument list
+                                if plen == 1:
+                                    sym.value = p.callable(symstack[-1].value)
+                                elif plen == 2:
+                                    sym.value = p.callable(symstack[-2].value, symstack[-1].value)
+                                elif plen == 3:
+                                    sym.value = p.callable(symstack[-3].value, symstack[-2].value, symstack[-1].value)
+                                else:
+                                    sym.value = p.callable(*[_v.value for _v in symstack[-plen:]])
+                            else:
+                                p.callable(pslice)
+                            del symstack[-plen:]
+                            del statestack[-plen:]
+                            #--! DEBUG
+                            debug.info('Result : %s', format_result(pslice[0]))
+                            #--! DEBUG
+                            symstack.append(sym)
+                            state = goto[gbase[statestack[-1]] + pcode]
+                            statestack.append(state)
+                        except SyntaxError:
+                            # If an error was set. Enter error recovery state
+                            lookaheadstack.append(lookahead)    # Save the current lookahead token
+                            symstack.pop()                      # Leave the rest of the production on the stack
+                            statestack.pop()                    # Pop back one state (before the reduce)
+                            state = statestack[-1]
+                            sym.type = 'error'
+                            sym.value = 'error'
+                            lookahead = sym
+                            errorcount = error_count
+                            session.errorok = False
+
+                        continue
+
+                    else:
+
+                        #--! TRACKING
+                        if tracking:
+                            sym.lineno = lexer.lineno
+                            sym.lexpos = lexer.lexpos
+                        #--! TRACKING
+
+                        # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+                        # The code enclosed in this section is duplicated
+                        # above as a performance optimization.  Make sure
+                        # changes get made in both locations.
+
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - 1
+                        pslice.size = 1
+
+                        try:
+                            # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                sym.value = p.callable()
+                            else:
+                                p.callable(pslice)
+                            #--! DEBUG
+                            debug.info('Result : %s', format_result(pslice[0]))
+                            #--! DEBUG
+                            symstack.append(sym)
+                            state = goto[gbase[statestack[-1]] + pcode]
+                            statestack.append(state)
+                        except SyntaxError:
+                            # If an error was set. Enter error recovery state
+                            lookaheadstack.append(lookahead)    # Save the current lookahead token
+                            statestack.pop()                    # Pop back one state (before the reduce)
+                            state = statestack[-1]
+                            sym.type = 'error'
+                            sym.value = 'error'
+                            lookahead = sym
+                            errorcount = error_count
+                            session.errorok = False
+
+                        continue
+
+                if t == ACCEPT:
+                    n = symstack[-1]
+                    result = getattr(n, 'value', None)
+
+                    #--! DEBUG
+                    debug.info('Done   : Returning %s', format_result(result))
+                    debug.info('PLY: PARSE DEBUG END')
+                    #--! DEBUG
+
+                    return result
+
+            if t == 0:
+
+                #--! DEBUG
+                debug.error('Error  : %s',
+                            ('%s . %s' % (' '.join([xx.type for xx in symstack][1:]), str(lookahead))).lstrip())
+                #--! DEBUG
+
+                # We have some kind of parsing error here.  To handle
+                # this, we are going to push the current token onto
+                # the tokenstack and replace it with an 'error' token.
+                # If there are any synchronization rules, they may
+                # catch it.
+                #
+                # In addition to pushing the error token, we call call
+                # the user defined p_error() function if this is the
+                # first syntax error.  This function is only called if
+                # errorcount == 0.
+                if errorcount == 0 or session.errorok:
+                    errorcount = error_count
+                    session.errorok = False
+                    errtoken = lookahead
+                    if errtoken.type == '$end':
+                        errtoken = None               # End of file!
+                    if self.errorfunc:
+                        if errtoken and not hasattr(errtoken, 'lexer'):
+                            errtoken.lexer = lexer
+                        session.state = state
+                        tok = self.errorfunc(errtoken)
+                        if session.errorok:
+                            # User must have done some kind of panic
+                            # mode recovery on their own.  The
+                            # returned token is the next lookahead
+                            lookahead = tok
+                            errtoken = None
+                            continue
+                    else:
+                        if errtoken:
+                            if hasattr(errtoken, 'lineno'):
+                                lineno = lookahead.lineno
+                            else:
+                                lineno = 0
+                            if lineno:
+                                sys.stderr.write('yacc: Syntax error at line %d, token=%s\n' % (lineno, errtoken.type))
+                            else:
+                                sys.stderr.write('yacc: Syntax error, token=%s' % errtoken.type)
+                        else:
+                            sys.stderr.write('yacc: Parse error in input. EOF\n')
+                            return
+
+                else:
+                    errorcount = error_count
+
+                # case 1:  the statestack only has 1 entry on it.  If we're in this state, the
+                # entire parse has been rolled back and we're completely hosed.   The token is
+                # discarded and we just keep going.
+
+                if len(statestack) <= 1 and lookahead.type != '$end':
+                    lookahead = None
+                    errtoken = None
+                    state = 0
+                    # Nuke the pushback stack
+                    del lookaheadstack[:]
+                    continue
+
+                # case 2: the statestack has a couple of entries on it, but we're
+                # at the end of the file. nuke the top entry and generate an error token
+
+                # Start nuking entries on the stack
+                if lookahead.type == '$end':
+                    # Whoa. We're really hosed here. Bail out
+                    return
+
+                if lookahead.type != 'error':
+                    sym = symstack[-1]
+                    if sym.type == 'error':
+                        # Hmmm. Error is on top of stack, we'll just nuke input
+                        # symbol and continue
+                        #--! TRACKING
+                        if tracking:
+                            sym.endlineno = getattr(lookahead, 'lineno', sym.lineno)
+                            sym.endlexpos = getattr(lookahead, 'lexpos', sym.lexpos)
+                        #--! TRACKING
+                        lookahead = None
+                        continue
+
+                    # Create the error symbol for the first time and make it the new lookahead symbol
+                    t = YaccSymbol()
+                    t.type = 'error'
+
+                    if hasattr(lookahead, 'lineno'):
+                        t.lineno = t.endlineno = lookahead.lineno
+                    if hasattr(lookahead, 'lexpos'):
+                        t.lexpos = t.endlexpos = lookahead.lexpos
+                    t.value = lookahead
+                    lookaheadstack.append(lookahead)
+                    lookahead = t
+                else:
+                    sym = symstack.pop()
+                    #--! TRACKING
+                    if tracking:
+                        lookahead.lineno = sym.lineno
+                        lookahead.lexpos = sym.lexpos
+                    #--! TRACKING
+                    statestack.pop()
+                    state = statestack[-1]
+
+                continue
+
+            # If we'r here, something really bad happened
+            raise RuntimeError('yacc: internal parser error!!!\n')
+        #--! parsepackeddebug-end
+
+    # -----------------------------------------------------------------------------
+    # parsepackedopt().
+    #
+    # Optimized version of parsepackeddebug() with features removed.  DO NOT EDIT THIS CODE
+    # DIRECTLY!  It is automatically generated by the ygen.py script.  Make
+    # changes to the parsepackeddebug() method instead.
+    # -----------------------------------------------------------------------------
+
+    def parsepackedopt(self, input=None, lexer=None, debug=False, tracking=False):
+        #--! parsepackedopt-start
+        lookahead = None                         # Current lookahead symbol
+        lookaheadstack = []                      # Stack of lookahead symbols
+        packed  = self.packed                    # Integer-coded tables
+        actions = packed.action                  # Flat action table
+        acheck  = packed.action_check if packed.compressed else None  # Owning state of each slot (compressed)
+        abase   = packed.action_base             # Offset of each state's row in actions
+        adefault = packed.action_default         # Default action of each state
+        goto    = packed.goto                    # Flat goto table
+        gbase   = packed.goto_base               # Offset of each state's row in goto
+        termcodes = packed.termcodes             # Terminal name -> column
+        unknown = packed.unknown                 # Column for tokens not used by the grammar
+        prodcodes = packed.prodcodes             # Rule number -> goto column of its left hand side
+        prod    = self.productions               # Local reference to production list (to avoid lookup on self.)
+        defaulted_states = self.packed_defaulted # Defaulted reduction for each state (0 if none)
+        pslice  = YaccProduction()               # Production object passed to grammar rules
+        errorcount = 0                           # Used during error recovery
+        session = _sessions.session = LRSession(self)  # Mutable state of this parse
+
+
+        # If no lexer was given, we will try to use the lex module
+        if not lexer:
+            from . import lex
+            lexer = lex.lexer
+
+        # Set up the lexer and parser objects on pslice
+        pslice.lexer = lexer
+        pslice.parser = session
+
+        # If input was supplied, pass to lexer
+        if input is not None:
+            lexer.input(input)
+
+        # Set the token function
+        get_token = session.token = lexer.token
+
+        # Set up the state and symbol stacks
+        statestack = session.statestack     # Stack of parsing states
+        symstack = session.symstack         # Stack of grammar symbols
+        pslice.stack = symstack             # Put in the production
+        errtoken   = None                   # Err token
+
+        # The start state is assumed to be (0,$end)
+
+        statestack.append(0)
+        sym = YaccSymbol()
+        sym.type = '$end'
+        symstack.append(sym)
+        state = 0
+        while True:
+            # Get the next symbol on the input.  If a lookahead symbol
+            # is already set, we just use that. Otherwise, we'll pull
+            # the next token off of the lookaheadstack or from the lexer
+
+
+            t = defaulted_states[state]
+            if not t:
+                if not lookahead:
+                    if not lookaheadstack:
+                        lookahead = get_token()     # Get the next token
+                    else:
+                        lookahead = lookaheadstack.pop()
+                    if not lookahead:
+                        lookahead = YaccSymbol()
+                        lookahead.type = '$end'
+
+                # Check the action table
+                ltype = lookahead.type
+                i = abase[state] + termcodes.get(ltype, unknown)
+                if acheck is None:
+                    t = actions[i]
+                else:
+                    t = actions[i] if acheck[i] == state else adefault[state]
+
+
+            if t != 0:
+                if t > 0 and t != ACCEPT:
+                    # shift a symbol on the stack
+                    statestack.append(t)
+                    state = t
+
+
+                    symstack.append(lookahead)
+                    lookahead = None
+
+                    # Decrease error count on successful shift
+                    if errorcount:
+                        errorcount -= 1
+                    continue
+
+                if t < 0:
+                    # reduce a symbol on the stack, emit a production
+                    p = prod[-t]
+                    pname = p.name
+                    pcode = prodcodes[-t]
+                    plen  = p.len
+
+                    # Get production function
+                    sym = YaccSymbol()
+                    sym.type = pname       # Production name
+                    sym.value = None
+
+
+                    if plen:
+                        #--! TRACKING
+                        if tracking:
+                            t1 = symstack[-plen]
+                            sym.lineno = t1.lineno
+                            sym.lexpos = t1.lexpos
+                            t1 = symstack[-1]
+                            sym.endlineno = getattr(t1, 'endlineno', t1.lineno)
+                            sym.endlexpos = getattr(t1, 'endlexpos', t1.lexpos)
+                        #--! TRACKING
+
+                        # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+                        # The code enclosed in this section is duplicated
+                        # below as a performance optimization.  Make sure
+                        # changes get made in both locations.
+
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - plen - 1
+                        pslice.size = plen + 1
+
+                        try:
+                            # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                # Unrolled for the common lengths to avoid building an argument list
+                                if plen == 1:
+                                    sym.value = p.callable(symstack[-1].value)
+                                elif plen == 2:
+                                    sym.value = p.callable(symstack[-2].value, symstack[-1].value)
+                                elif plen == 3:
+                                    sym.value = p.callable(symstack[-3].value, symstack[-2].value, symstack[-1].value)
+                                else:
+                                    sym.value = p.callable(*[_v.value for _v in symstack[-plen:]])
+                            else:
+                                p.callable(pslice)
+                            del symstack[-plen:]
+                            del statestack[-plen:]
+                            symstack.append(sym)
+                            state = goto[gbase[statestack[-1]] + pcode]
+                            statestack.append(state)
+                        except SyntaxError:
+                            # If an error was set. Enter error recovery state
+                            lookaheadstack.append(lookahead)    # Save the current lookahead token
+                            symstack.pop()                      # Leave the rest of the production on the stack
+                            statestack.pop()                    # Pop back one state (before the reduce)
+                            state = statestack[-1]
+                            sym.type = 'error'
+                            sym.value = 'error'
+                            lookahead = sym
+                            errorcount = error_count
+                            session.errorok = False
+
+                        continue
+
+                    else:
+
+                        #--! TRACKING
+                        if tracking:
+                            sym.lineno = lexer.lineno
+                            sym.lexpos = lexer.lexpos
+                        #--! TRACKING
+
+                        # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+                        # The code enclosed in this section is duplicated
+                        # above as a performance optimization.  Make sure
+                        # changes get made in both locations.
+
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - 1
+                        pslice.size = 1
+
+                        try:
+                            # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                sym.value = p.callable()
+                            else:
+                                p.callable(pslice)
+                            symstack.append(sym)
+                            state = goto[gbase[statestack[-1]] + pcode]
+                            statestack.append(state)
+                        except SyntaxError:
+                            # If an error was set. Enter error recovery state
+                            lookaheadstack.append(lookahead)    # Save the current lookahead token
+                            statestack.pop()                    # Pop back one state (before the reduce)
+                            state = statestack[-1]
+                            sym.type = 'error'
+                            sym.value = 'error'
+                            lookahead = sym
+                            errorcount = error_count
+                            session.errorok = False
+
+                        continue
+
+                if t == ACCEPT:
+                    n = symstack[-1]
+                    result = getattr(n, 'value', None)
+
+
+                    return result
+
+            if t == 0:
+
+
+                # We have some kind of parsing error here.  To handle
+                # this, we are going to push the current token onto
+                # the tokenstack and replace it with an 'error' token.
+                # If there are any synchronization rules, they may
+                # catch it.
+                #
+                # In addition to pushing the error token, we call call
+                # the user defined p_error() function if this is the
+                # first syntax error.  This function is only called if
+                # errorcount == 0.
+                if errorcount == 0 or session.errorok:
+                    errorcount = error_count
+                    session.errorok = False
+                    errtoken = lookahead
+                    if errtoken.type == '$end':
+                        errtoken = None               # End of file!
+                    if self.errorfunc:
+                        if errtoken and not hasattr(errtoken, 'lexer'):
+                            errtoken.lexer = lexer
+                        session.state = state
+                        tok = self.errorfunc(errtoken)
+                        if session.errorok:
+                            # User must have done some kind of panic
+                            # mode recovery on their own.  The
+                            # returned token is the next lookahead
+                            lookahead = tok
+                            errtoken = None
+                            continue
+                    else:
+                        if errtoken:
+                            if hasattr(errtoken, 'lineno'):
+                                lineno = lookahead.lineno
+                            else:
+                                lineno = 0
+                            if lineno:
+                                sys.stderr.write('yacc: Syntax error at line %d, token=%s\n' % (lineno, errtoken.type))
+                            else:
+                                sys.stderr.write('yacc: Syntax error, token=%s' % errtoken.type)
+                        else:
+                            sys.stderr.write('yacc: Parse error in input. EOF\n')
+                            return
+
+                else:
+                    errorcount = error_count
+
+                # case 1:  the statestack only has 1 entry on it.  If we're in this state, the
+                # entire parse has been rolled back and we're completely hosed.   The token is
+                # discarded and we just keep going.
+
+                if len(statestack) <= 1 and lookahead.type != '$end':
+                    lookahead = None
+                    errtoken = None
+                    state = 0
+                    # Nuke the pushback stack
+                    del lookaheadstack[:]
+                    continue
+
+                # case 2: the statestack has a couple of entries on it, but we're
+                # at the end of the file. nuke the top entry and generate an error token
+
+                # Start nuking entries on the stack
+                if lookahead.type == '$end':
+                    # Whoa. We're really hosed here. Bail out
+                    return
+
+                if lookahead.type != 'error':
+                    sym = symstack[-1]
+                    if sym.type == 'error':
+                        # Hmmm. Error is on top of stack, we'll just nuke input
+                        # symbol and continue
+                        #--! TRACKING
+                        if tracking:
+                            sym.endlineno = getattr(lookahead, 'lineno', sym.lineno)
+                            sym.endlexpos = getattr(lookahead, 'lexpos', sym.lexpos)
+                        #--! TRACKING
+                        lookahead = None
+                        continue
+
+                    # Create the error symbol for the first time and make it the new lookahead symbol
+                    t = YaccSymbol()
+                    t.type = 'error'
+
+                    if hasattr(lookahead, 'lineno'):
+                        t.lineno = t.endlineno = lookahead.lineno
+                    if hasattr(lookahead, 'lexpos'):
+                        t.lexpos = t.endlexpos = lookahead.lexpos
+                    t.value = lookahead
+                    lookaheadstack.append(lookahead)
+                    lookahead = t
+                else:
+                    sym = symstack.pop()
+                    #--! TRACKING
+                    if tracking:
+                        lookahead.lineno = sym.lineno
+                        lookahead.lexpos = sym.lexpos
+                    #--! TRACKING
+                    statestack.pop()
+                    state = statestack[-1]
 
-    # Defaulted state support.
-    # This method identifies parser states where there is only one possible reduction action.
-    # For such states, the parser can make a choose to make a rule reduction without consuming
-    # the next look-ahead token.  This delayed invocation of the tokenizer can be useful in
-    # certain kinds of advanced parsing situations where the lexer and parser interact with
-    # each other or change states (i.e., manipulation of scope, lexer states, etc.).
-    #
-    # See:  http://www.gnu.org/software/bison/manual/html_node/Default-Reductions.html#Default-Reductions
-    def set_defaulted_states(self):
-        self.defaulted_states = {}
-        for state, actions in self.action.items():
-            rules = list(actions.values())
-            if len(rules) == 1 and rules[0] < 0:
-                self.defaulted_states[state] = rules[0]
+                continue
 
-    def disable_defaulted_states(self):
-        self.defaulted_states = {}
+            # If we'r here, something really bad happened
+            raise RuntimeError('yacc: internal parser error!!!\n')
+        #--! parsepackedopt-end
 
-    # parse().
+    # -----------------------------------------------------------------------------
+    # parsepackedopt_notrack().
     #
-    # This is the core parsing engine.  To operate, it requires a lexer object.
-    # Two options are provided.  The debug flag turns on debugging so that you can
-    # see the various rule reductions and parsing steps.  tracking turns on position
-    # tracking.  In this mode, symbols will record the starting/ending line number and
-    # character index.
-
-    def parse(self, input=None, lexer=None, debug=False, tracking=False):
-        # If debugging has been specified as a flag, turn it into a logging object
-        if isinstance(debug, int) and debug:
-            debug = PlyLogger(sys.stderr)
+    # Optimized version of parsepackeddebug() with features removed.  DO NOT EDIT THIS CODE
+    # DIRECTLY!  It is automatically generated by the ygen.py script.  Make
+    # changes to the parsepackeddebug() method instead.
+    # -----------------------------------------------------------------------------
 
+    def parsepackedopt_notrack(self, input=None, lexer=None, debug=False, tracking=False):
+        #--! parsepackedopt-notrack-start
         lookahead = None                         # Current lookahead symbol
         lookaheadstack = []                      # Stack of lookahead symbols
-        actions = self.action                    # Local reference to action table (to avoid lookup on self.)
-        goto    = self.goto                      # Local reference to goto table (to avoid lookup on self.)
+        packed  = self.packed                    # Integer-coded tables
+        actions = packed.action                  # Flat action table
+        acheck  = packed.action_check if packed.compressed else None  # Owning state of each slot (compressed)
+        abase   = packed.action_base             # Offset of each state's row in actions
+        adefault = packed.action_default         # Default action of each state
+        goto    = packed.goto                    # Flat goto table
+        gbase   = packed.goto_base               # Offset of each state's row in goto
+        termcodes = packed.termcodes             # Terminal name -> column
+        unknown = packed.unknown                 # Column for tokens not used by the grammar
+        prodcodes = packed.prodcodes             # Rule number -> goto column of its left hand side
         prod    = self.productions               # Local reference to production list (to avoid lookup on self.)
-        defaulted_states = self.defaulted_states # Local reference to defaulted states
-        pslice  = YaccProduction(None)           # Production object passed to grammar rules
+        defaulted_states = self.packed_defaulted # Defaulted reduction for each state (0 if none)
+        pslice  = YaccProduction()               # Production object passed to grammar rules
         errorcount = 0                           # Used during error recovery
+        session = _sessions.session = LRSession(self)  # Mutable state of this parse
 
-        if debug:
-            debug.info('PLY: PARSE DEBUG START')
 
         # If no lexer was given, we will try to use the lex module
         if not lexer:
@@ -294,18 +2370,18 @@ class LRParser:
 
         # Set up the lexer and parser objects on pslice
         pslice.lexer = lexer
-        pslice.parser = self
+        pslice.parser = session
 
         # If input was supplied, pass to lexer
         if input is not None:
             lexer.input(input)
 
         # Set the token function
-        get_token = self.token = lexer.token
+        get_token = session.token = lexer.token
 
         # Set up the state and symbol stacks
-        statestack = self.statestack = []   # Stack of parsing states
-        symstack = self.symstack = []       # Stack of grammar symbols
+        statestack = session.statestack     # Stack of parsing states
+        symstack = session.symstack         # Stack of grammar symbols
         pslice.stack = symstack             # Put in the production
         errtoken   = None                   # Err token
 
@@ -321,10 +2397,9 @@ class LRParser:
             # is already set, we just use that. Otherwise, we'll pull
             # the next token off of the lookaheadstack or from the lexer
 
-            if debug:
-                debug.debug('State  : %s', state)
 
-            if state not in defaulted_states:
+            t = defaulted_states[state]
+            if not t:
                 if not lookahead:
                     if not lookaheadstack:
                         lookahead = get_token()     # Get the next token
@@ -336,24 +2411,19 @@ class LRParser:
 
                 # Check the action table
                 ltype = lookahead.type
-                t = actions[state].get(ltype)
-            else:
-                t = defaulted_states[state]
-                if debug:
-                    debug.debug('Defaulted state %s: Reduce using %d', state, -t)
+                i = abase[state] + termcodes.get(ltype, unknown)
+                if acheck is None:
+                    t = actions[i]
+                else:
+                    t = actions[i] if acheck[i] == state else adefault[state]
 
-            if debug:
-                debug.debug('Stack  : %s',
-                            ('%s . %s' % (' '.join([xx.type for xx in symstack][1:]), str(lookahead))).lstrip())
 
-            if t is not None:
-                if t > 0:
+            if t != 0:
+                if t > 0 and t != ACCEPT:
                     # shift a symbol on the stack
                     statestack.append(t)
                     state = t
 
-                    if debug:
-                        debug.debug('Action : Shift and goto state %s', t)
 
                     symstack.append(lookahead)
                     lookahead = None
@@ -367,6 +2437,7 @@ class LRParser:
                     # reduce a symbol on the stack, emit a production
                     p = prod[-t]
                     pname = p.name
+                    pcode = prodcodes[-t]
                     plen  = p.len
 
                     # Get production function
@@ -374,82 +2445,73 @@ class LRParser:
                     sym.type = pname       # Production name
                     sym.value = None
 
-                    if debug:
-                        if plen:
-                            debug.info('Action : Reduce rule [%s] with %s and goto state %d', p.str,
-                                       '['+','.join([format_stack_entry(_v.value) for _v in symstack[-plen:]])+']',
-                                       goto[statestack[-1-plen]][pname])
-                        else:
-                            debug.info('Action : Reduce rule [%s] with %s and goto state %d', p.str, [],
-                                       goto[statestack[-1]][pname])
 
                     if plen:
-                        targ = symstack[-plen-1:]
-                        targ[0] = sym
-
-                        if tracking:
-                            t1 = targ[1]
-                            sym.lineno = t1.lineno
-                            sym.lexpos = t1.lexpos
-                            t1 = targ[-1]
-                            sym.endlineno = getattr(t1, 'endlineno', t1.lineno)
-                            sym.endlexpos = getattr(t1, 'endlexpos', t1.lexpos)
 
                         # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
                         # The code enclosed in this section is duplicated
                         # below as a performance optimization.  Make sure
                         # changes get made in both locations.
 
-                        pslice.slice = targ
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - plen - 1
+                        pslice.size = plen + 1
 
                         try:
                             # Call the grammar rule with our special slice object
+                            session.state = state
+                            if p.positional:
+                                # Unrolled for the common lengths to avoid building an argument list
+                                if plen == 1:
+                                    sym.value = p.callable(symstack[-1].value)
+                                elif plen == 2:
+                                    sym.value = p.callable(symstack[-2].value, symstack[-1].value)
+                                elif plen == 3:
+                                    sym.value = p.callable(symstack[-3].value, symstack[-2].value, symstack[-1].value)
+                                else:
+                                    sym.value = p.callable(*[_v.value for _v in symstack[-plen:]])
+                            else:
+                                p.callable(pslice)
                             del symstack[-plen:]
-                            self.state = state
-                            p.callable(pslice)
                             del statestack[-plen:]
-                            if debug:
-                                debug.info('Result : %s', format_result(pslice[0]))
                             symstack.append(sym)
-                            state = goto[statestack[-1]][pname]
+                            state = goto[gbase[statestack[-1]] + pcode]
                             statestack.append(state)
                         except SyntaxError:
                             # If an error was set. Enter error recovery state
                             lookaheadstack.append(lookahead)    # Save the current lookahead token
-                            symstack.extend(targ[1:-1])         # Put the production slice back on the stack
+                            symstack.pop()                      # Leave the rest of the production on the stack
                             statestack.pop()                    # Pop back one state (before the reduce)
                             state = statestack[-1]
                             sym.type = 'error'
                             sym.value = 'error'
                             lookahead = sym
                             errorcount = error_count
-                            self.errorok = False
+                            session.errorok = False
 
                         continue
 
                     else:
 
-                        if tracking:
-                            sym.lineno = lexer.lineno
-                            sym.lexpos = lexer.lexpos
-
-                        targ = [sym]
 
                         # !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
                         # The code enclosed in this section is duplicated
                         # above as a performance optimization.  Make sure
                         # changes get made in both locations.
 
-                        pslice.slice = targ
+                        pslice.sym = sym
+                        pslice.base = len(symstack) - 1
+                        pslice.size = 1
 
                         try:
                             # Call the grammar rule with our special slice object
-                            self.state = state
-                            p.callable(pslice)
-                            if debug:
-                                debug.info('Result : %s', format_result(pslice[0]))
+                            session.state = state
+                            if p.positional:
+                                sym.value = p.callable()
+                            else:
+                                p.callable(pslice)
                             symstack.append(sym)
-                            state = goto[statestack[-1]][pname]
+                            state = goto[gbase[statestack[-1]] + pcode]
                             statestack.append(state)
                         except SyntaxError:
                             # If an error was set. Enter error recovery state
@@ -460,25 +2522,19 @@ class LRParser:
                             sym.value = 'error'
                             lookahead = sym
                             errorcount = error_count
-                            self.errorok = False
+                            session.errorok = False
 
                         continue
 
-                if t == 0:
+                if t == ACCEPT:
                     n = symstack[-1]
                     result = getattr(n, 'value', None)
 
-                    if debug:
-                        debug.info('Done   : Returning %s', format_result(result))
-                        debug.info('PLY: PARSE DEBUG END')
 
                     return result
 
-            if t is None:
+            if t == 0:
 
-                if debug:
-                    debug.error('Error  : %s',
-                                ('%s . %s' % (' '.join([xx.type for xx in symstack][1:]), str(lookahead))).lstrip())
 
                 # We have some kind of parsing error here.  To handle
                 # this, we are going to push the current token onto
@@ -490,18 +2546,18 @@ class LRParser:
                 # the user defined p_error() function if this is the
                 # first syntax error.  This function is only called if
                 # errorcount == 0.
-                if errorcount == 0 or self.errorok:
+                if errorcount == 0 or session.errorok:
                     errorcount = error_count
-                    self.errorok = False
+                    session.errorok = False
                     errtoken = lookahead
                     if errtoken.type == '$end':
                         errtoken = None               # End of file!
                     if self.errorfunc:
                         if errtoken and not hasattr(errtoken, 'lexer'):
                             errtoken.lexer = lexer
-                        self.state = state
+                        session.state = state
                         tok = self.errorfunc(errtoken)
-                        if self.errorok:
+                        if session.errorok:
                             # User must have done some kind of panic
                             # mode recovery on their own.  The
                             # returned token is the next lookahead
@@ -550,9 +2606,6 @@ class LRParser:
                     if sym.type == 'error':
                         # Hmmm. Error is on top of stack, we'll just nuke input
                         # symbol and continue
-                        if tracking:
-                            sym.endlineno = getattr(lookahead, 'lineno', sym.lineno)
-                            sym.endlexpos = getattr(lookahead, 'lexpos', sym.lexpos)
                         lookahead = None
                         continue
 
@@ -569,9 +2622,6 @@ class LRParser:
                     lookahead = t
                 else:
                     sym = symstack.pop()
-                    if tracking:
-                        lookahead.lineno = sym.lineno
-                        lookahead.lexpos = sym.lexpos
                     statestack.pop()
                     state = statestack[-1]
 
@@ -579,6 +2629,7 @@ class LRParser:
 
             # If we'r here, something really bad happened
             raise RuntimeError('yacc: internal parser error!!!\n')
+        #--! parsepackedopt-notrack-end
 
 # -----------------------------------------------------------------------------
 #                          === Grammar Representation ===
@@ -612,6 +2663,8 @@ _is_identifier = re.compile(r'^[a-zA-Z0-9_-]+$')
 #
 #       len       - Length of the production (number of symbols on right hand side)
 #       usyms     - Set of unique symbols found in the production
+#       positional - True if the function takes the right hand side values as
+#                    arguments (see @positional)
 # -----------------------------------------------------------------------------
 
 class Production(object):
@@ -622,6 +2675,7 @@ class Production(object):
         self.number   = number
         self.func     = func
         self.callable = None
+        self.positional = False
         self.file     = file
         self.line     = line
         self.prec     = precedence
@@ -681,6 +2735,38 @@ class Production(object):
     def bind(self, pdict):
         if self.func:
             self.callable = pdict[self.func]
+            self.positional = getattr(self.callable, 'positional', False)
+
+# -----------------------------------------------------------------------------
+# class MiniProduction
+#
+# A stripped-down version of Production that is used when parsing tables are
+# read back from a file.  It only carries the information needed by the parsing
+# engine at runtime.
+# -----------------------------------------------------------------------------
+
+class MiniProduction(object):
+    def __init__(self, str, name, len, func, file, line):
+        self.name     = name
+        self.len      = len
+        self.func     = func
+        self.callable = None
+        self.positional = False
+        self.file     = file
+        self.line     = line
+        self.str      = str
+
+    def __str__(self):
+        return self.str
+
+    def __repr__(self):
+        return 'MiniProduction(%s)' % self.str
+
+    # Bind the production function name to a callable
+    def bind(self, pdict):
+        if self.func:
+            self.callable = pdict[self.func]
+            self.positional = getattr(self.callable, 'positional', False)
 
 # -----------------------------------------------------------------------------
 # class LRItem
@@ -704,6 +2790,7 @@ class Production(object):
 #       len        - Length of the production (number of symbols on right hand side)
 #       lr_after    - List of all productions that immediately follow
 #       lr_before   - Grammar symbol immediately before
+#       lr_id       - Unique number of the item (index in Grammar.LRItems)
 # -----------------------------------------------------------------------------
 
 class LRItem(object):
@@ -779,6 +2866,11 @@ class Grammar(object):
 
         self.Follow       = {}      # A dictionary of precomputed FOLLOW(x) symbols
 
+        self.SetSymbols   = []      # Symbol names for the bits of the bitsets below
+        self.EmptySet     = 0       # Bitset holding just '<empty>'
+        self.FirstSets    = {}      # FIRST(x) as a bitset
+        self.FollowSets   = {}      # FOLLOW(x) as a bitset
+
         self.Precedence   = {}      # Precedence rules for each terminal. Contains tuples of the
                                     # form ('right',level) or ('nonassoc', level) or ('left',level)
 
@@ -788,6 +2880,8 @@ class Grammar(object):
 
         self.Start = None           # Starting symbol for the grammar
 
+        self.LRItems = []           # All LR items, indexed by LRItem.lr_id
+
 
     def __len__(self):
         return len(self.Productions)
@@ -1073,76 +3167,142 @@ class Grammar(object):
         return unused
 
     # -------------------------------------------------------------------------
-    # _first()
+    # set_list()
     #
-    # Compute the value of FIRST1(beta) where beta is a tuple of symbols.
+    # FIRST and FOLLOW sets are computed as bitsets held in Python integers.  Bit i
+    # of a set stands for the symbol SetSymbols[i]: every terminal in the order
+    # they were declared, then '$end' and finally '<empty>'.  This function turns
+    # a bitset back into a list of symbol names.
+    # -------------------------------------------------------------------------
+    def set_list(self, bits):
+        names = self.SetSymbols
+        result = []
+        while bits:
+            low = bits & -bits
+            result.append(names[low.bit_length() - 1])
+            bits ^= low
+        return result
+
+    # -------------------------------------------------------------------------
+    # set_bits()
     #
-    # During execution of compute_first1, the result may be incomplete.
-    # Afterward (e.g., when called from compute_follow()), it will be complete.
+    # The reverse of set_list().  Turns a list of terminals into a bitset.
     # -------------------------------------------------------------------------
-    def _first(self, beta):
+    def set_bits(self, symbols):
+        first = self.FirstSets
+        bits = 0
+        for s in symbols:
+            bits |= first[s]
+        return bits
 
-        # We are computing First(x1,x2,x3,...,xn)
-        result = []
+    # -------------------------------------------------------------------------
+    # _first_set()
+    #
+    # Compute the value of FIRST1(beta) as a bitset where beta is a tuple of
+    # symbols.  The FIRST sets of all symbols in beta must already be known.
+    # -------------------------------------------------------------------------
+    def _first_set(self, beta):
+        first = self.FirstSets
+        empty = self.EmptySet
+        result = 0
         for x in beta:
-            x_produces_empty = False
-
-            # Add all the non-<empty> symbols of First[x] to the result.
-            for f in self.First[x]:
-                if f == '<empty>':
-                    x_produces_empty = True
-                else:
-                    if f not in result:
-                        result.append(f)
+            f = first[x]
+            if not f & empty:
+                return result | f
+            # x can produce empty, so the next symbol in beta has to be
+            # considered as well
+            result |= f ^ empty
 
-            if x_produces_empty:
-                # We have to consider the next x in beta,
-                # i.e. stay in the loop.
-                pass
-            else:
-                # We don't have to consider any further symbols in beta.
-                break
-        else:
-            # There was no 'break' from the loop,
-            # so x_produces_empty was true for all x in beta,
-            # so beta produces empty as well.
-            result.append('<empty>')
+        # All symbols in beta produce empty, so beta produces empty as well
+        return result | empty
 
-        return result
+    # -------------------------------------------------------------------------
+    # _first()
+    #
+    # Compute the value of FIRST1(beta) where beta is a tuple of symbols.  The
+    # result is a list of symbol names.  Only valid after compute_first().
+    # -------------------------------------------------------------------------
+    def _first(self, beta):
+        return self.set_list(self._first_set(beta))
 
     # -------------------------------------------------------------------------
     # compute_first()
     #
-    # Compute the value of FIRST1(X) for all symbols
+    # Compute the value of FIRST1(X) for all symbols.  The nullable nonterminals
+    # are found first by counting down the symbols of each production not yet
+    # known to be nullable.  The terminals that can begin each nonterminal are then
+    # collected in one pass over the productions, together with the inclusions
+    # FIRST(X) <= FIRST(A) implied by productions A -> ... X ..., and propagated
+    # along those inclusions with a worklist.
     # -------------------------------------------------------------------------
     def compute_first(self):
         if self.First:
             return self.First
 
-        # Terminals:
-        for t in self.Terminals:
-            self.First[t] = [t]
-
-        self.First['$end'] = ['$end']
-
-        # Nonterminals:
-
-        # Initialize to the empty set:
-        for n in self.Nonterminals:
-            self.First[n] = []
+        # Terminals and $end get one bit each, <empty> the highest bit
+        self.SetSymbols = list(self.Terminals) + ['$end', '<empty>']
+        empty = self.EmptySet = 1 << (len(self.SetSymbols) - 1)
+        first = self.FirstSets = {}
+        for i, t in enumerate(self.SetSymbols[:-1]):
+            first[t] = 1 << i
+
+        nonterminals = self.Nonterminals
+        productions = [p for n in nonterminals for p in self.Prodnames.get(n, [])]
+
+        # Find the nullable nonterminals.  Productions that contain a terminal can
+        # never produce empty and are left out.
+        remaining = {}                            # Production number -> symbols not known to be nullable
+        users = {n: [] for n in nonterminals}     # Nonterminal -> productions it appears in
+        work = []
+        for p in productions:
+            if all(s in nonterminals for s in p.prod):
+                remaining[p.number] = len(p.prod)
+                for s in p.prod:
+                    users[s].append(p)
+                if not p.prod:
+                    work.append(p.name)
 
-        # Then propagate symbols until no change:
-        while True:
-            some_change = False
-            for n in self.Nonterminals:
-                for p in self.Prodnames[n]:
-                    for f in self._first(p.prod):
-                        if f not in self.First[n]:
-                            self.First[n].append(f)
-                            some_change = True
-            if not some_change:
+        nullable = set()
+        while work:
+            n = work.pop()
+            if n in nullable:
+                continue
+            nullable.add(n)
+            for p in users[n]:
+                remaining[p.number] -= 1
+                if not remaining[p.number]:
+                    work.append(p.name)
+
+        # Collect the leading terminals of each nonterminal and the inclusions
+        # between the FIRST sets of nonterminals
+        includes = {n: set() for n in nonterminals}   # X -> nonterminals A with FIRST(X) <= FIRST(A)
+        for n in nonterminals:
+            first[n] = empty if n in nullable else 0
+        for p in productions:
+            for s in p.prod:
+                if s in nonterminals:
+                    includes[s].add(p.name)
+                    if s in nullable:
+                        continue
+                else:
+                    first[p.name] |= first[s]
                 break
 
+        # Then propagate symbols along the inclusions until no change
+        work = [n for n in nonterminals if first[n] & ~empty]
+        while work:
+            x = work.pop()
+            fx = first[x] & ~empty
+            for n in includes[x]:
+                if fx & ~first[n]:
+                    first[n] |= fx
+                    work.append(n)
+
+        for t in self.SetSymbols[:-1]:
+            self.First[t] = [t]
+        for n in nonterminals:
+            self.First[n] = self.set_list(first[n])
+
         return self.First
 
     # ---------------------------------------------------------------------
@@ -1151,6 +3311,10 @@ class Grammar(object):
     # Computes all of the follow sets for every non-terminal symbol.  The
     # follow set is the set of all symbols that might follow a given
     # non-terminal.  See the Dragon book, 2nd Ed. p. 189.
+    #
+    # Each production A -> alpha B beta is scanned once from the right to add
+    # FIRST(beta) to FOLLOW(B) and, when beta can produce empty, to record that
+    # FOLLOW(A) <= FOLLOW(B).  The inclusions are then propagated with a worklist.
     # ---------------------------------------------------------------------
     def compute_follow(self, start=None):
         # If already computed, return the result
@@ -1161,38 +3325,43 @@ class Grammar(object):
         if not self.First:
             self.compute_first()
 
-        # Add '$end' to the follow list of the start symbol
-        for k in self.Nonterminals:
-            self.Follow[k] = []
+        first = self.FirstSets
+        empty = self.EmptySet
+        nonterminals = self.Nonterminals
+        follow = self.FollowSets = {k: 0 for k in nonterminals}
+        includes = {k: set() for k in nonterminals}   # A -> nonterminals B with FOLLOW(A) <= FOLLOW(B)
 
         if not start:
             start = self.Productions[1].name
 
-        self.Follow[start] = ['$end']
-
-        while True:
-            didadd = False
-            for p in self.Productions[1:]:
-                # Here is the production set
-                for i, B in enumerate(p.prod):
-                    if B in self.Nonterminals:
-                        # Okay. We got a non-terminal in a production
-                        fst = self._first(p.prod[i+1:])
-                        hasempty = False
-                        for f in fst:
-                            if f != '<empty>' and f not in self.Follow[B]:
-                                self.Follow[B].append(f)
-                                didadd = True
-                            if f == '<empty>':
-                                hasempty = True
-                        if hasempty or i == (len(p.prod)-1):
-                            # Add elements of follow(a) to follow(b)
-                            for f in self.Follow[p.name]:
-                                if f not in self.Follow[B]:
-                                    self.Follow[B].append(f)
-                                    didadd = True
-            if not didadd:
-                break
+        # Add '$end' to the follow list of the start symbol
+        follow[start] = first['$end']
+
+        for p in self.Productions[1:]:
+            # FIRST of the symbols to the right of the current position
+            rest = empty
+            for B in reversed(p.prod):
+                fb = first[B]
+                if B in nonterminals:
+                    follow[B] |= rest & ~empty
+                    if rest & empty:
+                        includes[p.name].add(B)
+                if fb & empty:
+                    rest |= fb ^ empty
+                else:
+                    rest = fb
+
+        work = [k for k in nonterminals if follow[k]]
+        while work:
+            a = work.pop()
+            fa = follow[a]
+            for b in includes[a]:
+                if fa & ~follow[b]:
+                    follow[b] |= fa
+                    work.append(b)
+
+        for k in nonterminals:
+            self.Follow[k] = self.set_list(follow[k])
         return self.Follow
 
 
@@ -1201,7 +3370,7 @@ class Grammar(object):
     #
     # This function walks the list of productions and builds a complete set of the
     # LR items.  The LR items are stored in two ways:  First, they are uniquely
-    # numbered and placed in the list _lritems.  Second, a linked list of LR items
+    # numbered and placed in the list LRItems.  Second, a linked list of LR items
     # is built for each production.  For example:
     #
     #   E -> E PLUS E
@@ -1212,6 +3381,7 @@ class Grammar(object):
     # -----------------------------------------------------------------------------
 
     def build_lritems(self):
+        self.LRItems = []
         for p in self.Productions:
             lastlri = p
             i = 0
@@ -1234,11 +3404,84 @@ class Grammar(object):
                 lastlri.lr_next = lri
                 if not lri:
                     break
+                lri.lr_id = len(self.LRItems)
+                self.LRItems.append(lri)
                 lr_items.append(lri)
                 lastlri = lri
                 i += 1
             p.lr_items = lr_items
 
+# -----------------------------------------------------------------------------
+#                            == LRCachedTable ==
+#
+# This class represents parsing tables that were previously written to disk by
+# LRTable.pickle_table().  Loading them skips the entire LALR construction.
+# -----------------------------------------------------------------------------
+
+class LRCachedTable:
+    def __init__(self):
+        self.lr_action = None
+        self.lr_goto = None
+        self.lr_productions = None
+        self.lr_packed = None
+
+    # Read the tables from a pickle file.  Returns the grammar signature that
+    # was stored along with the tables.  Raises VersionError if the file was
+    # written by an incompatible version of PLY.
+    def read_pickle(self, filename):
+        with open(filename, 'rb') as in_f:
+            tabversion = pickle.load(in_f)
+            if tabversion != __tabversion__:
+                raise VersionError('yacc table file version is out of date')
+            signature      = pickle.load(in_f)
+            self.lr_action = pickle.load(in_f)
+            self.lr_goto   = pickle.load(in_f)
+            productions    = pickle.load(in_f)
+
+        self.lr_productions = []
+        for p in productions:
+            self.lr_productions.append(MiniProduction(*p))
+
+        return signature
+
+    # Read the tables from a module written by LRTable.write_table().  module
+    # is either an already imported module or the filename of the module.
+    def read_table(self, module):
+        if isinstance(module, types.ModuleType):
+            parsetab = module
+        else:
+            name = os.path.splitext(os.path.basename(module))[0]
+            spec = importlib.util.spec_from_file_location(name, module)
+            parsetab = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(parsetab)
+
+        if parsetab._tabversion != __tabversion__:
+            raise VersionError('yacc table file version is out of date')
+
+        self.lr_action = dict(enumerate(parsetab._lr_action))
+        self.lr_goto = dict(enumerate(parsetab._lr_goto))
+
+        self.lr_productions = []
+        for p in parsetab._lr_productions:
+            self.lr_productions.append(MiniProduction(*p))
+
+        return parsetab._lr_signature
+
+    # Map the tables of a binary file written by LRTable.write_binary().  Only
+    # the packed tables are available afterwards.  lr_action and lr_goto stay
+    # None.
+    def read_binary(self, filename):
+        self.lr_packed = LRMappedTable(filename)
+        self.lr_productions = []
+        for p in self.lr_packed.productions:
+            self.lr_productions.append(MiniProduction(*p))
+        return self.lr_packed.signature
+
+    # Bind all production function names to callable objects in pdict
+    def bind_callables(self, pdict):
+        for p in self.lr_productions:
+            p.bind(pdict)
+
 # -----------------------------------------------------------------------------
 #                           === LR Generator ===
 #
@@ -1248,9 +3491,8 @@ class Grammar(object):
 
 # -----------------------------------------------------------------------------
 # digraph()
-# traverse()
 #
-# The following two functions are used to compute set valued functions
+# The following function is used to compute set valued functions
 # of the form:
 #
 #     F(x) = F'(x) U U{F(y) | x R y}
@@ -1261,41 +3503,61 @@ class Grammar(object):
 # Inputs:  X    - An input set
 #          R    - A relation
 #          FP   - Set-valued function
+#
+# The sets are bitsets held in Python integers (see Grammar.set_list()), so
+# a union is a single "|".  The strongly connected components of R are found
+# with the algorithm of DeRemer and Pennello (a variant of Tarjan's algorithm).
+# The depth-first search keeps its own stack of pending relations instead of
+# recursing, so long chains in R can't exceed the Python recursion limit.  Each
+# element and each relation pair is visited once.
 # ------------------------------------------------------------------------------
 
 def digraph(X, R, FP):
-    N = {}
-    for x in X:
-        N[x] = 0
+    N = dict.fromkeys(X, 0)
     stack = []
     F = {}
     for x in X:
-        if N[x] == 0:
-            traverse(x, N, stack, F, X, R, FP)
-    return F
+        if N[x]:
+            continue
 
-def traverse(x, N, stack, F, X, R, FP):
-    stack.append(x)
-    d = len(stack)
-    N[x] = d
-    F[x] = FP(x)             # F(X) <- F'(x)
-
-    rel = R(x)               # Get y's related to x
-    for y in rel:
-        if N[y] == 0:
-            traverse(y, N, stack, F, X, R, FP)
-        N[x] = min(N[x], N[y])
-        for a in F.get(y, []):
-            if a not in F[x]:
-                F[x].append(a)
-    if N[x] == d:
-        N[stack[-1]] = MAXINT
-        F[stack[-1]] = F[x]
-        element = stack.pop()
-        while element != x:
-            N[stack[-1]] = MAXINT
-            F[stack[-1]] = F[x]
-            element = stack.pop()
+        # Start a depth-first search at x.  Each entry in calls is a node
+        # that is being traversed, its depth and the rest of its relations.
+        stack.append(x)
+        N[x] = len(stack)
+        F[x] = FP(x)                     # F(X) <- F'(x)
+        calls = [(x, len(stack), iter(R(x)))]
+        while calls:
+            x, d, rel = calls[-1]
+            for y in rel:
+                if N[y] == 0:
+                    # Traverse y first and come back for the rest of rel
+                    stack.append(y)
+                    N[y] = len(stack)
+                    F[y] = FP(y)
+                    calls.append((y, len(stack), iter(R(y))))
+                    break
+                if N[y] < N[x]:
+                    N[x] = N[y]
+                F[x] |= F[y]
+            else:
+                # All of the relations of x are done
+                calls.pop()
+                if N[x] == d:
+                    # x is the root of a strongly connected component.  All of
+                    # its members get the same set.
+                    fx = F[x]
+                    while True:
+                        element = stack.pop()
+                        N[element] = MAXINT
+                        F[element] = fx
+                        if element == x:
+                            break
+                if calls:
+                    parent = calls[-1][0]
+                    if N[x] < N[parent]:
+                        N[parent] = N[x]
+                    F[parent] |= F[x]
+    return F
 
 class LALRError(YaccError):
     pass
@@ -1321,10 +3583,7 @@ class LRTable:
         self.lr_action     = {}        # Action table
         self.lr_goto       = {}        # Goto table
         self.lr_productions  = grammar.Productions    # Copy of grammar Production array
-        self.lr_goto_cache = {}        # Cache of computed gotos
-        self.lr0_cidhash   = {}        # Cache of closures
-
-        self._add_count    = 0         # Internal counter used to detect cycles
+        self.lr0_transitions = []      # LR(0) transitions: state -> {symbol: state}
 
         # Diagnostic information filled in by the table generator
         self.sr_conflict   = 0
@@ -1345,96 +3604,92 @@ class LRTable:
         for p in self.lr_productions:
             p.bind(pdict)
 
-    # Compute the LR(0) closure operation on I, where I is a set of LR(0) items.
-
-    def lr0_closure(self, I):
-        self._add_count += 1
-
-        # Add everything in I to J
-        J = I[:]
-        didadd = True
-        while didadd:
-            didadd = False
-            for j in J:
-                for x in j.lr_after:
-                    if getattr(x, 'lr0_added', 0) == self._add_count:
-                        continue
-                    # Add B --> .G to J
-                    J.append(x.lr_next)
-                    x.lr0_added = self._add_count
-                    didadd = True
-
-        return J
-
-    # Compute the LR(0) goto function goto(I,X) where I is a set
-    # of LR(0) items and X is a grammar symbol.   This function is written
-    # in a way that guarantees uniqueness of the generated goto sets
-    # (i.e. the same goto set will never be returned as two different Python
-    # objects).  With uniqueness, we can later do fast set comparisons using
-    # id(obj) instead of element-wise comparison.
-
-    def lr0_goto(self, I, x):
-        # First we look for a previously cached entry
-        g = self.lr_goto_cache.get((id(I), x))
-        if g:
-            return g
-
-        # Now we generate the goto set in a way that guarantees uniqueness
-        # of the result
-
-        s = self.lr_goto_cache.get(x)
-        if not s:
-            s = {}
-            self.lr_goto_cache[x] = s
-
-        gs = []
-        for p in I:
-            n = p.lr_next
-            if n and n.lr_before == x:
-                s1 = s.get(id(n))
-                if not s1:
-                    s1 = {}
-                    s[id(n)] = s1
-                gs.append(n)
-                s = s1
-        g = s.get('$end')
-        if not g:
-            if gs:
-                g = self.lr0_closure(gs)
-                s['$end'] = g
-            else:
-                s['$end'] = gs
-        self.lr_goto_cache[(id(I), x)] = g
-        return g
+    # -----------------------------------------------------------------------------
+    # lr0_items()
+    #
+    # Compute the canonical collection of LR(0) item sets.  Items are handled by
+    # their number (LRItem.lr_id).  The kernel of each item set is identified by a
+    # bitset of item numbers held in a Python integer, so that a goto that leads
+    # to an existing set is found with a single dictionary lookup.
+    #
+    # Returns a list of states, each a list of LRItem objects: the kernel items
+    # followed by the closure items in the order they were added.  The goto
+    # function is recorded in self.lr0_transitions, where lr0_transitions[i][X] is
+    # the state reached from state i on grammar symbol X.
+    # -----------------------------------------------------------------------------
 
-    # Compute the LR(0) sets of item function
     def lr0_items(self):
-        C = [self.lr0_closure([self.grammar.Productions[0].lr_next])]
-        i = 0
-        for I in C:
-            self.lr0_cidhash[id(I)] = i
-            i += 1
-
-        # Loop over the items in C and each grammar symbols
+        lritems = self.grammar.LRItems
+
+        # For each item, the symbol after the "." and the item that results from
+        # moving the "." over it (None for items with the "." at the end), the
+        # initial items of the productions of that symbol, and the symbols whose
+        # goto sets have to be looked at
+        nextsym = []
+        nextitem = []
+        after = []
+        usyms = []
+        for item in lritems:
+            n = item.lr_next
+            nextsym.append(n.lr_before if n else None)
+            nextitem.append(n.lr_id if n else None)
+            after.append([p.lr_next.lr_id for p in item.lr_after])
+            usyms.append(item.usyms)
+
+        # LR(0) closure of a list of kernel items.  Every production is added at
+        # most once, through its initial item.
+        def closure(kernel):
+            J = list(kernel)
+            added = set()
+            for j in J:
+                for x in after[j]:
+                    if x not in added:
+                        added.add(x)
+                        J.append(x)
+            return J
+
+        start = self.grammar.Productions[0].lr_next.lr_id
+        states = [closure([start])]
+        kernels = {1 << start: 0}
+        transitions = self.lr0_transitions = [{}]
+
+        # Loop over the states and the grammar symbols that can follow the "."
         i = 0
-        while i < len(C):
-            I = C[i]
+        while i < len(states):
+            I = states[i]
+            trans = transitions[i]
             i += 1
 
-            # Collect all of the symbols that could possibly be in the goto(I,X) sets
-            asyms = {}
-            for ii in I:
-                for s in ii.usyms:
-                    asyms[s] = None
-
-            for x in asyms:
-                g = self.lr0_goto(I, x)
-                if not g or id(g) in self.lr0_cidhash:
-                    continue
-                self.lr0_cidhash[id(g)] = len(C)
-                C.append(g)
-
-        return C
+            # Collect the kernels of the goto(I,X) sets
+            gotos = {}
+            for j in I:
+                x = nextsym[j]
+                if x is not None:
+                    if x in gotos:
+                        gotos[x].append(nextitem[j])
+                    else:
+                        gotos[x] = [nextitem[j]]
+
+            # New states are numbered in the order of the symbols of the
+            # productions in I
+            seen = set()
+            for j in I:
+                for x in usyms[j]:
+                    if x in seen or x not in gotos:
+                        continue
+                    seen.add(x)
+                    kernel = gotos[x]
+                    key = 0
+                    for k in kernel:
+                        key |= 1 << k
+                    g = kernels.get(key)
+                    if g is None:
+                        g = kernels[key] = len(states)
+                        states.append(closure(kernel))
+                        transitions.append({})
+                    trans[x] = g
+
+        return [[lritems[j] for j in I] for I in states]
 
     # -----------------------------------------------------------------------------
     #                       ==== LALR(1) Parsing ====
@@ -1460,27 +3715,14 @@ class LRTable:
     # -----------------------------------------------------------------------------
     # compute_nullable_nonterminals()
     #
-    # Creates a dictionary containing all of the non-terminals that might produce
-    # an empty production.
+    # Creates a set containing all of the non-terminals that might produce
+    # an empty production.  These are found by Grammar.compute_first().
     # -----------------------------------------------------------------------------
 
     def compute_nullable_nonterminals(self):
-        nullable = set()
-        num_nullable = 0
-        while True:
-            for p in self.grammar.Productions[1:]:
-                if p.len == 0:
-                    nullable.add(p.name)
-                    continue
-                for t in p.prod:
-                    if t not in nullable:
-                        break
-                else:
-                    nullable.add(p.name)
-            if len(nullable) == num_nullable:
-                break
-            num_nullable = len(nullable)
-        return nullable
+        first = self.grammar.FirstSets
+        empty = self.grammar.EmptySet
+        return set(n for n in self.grammar.Nonterminals if first[n] & empty)
 
     # -----------------------------------------------------------------------------
     # find_nonterminal_trans(C)
@@ -1494,15 +3736,14 @@ class LRTable:
     # -----------------------------------------------------------------------------
 
     def find_nonterminal_transitions(self, C):
-        trans = []
+        trans = {}
         for stateno, state in enumerate(C):
             for p in state:
                 if p.lr_index < p.len - 1:
                     t = (stateno, p.prod[p.lr_index+1])
                     if t[1] in self.grammar.Nonterminals:
-                        if t not in trans:
-                            trans.append(t)
-        return trans
+                        trans[t] = None
+        return list(trans)
 
     # -----------------------------------------------------------------------------
     # dr_relation()
@@ -1517,7 +3758,7 @@ class LRTable:
         state, N = trans
         terms = []
 
-        g = self.lr0_goto(C[state], N)
+        g = C[self.lr0_transitions[state][N]]
         for p in g:
             if p.lr_index < p.len - 1:
                 a = p.prod[p.lr_index+1]
@@ -1542,8 +3783,8 @@ class LRTable:
         rel = []
         state, N = trans
 
-        g = self.lr0_goto(C[state], N)
-        j = self.lr0_cidhash.get(id(g), -1)
+        j = self.lr0_transitions[state][N]
+        g = C[j]
         for p in g:
             if p.lr_index < p.len - 1:
                 a = p.prod[p.lr_index + 1]
@@ -1623,8 +3864,7 @@ class LRTable:
                             # Appears to be a relation between (j,t) and (state,N)
                             includes.append((j, t))
 
-                    g = self.lr0_goto(C[j], t)               # Go to next set
-                    j = self.lr0_cidhash.get(id(g), -1)      # Go to next state
+                    j = self.lr0_transitions[j].get(t, -1)   # Go to next state
 
                 # When we get here, j is the final state, now we have to locate the production
                 for r in C[j]:
@@ -1657,11 +3897,11 @@ class LRTable:
     #          ntrans   = Set of nonterminal transitions
     #          nullable = Set of empty transitions
     #
-    # Returns a set containing the read sets
+    # Returns a dictionary mapping each transition to its read set as a bitset
     # -----------------------------------------------------------------------------
 
     def compute_read_sets(self, C, ntrans, nullable):
-        FP = lambda x: self.dr_relation(C, x, nullable)
+        FP = lambda x: self.grammar.set_bits(self.dr_relation(C, x, nullable))
         R =  lambda x: self.reads_relation(C, x, nullable)
         F = digraph(ntrans, R, FP)
         return F
@@ -1679,7 +3919,7 @@ class LRTable:
     #            readsets   = Readset (previously computed)
     #            inclsets   = Include sets (previously computed)
     #
-    # Returns a set containing the follow sets
+    # Returns a dictionary mapping each transition to its follow set as a bitset
     # -----------------------------------------------------------------------------
 
     def compute_follow_sets(self, ntrans, readsets, inclsets):
@@ -1701,15 +3941,18 @@ class LRTable:
     # -----------------------------------------------------------------------------
 
     def add_lookaheads(self, lookbacks, followset):
+        # Collect the lookaheads of each item as a bitset first
+        merged = {}
         for trans, lb in lookbacks.items():
+            f = followset.get(trans, 0)
             # Loop over productions in lookback
             for state, p in lb:
-                if state not in p.lookaheads:
-                    p.lookaheads[state] = []
-                f = followset.get(trans, [])
-                for a in f:
-                    if a not in p.lookaheads[state]:
-                        p.lookaheads[state].append(a)
+                key = (state, p.lr_id)
+                merged[key] = merged.get(key, 0) | f
+
+        lritems = self.grammar.LRItems
+        for (state, lr_id), f in merged.items():
+            lritems[lr_id].lookaheads[state] = self.grammar.set_list(f)
 
     # -----------------------------------------------------------------------------
     # add_lalr_lookaheads()
@@ -1838,8 +4081,7 @@ class LRTable:
                         i = p.lr_index
                         a = p.prod[i+1]       # Get symbol right after the "."
                         if a in self.grammar.Terminals:
-                            g = self.lr0_goto(I, a)
-                            j = self.lr0_cidhash.get(id(g), -1)
+                            j = self.lr0_transitions[st].get(a, -1)
                             if j >= 0:
                                 # We are in a shift state
                                 actlist.append((a, p, 'shift and go to state %d' % j))
@@ -1911,8 +4153,7 @@ class LRTable:
                     if s in self.grammar.Nonterminals:
                         nkeys[s] = None
             for n in nkeys:
-                g = self.lr0_goto(I, n)
-                j = self.lr0_cidhash.get(id(g), -1)
+                j = self.lr0_transitions[st].get(n, -1)
                 if j >= 0:
                     st_goto[n] = j
                     log.info('    %-30s shift and go to state %d', n, j)
@@ -1922,6 +4163,156 @@ class LRTable:
             goto[st] = st_goto
             st += 1
 
+    # -----------------------------------------------------------------------------
+    # saved_productions()
+    #
+    # The productions as the tuples of MiniProduction arguments that are stored
+    # in the pickle and binary table files.
+    # -----------------------------------------------------------------------------
+
+    def saved_productions(self):
+        outp = []
+        for p in self.lr_productions:
+            if p.func:
+                outp.append((p.str, p.name, p.len, p.func, os.path.basename(p.file), p.line))
+            else:
+                outp.append((str(p), p.name, len(p), None, None, None))
+        return outp
+
+    # -----------------------------------------------------------------------------
+    # pickle_table()
+    #
+    # Write the LR parsing tables to a pickle file together with the grammar
+    # signature.  The file is written under a temporary name and then renamed
+    # into place so that concurrently starting processes never see a partially
+    # written table.
+    # -----------------------------------------------------------------------------
+
+    def pickle_table(self, filename, signature=''):
+        outp = self.saved_productions()
+
+        tmpname = '%s.%d.tmp' % (filename, os.getpid())
+        try:
+            with open(tmpname, 'wb') as outf:
+                pickle.dump(__tabversion__, outf, pickle_protocol)
+                pickle.dump(signature, outf, pickle_protocol)
+                pickle.dump(self.lr_action, outf, pickle_protocol)
+                pickle.dump(self.lr_goto, outf, pickle_protocol)
+                pickle.dump(outp, outf, pickle_protocol)
+            os.replace(tmpname, filename)
+        except BaseException:
+            try:
+                os.remove(tmpname)
+            except OSError:
+                pass
+            raise
+
+    # -----------------------------------------------------------------------------
+    # write_table()
+    #
+    # Write the LR parsing tables out as a standalone Python module.  All of the
+    # tables are emitted as literals so that loading a parser afterwards is
+    # nothing more than an import (and usually just unmarshalling a cached .pyc
+    # file).  Row n of _lr_action and _lr_goto is the dict of entries for state
+    # n.  A dict display with constant keys compiles to constant tuples of
+    # keys, which load faster than a tuple of pairs passed through dict().
+    # The production functions are written by name and looked up by
+    # bind_callables(): they are often methods of the grammar object (as in
+    # Snailz), which the module has no way to refer to.
+    # -----------------------------------------------------------------------------
+
+    def write_table(self, filename, signature=''):
+        nstates = len(self.lr_action)
+
+        lines = []
+        lines.append('''
+# %s
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = %r
+
+_lr_signature = %r
+''' % (os.path.basename(filename), __tabversion__, signature))
+
+        lines.append('_lr_action = (')
+        for st in range(nstates):
+            lines.append('    %r,' % (self.lr_action[st],))
+        lines.append(')')
+        lines.append('')
+
+        lines.append('_lr_goto = (')
+        for st in range(nstates):
+            lines.append('    %r,' % (self.lr_goto[st],))
+        lines.append(')')
+        lines.append('')
+
+        lines.append('_lr_productions = (')
+        for p in self.lr_productions:
+            if p.func:
+                lines.append('    (%r, %r, %d, %r, %r, %d),' % (p.str, p.name, p.len,
+                                                              p.func, os.path.basename(p.file), p.line))
+            else:
+                lines.append('    (%r, %r, %d, None, None, None),' % (str(p), p.name, p.len))
+        lines.append(')')
+        lines.append('')
+
+        tmpname = '%s.%d.tmp' % (filename, os.getpid())
+        try:
+            with open(tmpname, 'w') as f:
+                f.write('\n'.join(lines))
+            os.replace(tmpname, filename)
+        except BaseException:
+            try:
+                os.remove(tmpname)
+            except OSError:
+                pass
+            raise
+
+    # -----------------------------------------------------------------------------
+    # write_binary()
+    #
+    # Write the LR parsing tables as a binary file for LRMappedTable.  The tables
+    # are packed as for LRParser.pack_tables() and the arrays are written out as
+    # they are in memory.  The file is replaced atomically like the other formats,
+    # so processes that still have the old file mapped are not disturbed.
+    # -----------------------------------------------------------------------------
+
+    def write_binary(self, filename, signature='', compress=False):
+        packed = LRPackedTable(self.lr_action, self.lr_goto, self.lr_productions, compress)
+        packed.prodcodes = array('i', packed.prodcodes)
+        arrays = [getattr(packed, name) for name in BINARY_ARRAYS]
+
+        header = pickle.dumps({
+            'tabversion':   __tabversion__,
+            'signature':    signature,
+            'byteorder':    sys.byteorder,
+            'itemsize':     arrays[0].itemsize,
+            'nstates':      packed.nstates,
+            'compressed':   packed.compressed,
+            'terminals':    packed.terminals,
+            'nonterminals': packed.nonterminals,
+            'productions':  self.saved_productions(),
+            'lengths':      [len(a) for a in arrays],
+        }, pickle_protocol)
+        padding = -(12 + len(header)) % 8
+
+        tmpname = '%s.%d.tmp' % (filename, os.getpid())
+        try:
+            with open(tmpname, 'wb') as outf:
+                outf.write(BINARY_MAGIC)
+                outf.write(struct.pack('<I', len(header)))
+                outf.write(header)
+                outf.write(b'\0' * padding)
+                for a in arrays:
+                    a.tofile(outf)
+            os.replace(tmpname, filename)
+        except BaseException:
+            try:
+                os.remove(tmpname)
+            except OSError:
+                pass
+            raise
+
 # -----------------------------------------------------------------------------
 #                            === INTROSPECTION ===
 #
@@ -2035,6 +4426,7 @@ class ParserReflect(object):
                 parts.append(' '.join(self.tokens))
             for f in self.pfuncs:
                 if f[3]:
+                    parts.append(f[2])
                     parts.append(f[3])
         except (TypeError, ValueError):
             pass
@@ -2217,10 +4609,11 @@ class ParserReflect(object):
                 reqargs = 2
             else:
                 reqargs = 1
-            if func.__code__.co_argcount > reqargs:
+            positional = getattr(func, 'positional', False)
+            if not positional and func.__code__.co_argcount > reqargs:
                 self.log.error('%s:%d: Rule %r has too many arguments', file, line, func.__name__)
                 self.error = True
-            elif func.__code__.co_argcount < reqargs:
+            elif not positional and func.__code__.co_argcount < reqargs:
                 self.log.error('%s:%d: Rule %r requires an argument', file, line, func.__name__)
                 self.error = True
             elif not func.__doc__:
@@ -2234,6 +4627,9 @@ class ParserReflect(object):
                 except SyntaxError as e:
                     self.log.error(str(e))
                     self.error = True
+                else:
+                    if positional:
+                        self.validate_positional(func, reqargs - 1, parsed_g)
 
                 # Looks like a valid grammar rule
                 # Mark the file in which defined.
@@ -2262,6 +4658,47 @@ class ParserReflect(object):
 
         self.grammar = grammar
 
+    # Check that a rule declared with @positional accepts as many arguments
+    # as each of its productions has symbols on the right hand side
+    def validate_positional(self, func, skip, parsed_g):
+        code = func.__code__
+        maxargs = code.co_argcount - skip
+        minargs = maxargs - len(func.__defaults__ or ())
+        varargs = code.co_flags & inspect.CO_VARARGS
+        for file, line, prodname, syms in parsed_g:
+            nsyms = syms.index('%prec') if '%prec' in syms else len(syms)
+            if nsyms < minargs or (nsyms > maxargs and not varargs):
+                self.log.error('%s:%d: Rule %r has the wrong number of arguments for %s -> %s', file, line,
+                               func.__name__, prodname, ' '.join(syms[:nsyms]) or '<empty>')
+                self.error = True
+
+# -----------------------------------------------------------------------------
+# read_saved_tables()
+#
+# Try to load previously saved parsing tables, either from a binary file, a
+# pickle file or a table module.  Returns a tuple (table, signature) or
+# (None, None) if no usable tables could be found.  Problems other than a
+# missing file are reported to errorlog.
+# -----------------------------------------------------------------------------
+
+def read_saved_tables(picklefile, tabfile, errorlog, binfile=None):
+    try:
+        lr = LRCachedTable()
+        if binfile:
+            signature = lr.read_binary(binfile)
+        elif picklefile:
+            signature = lr.read_pickle(picklefile)
+        else:
+            signature = lr.read_table(tabfile)
+        return lr, signature
+    except FileNotFoundError:
+        pass
+    except VersionError as e:
+        errorlog.warning(str(e))
+    except Exception as e:
+        errorlog.warning('There was a problem loading the table file: %r', e)
+    return None, None
+
 # -----------------------------------------------------------------------------
 # yacc(module)
 #
@@ -2270,7 +4707,8 @@ class ParserReflect(object):
 
 def yacc(*, debug=yaccdebug, module=None, start=None,
          check_recursion=True, optimize=False, debugfile=debug_file,
-         debuglog=None, errorlog=None):
+         debuglog=None, errorlog=None, picklefile=None, tabmodule=None,
+         outputdir=None, packed=False, binfile=None):
 
     # Reference to the parsing method of the last built parser
     global parse
@@ -2296,6 +4734,35 @@ def yacc(*, debug=yaccdebug, module=None, start=None,
     if start is not None:
         pdict['start'] = start
 
+    # Figure out where a table module lives.  Unless an output directory is
+    # given, it is placed next to the file that defines the grammar.
+    tabfile = None
+    if tabmodule:
+        if outputdir is None:
+            outputdir = os.path.dirname(pdict.get('__file__', ''))
+        tabfile = os.path.join(outputdir, tabmodule + '.py')
+
+    # Tables in a binary file are only usable by the packed engine.  The file
+    # is written in the layout that packed asks for.
+    if binfile and not packed:
+        packed = True
+
+    # In optimize mode, saved tables are trusted as they are.  The grammar is
+    # neither reflected nor validated, so loading a parser costs no more than
+    # reading the tables and looking up the p_ functions by name.
+    if optimize and (binfile or picklefile or tabfile):
+        lr, read_signature = read_saved_tables(picklefile, tabfile, errorlog, binfile)
+        if lr:
+            try:
+                lr.bind_callables(pdict)
+                parser = LRParser(lr, pdict.get('p_error'))
+                if packed:
+                    parser.pack_tables(packed == 'compressed')
+                parse = parser.parse
+                return parser
+            except Exception as e:
+                errorlog.warning('There was a problem loading the table file: %r', e)
+
     # Collect parser information from the dictionary
     pinfo = ParserReflect(pdict, log=errorlog)
     pinfo.get_all()
@@ -2303,6 +4770,22 @@ def yacc(*, debug=yaccdebug, module=None, start=None,
     if pinfo.error:
         raise YaccError('Unable to build parser')
 
+    # Check signature against the saved tables (if any)
+    signature = pinfo.signature()
+
+    if binfile or picklefile or tabfile:
+        lr, read_signature = read_saved_tables(picklefile, tabfile, errorlog, binfile)
+        if lr and read_signature == signature:
+            try:
+                lr.bind_callables(pinfo.pdict)
+                parser = LRParser(lr, pinfo.error_func)
+                if packed:
+                    parser.pack_tables(packed == 'compressed')
+                parse = parser.parse
+                return parser
+            except Exception as e:
+                errorlog.warning('There was a problem loading the table file: %r', e)
+
     if debuglog is None:
         if debug:
             try:
@@ -2474,9 +4957,31 @@ def yacc(*, debug=yaccdebug, module=None, start=None,
                 errorlog.warning('Rule (%s) is never reduced', rejected)
                 warned_never.append(rejected)
 
+    # Write the table file if requested
+    if binfile:
+        try:
+            lr.write_binary(binfile, signature, packed == 'compressed')
+        except IOError as e:
+            errorlog.warning("Couldn't create %r. %s" % (binfile, e))
+    elif picklefile:
+        try:
+            lr.pickle_table(picklefile, signature)
+        except IOError as e:
+            errorlog.warning("Couldn't create %r. %s" % (picklefile, e))
+    elif tabfile:
+        try:
+            lr.write_table(tabfile, signature)
+        except IOError as e:
+            errorlog.warning("Couldn't create %r. %s" % (tabfile, e))
+
     # Build the parser
     lr.bind_callables(pinfo.pdict)
     parser = LRParser(lr, pinfo.error_func)
+    if packed:
+        parser.pack_tables(packed == 'compressed')
+        debuglog.info('')
+        debuglog.info('Packed tables: %d bytes, compression ratio %.2f',
+                      parser.packed.table_size(), parser.packed.compression_ratio())
 
     parse = parser.parse
     return parser
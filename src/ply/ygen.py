@@ -0,0 +1,89 @@
+# ply: ygen.py
+#
+# This is a support program that auto-generates different versions of the YACC parsing
+# function with different features removed for the purposes of performance.
+#
+# Users should edit the methods LRParser.parsedebug() and LRParser.parsepackeddebug()
+# in yacc.py.   The source code for those methods is then used to create the other
+# methods.   See the comments in yacc.py for further details.
+
+import os.path
+
+# Each master method and the optimized versions generated from it.  The
+# first variant has the DEBUG sections removed, the second additionally
+# has the TRACKING sections removed.
+VARIANTS = [
+    ('parsedebug', 'parseopt', 'parseopt-notrack'),
+    ('parsepackeddebug', 'parsepackedopt', 'parsepackedopt-notrack'),
+]
+
+def get_source_range(lines, tag):
+    srclines = enumerate(lines)
+    start_tag = '#--! %s-start' % tag
+    end_tag = '#--! %s-end' % tag
+
+    for start_index, line in srclines:
+        if line.strip().startswith(start_tag):
+            break
+    else:
+        raise ValueError('No start marker for %r' % tag)
+
+    for end_index, line in srclines:
+        if line.strip().endswith(end_tag):
+            break
+    else:
+        raise ValueError('No end marker for %r' % tag)
+
+    return (start_index + 1, end_index)
+
+def filter_section(lines, tag):
+    filtered_lines = []
+    include = True
+    tag_text = '#--! %s' % tag
+    for line in lines:
+        if line.strip().startswith(tag_text):
+            include = not include
+        elif include:
+            filtered_lines.append(line)
+    return filtered_lines
+
+# Return the lines of yacc.py with the generated methods replaced by
+# fresh versions made from the master methods
+def generate(lines):
+    lines = list(lines)
+    sections = []
+    for master, opt, notrack in VARIANTS:
+        start, end = get_source_range(lines, master)
+
+        # Get the original source
+        orig_lines = lines[start:end]
+
+        # Filter the DEBUG sections out
+        opt_lines = filter_section(orig_lines, 'DEBUG')
+
+        # Filter the TRACKING sections out
+        notrack_lines = filter_section(opt_lines, 'TRACKING')
+
+        sections.append((get_source_range(lines, opt), opt_lines))
+        sections.append((get_source_range(lines, notrack), notrack_lines))
+
+    # Replace the parser source sections with updated versions, working from
+    # the bottom of the file up so that earlier line numbers stay valid
+    sections.sort(reverse=True)
+    for (start, end), new_lines in sections:
+        lines[start:end] = new_lines
+    return lines
+
+def main():
+    dirname = os.path.dirname(os.path.abspath(__file__))
+    filename = os.path.join(dirname, 'yacc.py')
+    with open(filename, 'r') as f:
+        lines = f.readlines()
+
+    with open(filename, 'w') as f:
+        f.writelines(generate(lines))
+
+    print('Updated yacc.py')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+# A block of code in braces is one CODE token, found by counting the braces
+# in the ccode state
+
+tokens = ('NAME', 'CODE')
+
+states = (('ccode', 'exclusive'),)
+
+t_NAME = r'[a-z]+'
+t_ignore = ' \n'
+t_ccode_ignore = ''
+
+def t_ccode(t):
+    r'\{'
+    t.lexer.code_start = t.lexer.lexpos - 1
+    t.lexer.level = 1
+    t.lexer.begin('ccode')
+
+def t_ccode_lbrace(t):
+    r'\{'
+    t.lexer.level += 1
+
+def t_ccode_rbrace(t):
+    r'\}'
+    t.lexer.level -= 1
+    if t.lexer.level == 0:
+        t.value = t.lexer.lexdata[t.lexer.code_start:t.lexer.lexpos]
+        t.type = 'CODE'
+        t.lexer.begin('INITIAL')
+        return t
+
+def t_ccode_body(t):
+    r'[^{}]+'
+
+def t_error(t):
+    t.lexer.skip(1)
+
+def t_ccode_error(t):
+    t.lexer.skip(1)
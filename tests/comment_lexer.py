@@ -0,0 +1,10 @@
+# Names and comments, for lexing comments longer than the window of a stream
+
+tokens = ('NAME',)
+
+t_NAME = r'[a-z]+'
+t_ignore = ' \n'
+t_ignore_COMMENT = r'\#[^\n]*'
+
+def t_error(t):
+    t.lexer.skip(1)
@@ -0,0 +1,25 @@
+# The names inside braces are INNER, counted in the depth attribute of the
+# lexer (which has to be set to 0 before lexing)
+
+tokens = ('NAME', 'INNER', 'LBRACE', 'RBRACE')
+
+t_ignore = ' \n'
+
+def t_LBRACE(t):
+    r'\{'
+    t.lexer.depth += 1
+    return t
+
+def t_RBRACE(t):
+    r'\}'
+    t.lexer.depth -= 1
+    return t
+
+def t_NAME(t):
+    r'[a-z]+'
+    if t.lexer.depth:
+        t.type = 'INNER'
+    return t
+
+def t_error(t):
+    t.lexer.skip(1)
@@ -0,0 +1,25 @@
+# The illegal characters come out as ERROR tokens.  The errors attribute of
+# the lexer picks how much of the input each one takes: 'char' a character,
+# 'run' the whole run of them (skip_illegal()), 'rest' a character with the
+# rest of the input as its value.
+
+tokens = ('NAME', 'NUMBER', 'ERROR')
+
+t_NAME = r'[a-z]+'
+t_ignore = ' \n'
+
+def t_NUMBER(t):
+    r'\d+'
+    t.value = int(t.value)
+    return t
+
+def t_error(t):
+    errors = getattr(t.lexer, 'errors', 'char')
+    if errors == 'run':
+        t.value = t.lexer.skip_illegal()
+    else:
+        if errors == 'char':
+            t.value = t.value[0]
+        t.lexer.skip(1)
+    t.type = 'ERROR'
+    return t
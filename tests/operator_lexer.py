@@ -0,0 +1,51 @@
+# Operators in among the string rules, in an inclusive state (which also
+# gets those of INITIAL) and in an exclusive state
+
+tokens = ('NAME', 'MINUS', 'EQUALS', 'ARROW', 'EQEQ', 'PLUS', 'LT',
+          'TAGOPEN', 'END', 'SLASH', 'TICK', 'TEXT')
+
+states = (('tag', 'inclusive'), ('raw', 'exclusive'))
+
+# Other names are not declarations, only t_keywords and t_operators are
+keywords = ('not', 'a', 'declaration')
+operators = None
+
+t_NAME = r'[a-z]+'
+t_MINUS = r'-'
+t_EQUALS = r'='
+t_ignore = ' '
+
+# -> and == are longer than the rules for - and =, so they are tried first
+t_operators = {'->': 'ARROW', '==': 'EQEQ', '+': 'PLUS', '<': 'LT'}
+
+def t_TAGOPEN(t):
+    r'<tag'
+    t.lexer.begin('tag')
+    return t
+
+t_tag_operators = {'/': 'SLASH'}
+
+def t_tag_END(t):
+    r'>'
+    t.lexer.begin('INITIAL')
+    return t
+
+def t_TICK(t):
+    r'`'
+    t.lexer.begin('raw')
+    return t
+
+t_raw_operators = {'+': 'PLUS'}
+t_raw_TEXT = r'[^`+]+'
+t_raw_ignore = ''
+
+def t_raw_TICK(t):
+    r'`'
+    t.lexer.begin('INITIAL')
+    return t
+
+def t_error(t):
+    t.lexer.skip(1)
+
+def t_raw_error(t):
+    t.lexer.skip(1)
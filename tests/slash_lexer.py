@@ -0,0 +1,15 @@
+# A block comment starts with the same character as DIVIDE, so when the
+# comment is cut off (at the end of the window of a stream, or by an edit
+# in relex()), the lexer must not take the '/' before it knows that the
+# comment doesn't end later on.
+
+tokens = ('NAME', 'DIVIDE', 'TIMES')
+
+t_ignore_COMMENT = r'/\*(.|\n)*?\*/'
+t_DIVIDE = r'/'
+t_TIMES = r'\*'
+t_NAME = r'[a-z]+'
+t_ignore = ' \n'
+
+def t_error(t):
+    t.lexer.skip(1)
@@ -0,0 +1,284 @@
+# -----------------------------------------------------------------------------
+# test_lex.py
+#
+# Checks the ways of lexing an input against Lexer.token() on the Snailz
+# rules (and on a few small specs for what Snailz doesn't have): the tokens
+# have to be the same.
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import random
+import contextlib
+
+import pytest
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+from ply import lex
+import Snailz
+
+import block_lexer
+import comment_lexer
+import depth_lexer
+import error_lexer
+import operator_lexer
+import slash_lexer
+import unrolled_lexer
+
+STATEMENTS = [
+    'total = total + value * count',
+    'while (index < limit) index = index + step',
+    'if done ThereneverisaslowerpaceThansnailscompetinginarace(result) else result = first',
+    'for (i < n i = i + 1) sum = sum + item',
+    'flag = True & !False | ready',
+    'snail = [alpha, beta, gamma, delta]',
+    'message = "a string that is longer than sixteen characters"',
+    'big = 123456789012345678901234567890',
+    'bad = $ 1 @@ 2',
+]
+
+def make_source(count, seed=1):
+    rnd = random.Random(seed)
+    return '\n'.join(rnd.choice(STATEMENTS) for _ in range(count))
+
+# The tokens of a lexer as tuples, with bytes values decoded
+def token_tuples(lexer):
+    result = []
+    for tok in lexer:
+        value = tok.value
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        result.append((tok.type, value, tok.lineno, tok.lexpos))
+    return result
+
+@pytest.fixture(scope='module', params=['re', 'dfa'])
+def snailz_spec(request):
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return lex.lex(module=Snailz.Snailz(), engine=request.param).spec
+
+def lex_string(spec, data):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return token_tuples(spec.lexer(data))
+
+# -----------------------------------------------------------------------------
+# Streaming input
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize('maxtoken', [4, 16])
+@pytest.mark.parametrize('encode', [False, True])
+def test_stream_matches_token(snailz_spec, maxtoken, encode):
+    source = make_source(500)
+    expected = lex_string(snailz_spec, source)
+    lexer = snailz_spec.lexer()
+    stream = io.BytesIO(source.encode('utf-8')) if encode else io.StringIO(source)
+    lexer.input_stream(stream, chunksize=7, maxtoken=maxtoken)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert token_tuples(lexer) == expected
+
+@pytest.mark.parametrize('engine', ['re', 'dfa'])
+def test_stream_long_ignored_match(engine):
+    spec = lex.lex(module=comment_lexer, engine=engine).spec
+    source = 'abc # a comment with names in it that is long\ndef\n' * 20
+    expected = lex_string(spec, source)
+    assert [t[1] for t in expected] == ['abc', 'def'] * 20
+    lexer = spec.lexer()
+    lexer.input_stream(io.StringIO(source), chunksize=5, maxtoken=8)
+    assert token_tuples(lexer) == expected
+
+# A comment that the window cuts off has to be matched again, not taken
+# as a DIVIDE (a rule of lower priority) and the text in it as names
+@pytest.mark.parametrize('engine', ['re', 'dfa'])
+@pytest.mark.parametrize('module', [slash_lexer, unrolled_lexer])
+def test_stream_cut_off_comment(engine, module):
+    spec = lex.lex(module=module, engine=engine).spec
+    source = ('a / b /* ' + 'comment ' * 8 + '*/ c\n') * 3
+    expected = lex_string(spec, source)
+    assert [t[0] for t in expected] == ['NAME', 'DIVIDE', 'NAME', 'NAME'] * 3
+    for chunksize in (1, 5, 16):
+        lexer = spec.lexer()
+        lexer.input_stream(io.StringIO(source), chunksize=chunksize, maxtoken=16)
+        assert token_tuples(lexer) == expected
+
+# -----------------------------------------------------------------------------
+# Keywords and operators
+# -----------------------------------------------------------------------------
+
+def test_keywords(snailz_spec):
+    tokens = lex_string(snailz_spec, 'if iffy True format snail')
+    assert [t[:2] for t in tokens] == [('IF', 'if'), ('NAME', 'iffy'), ('TRUE', 'True'),
+                                       ('NAME', 'format'), ('SNAIL', 'snail')]
+
+@pytest.mark.parametrize('engine', ['re', 'dfa'])
+def test_operators(engine):
+    spec = lex.lex(module=operator_lexer, engine=engine).spec
+    assert spec.lexkeywords == {}
+    tokens = lex_string(spec, 'a->b == c - d = e <tag x->y / z> f + `p == q + r` < g')
+    assert [t[:2] for t in tokens] == [
+        ('NAME', 'a'), ('ARROW', '->'), ('NAME', 'b'), ('EQEQ', '=='), ('NAME', 'c'),
+        ('MINUS', '-'), ('NAME', 'd'), ('EQUALS', '='), ('NAME', 'e'),
+        ('TAGOPEN', '<tag'), ('NAME', 'x'), ('ARROW', '->'), ('NAME', 'y'), ('SLASH', '/'),
+        ('NAME', 'z'), ('END', '>'), ('NAME', 'f'), ('PLUS', '+'),
+        ('TICK', '`'), ('TEXT', 'p == q '), ('PLUS', '+'), ('TEXT', ' r'), ('TICK', '`'),
+        ('LT', '<'), ('NAME', 'g')]
+
+# -----------------------------------------------------------------------------
+# Bytes input and token arrays
+# -----------------------------------------------------------------------------
+
+def array_tuples(tokens):
+    return [(t.type, t.value, t.lineno, t.lexpos) for t in tokens]
+
+def test_bytes_matches_str(snailz_spec):
+    source = make_source(500)
+    assert lex_string(snailz_spec, source.encode('utf-8')) == lex_string(snailz_spec, source)
+
+@pytest.mark.parametrize('encode', [False, True])
+def test_tokenize_all_matches_token(snailz_spec, encode):
+    source = make_source(500)
+    expected = lex_string(snailz_spec, source)
+    data = source.encode('utf-8') if encode else source
+    with contextlib.redirect_stdout(io.StringIO()):
+        tokens = snailz_spec.lexer().tokenize_all(data)
+    assert array_tuples(tokens) == expected
+    assert [tokens.value(n) for n in range(len(tokens))] == [t[1] for t in expected]
+
+@pytest.mark.parametrize('engine', ['re', 'dfa'])
+@pytest.mark.parametrize('module', [block_lexer, operator_lexer])
+def test_tokenize_all_states(engine, module):
+    spec = lex.lex(module=module, engine=engine).spec
+    rnd = random.Random(5)
+    pieces = ['abc', ' ', '\n', '{', '}', '<tag', '/', '>', '`', 'raw + text', '->', '==', '-', '+', '$']
+    source = ''.join(rnd.choice(pieces) for _ in range(3000))
+    expected = lex_string(spec, source)
+    assert array_tuples(spec.lexer().tokenize_all(source)) == expected
+
+# -----------------------------------------------------------------------------
+# Error tokens
+# -----------------------------------------------------------------------------
+
+ERROR_PIECES = ['abc', 'x', '12', ' ', '\n', '$', '@@', '%$%', 'long' * 10]
+
+# The tokens of data lexed with lexer in one of the ways: with token(), with
+# token() from a stream or with tokenize_all()
+def lex_with(lexer, data, how):
+    if how == 'token':
+        lexer.input(data)
+        return token_tuples(lexer)
+    if how == 'stream':
+        stream = io.BytesIO(data) if isinstance(data, bytes) else io.StringIO(data)
+        lexer.input_stream(stream, chunksize=3, maxtoken=4)
+        return token_tuples(lexer)
+    return array_tuples(lexer.tokenize_all(data))
+
+@pytest.mark.parametrize('engine', ['re', 'dfa'])
+@pytest.mark.parametrize('encode', [False, True])
+@pytest.mark.parametrize('how', ['token', 'stream', 'tokenize_all'])
+def test_error_tokens(engine, encode, how):
+    spec = lex.lex(module=error_lexer, engine=engine).spec
+    rnd = random.Random(17)
+    source = ''.join(rnd.choice(ERROR_PIECES) for _ in range(2000))
+    expected = lex_string(spec, source)
+    data = source.encode('utf-8') if encode else source
+    assert lex_with(spec.lexer(), data, how) == expected
+
+    # skip_illegal() gives one token for each run of illegal characters
+    runs = []
+    for tok in expected:
+        if runs and tok[0] == runs[-1][0] == 'ERROR' and tok[3] == runs[-1][3] + len(runs[-1][1]):
+            runs[-1] = runs[-1][:1] + (runs[-1][1] + tok[1],) + runs[-1][2:]
+        else:
+            runs.append(tok)
+    lexer = spec.lexer()
+    lexer.errors = 'run'
+    assert lex_with(lexer, data, how) == runs
+
+# The value of the token passed to t_error() is still the rest of the input
+@pytest.mark.parametrize('engine', ['re', 'dfa'])
+@pytest.mark.parametrize('encode', [False, True])
+@pytest.mark.parametrize('how', ['token', 'tokenize_all'])
+def test_error_token_value(engine, encode, how):
+    spec = lex.lex(module=error_lexer, engine=engine).spec
+    source = 'abc $ 12 @@ def\n%'
+    lexer = spec.lexer()
+    lexer.errors = 'rest'
+    data = source.encode('utf-8') if encode else source
+    errors = [tok for tok in lex_with(lexer, data, how) if tok[0] == 'ERROR']
+    assert [tok[1] for tok in errors] == [source[tok[3]:] for tok in errors]
+    assert len(errors) == 4
+
+# -----------------------------------------------------------------------------
+# Relexing after edits
+# -----------------------------------------------------------------------------
+
+# Make random edits to source one after the other and check that relex()
+# gives the same tokens and states as lexing the new text from the start
+def check_relex(spec, source, pieces, seed):
+    rnd = random.Random(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tokens = spec.lexer().tokenize_all(source)
+        for _ in range(100):
+            offset = rnd.randint(0, len(source))
+            deleted = rnd.randint(0, min(20, len(source) - offset))
+            inserted = ''.join(rnd.choice(pieces) for _ in range(rnd.randint(0, 3)))
+            source = source[:offset] + inserted + source[offset + deleted:]
+            tokens = spec.lexer().relex(tokens, offset, deleted, inserted)
+            expected = spec.lexer().tokenize_all(source)
+            assert array_tuples(tokens) == array_tuples(expected)
+            assert [tokens.state(n) for n in range(len(tokens) + 1)] == \
+                   [expected.state(n) for n in range(len(expected) + 1)]
+
+def test_relex_matches_token(snailz_spec):
+    pieces = STATEMENTS + [' ', '\n', '"', 'x', '12', '$', '+', 'if', 'True']
+    check_relex(snailz_spec, make_source(100), pieces, 7)
+
+@pytest.mark.parametrize('engine', ['re', 'dfa'])
+@pytest.mark.parametrize('module', [block_lexer, operator_lexer, slash_lexer, unrolled_lexer])
+def test_relex_states(engine, module):
+    spec = lex.lex(module=module, engine=engine).spec
+    pieces = ['abc', ' ', '\n', '{', '}', '<tag', '/', '>', '`', 'raw + text', '->', '==', '-', '+', '$',
+              '/*', '*/', '*']
+    rnd = random.Random(11)
+    source = ''.join(rnd.choice(pieces) for _ in range(300))
+    check_relex(spec, source, pieces, 13)
+
+# Closing a comment that was cut off has to undo the DIVIDE taken for its '/'
+@pytest.mark.parametrize('engine', ['re', 'dfa'])
+@pytest.mark.parametrize('module', [slash_lexer, unrolled_lexer])
+def test_relex_closes_comment(engine, module):
+    spec = lex.lex(module=module, engine=engine).spec
+    source = 'a / b /* x y z\n c d e\n'
+    tokens = spec.lexer().tokenize_all(source)
+    assert [t.type for t in tokens].count('DIVIDE') == 2
+    tokens = spec.lexer().relex(tokens, 21, 0, ' */')
+    expected = spec.lexer().tokenize_all(source[:21] + ' */' + source[21:])
+    assert array_tuples(tokens) == array_tuples(expected)
+    assert [t.value for t in tokens] == ['a', '/', 'b']
+
+# -----------------------------------------------------------------------------
+# Parallel lexing
+# -----------------------------------------------------------------------------
+
+def test_parallel_matches_serial(snailz_spec):
+    source = make_source(2000)
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = array_tuples(snailz_spec.lexer().tokenize_all(source))
+        result = array_tuples(snailz_spec.lexer().tokenize_parallel(source, workers=2, chunks=8))
+    assert result == expected
+
+@pytest.mark.parametrize('engine', ['re', 'dfa'])
+@pytest.mark.parametrize('module', [depth_lexer, block_lexer])
+def test_parallel_stateful_rules(engine, module):
+    spec = lex.lex(module=module, engine=engine).spec
+    rnd = random.Random(3)
+    lines = ['alpha beta', '{ gamma', 'delta { epsilon', '} zeta }', 'eta', '{ theta }']
+    source = '\n'.join(rnd.choice(lines[:3]) if i % 50 < 25 else rnd.choice(lines[3:]) for i in range(2000))
+    source += '\n}' * source.count('{')
+    serial = spec.lexer()
+    serial.depth = 0
+    parallel = spec.lexer()
+    parallel.depth = 0
+    expected = array_tuples(serial.tokenize_all(source))
+    assert array_tuples(parallel.tokenize_parallel(source, workers=2, chunks=8)) == expected
@@ -0,0 +1,376 @@
+# -----------------------------------------------------------------------------
+# test_yacc.py
+#
+# Checks that the generated parse methods in yacc.py are up to date with
+# their master methods, that the ways of parsing Snailz (from token
+# arrays, with packed and compressed tables, with tables loaded from a
+# module or a binary file) give the same trees as LRParser.parse(), that
+# grammar rules can keep attributes on p.parser, that threads can share
+# one parser, and that the LALR tables match the ones made from canonical
+# LR(1) item sets.  (example/stress_threads.py is a bigger version of the
+# threads test.)
+# -----------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import random
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+srcdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, os.path.abspath(srcdir))
+
+from ply import yacc, ygen
+import Snailz
+
+# -----------------------------------------------------------------------------
+# Generated parse methods
+# -----------------------------------------------------------------------------
+
+# yacc.py has to be what ygen.py makes of it.  If this fails, the master
+# methods were edited without running python src/ply/ygen.py.
+def test_generated_parsers_match():
+    filename = os.path.join(os.path.dirname(ygen.__file__), 'yacc.py')
+    with open(filename) as f:
+        lines = f.readlines()
+    assert ygen.generate(lines) == lines
+
+# -----------------------------------------------------------------------------
+# Parsing Snailz
+# -----------------------------------------------------------------------------
+
+STATEMENTS = [
+    'x = [1, 2, 3]',
+    'y = (a + b) * (c - d) / 4 % 5 ^ 2',
+    'z = !(a > b) & (c < d) | e == f',
+    'flag = True & !False | ready',
+    'while (i < 10) total = total + [i, i * 2, >>(x)]',
+    'for (i < 3 x = x + 1) if i > 5 x = -i else x = i',
+    'if a & b while (c) for (d e = f) g = h',
+    'message = "a string that is longer than sixteen characters"',
+    'bad = $ 1 @@ 2',
+    'x = = 1',
+    'y = (1 + ',
+]
+
+# A tree of ASTNodes as nested tuples that can be compared
+def dump(node):
+    if isinstance(node, Snailz.ASTNode):
+        return (node.type, dump(node.value), tuple(dump(child) for child in node.children))
+    if isinstance(node, list):
+        return tuple(dump(child) for child in node)
+    return repr(node)
+
+@pytest.fixture(scope='module')
+def snailz():
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return Snailz.Snailz()
+
+def parse_all(parser, lexer, tracking=False, arrays=False):
+    result = []
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        for s in STATEMENTS:
+            if arrays:
+                tree = parser.parse(s, lexer=lexer.tokenize_all(s).reader(), tracking=tracking)
+            else:
+                tree = parser.parse(s, lexer=lexer, tracking=tracking)
+            result.append(dump(tree))
+    return result, out.getvalue()
+
+@pytest.mark.parametrize('tracking', [False, True])
+def test_parse_token_arrays(snailz, tracking):
+    expected = parse_all(snailz.parser, snailz.lexer, tracking)
+    assert parse_all(snailz.parser, snailz.lexer, tracking, arrays=True) == expected
+
+# Each of the tables is built once to write the file, and then loaded from it
+@pytest.mark.parametrize('packed', [False, True, 'compressed'])
+@pytest.mark.parametrize('saved', ['tabmodule', 'binfile'])
+@pytest.mark.parametrize('tracking', [False, True])
+def test_parse_tables(snailz, tmp_path, packed, saved, tracking):
+    if saved == 'binfile' and not packed:
+        pytest.skip('binary files hold packed tables')
+    kw = { 'tabmodule': 'parsetab' } if saved == 'tabmodule' else { 'binfile': str(tmp_path / 'parsetab.bin') }
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yacc.yacc(module=snailz, debug=False, packed=packed, outputdir=str(tmp_path), **kw)
+        parser = yacc.yacc(module=snailz, debug=False, packed=packed, outputdir=str(tmp_path), **kw)
+    expected = parse_all(snailz.parser, snailz.lexer, tracking)
+    assert parse_all(parser, snailz.lexer, tracking) == expected
+
+# Grammar rules can keep their own attributes on p.parser for the length of
+# a parse.  Here each number is tagged with how many came before it.
+class CountingSnailz(Snailz.Snailz):
+    start = 'statement'
+
+    def p_expression_number(self, p):
+        'expression : NUMBER'
+        p.parser.numbers = getattr(p.parser, 'numbers', 0) + 1
+        p[0] = Snailz.ASTNode('number', value=(p[1], p.parser.numbers))
+
+def test_parser_attributes():
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        counting = CountingSnailz()
+    for _ in range(2):
+        tree = counting.parser.parse('x = [1, 2, 3]', lexer=counting.lexer)
+        assert [n.value for n in tree.children[1].children] == [(1, 1), (2, 2), (3, 3)]
+    assert not hasattr(counting.parser, 'numbers')
+
+# -----------------------------------------------------------------------------
+# Threads
+# -----------------------------------------------------------------------------
+
+# Snailz with a p_error() that records what it sees in the calling thread
+class RecordingSnailz(Snailz.Snailz):
+    local = threading.local()
+
+    def p_error(self, p):
+        self.local.errors.append((p and p.value, self.parser.state, len(self.parser.symstack)))
+
+# Each task makes its own lexer from the shared lexer spec
+def parse_recording(parser, spec, inputs, tracking):
+    lexer = spec.lexer()
+    results = []
+    for s in inputs:
+        errors = RecordingSnailz.local.errors = []
+        try:
+            tree = dump(parser.parse(s, lexer=lexer, tracking=tracking))
+        except Exception as e:
+            # Snailz evaluates expression statements, which can fail
+            tree = 'exception: %s' % e
+        results.append((tree, errors))
+    return results
+
+# The threads share one LRParser, and the results of parsing, including the
+# syntax errors that p_error() sees, have to match those of a serial run.
+# A short switch interval makes the threads interleave a lot.
+@pytest.fixture
+def switching():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+@pytest.mark.parametrize('packed', [False, True])
+@pytest.mark.parametrize('tracking', [False, True])
+def test_threads(switching, packed, tracking):
+    rnd = random.Random(1)
+    inputs = [rnd.choice(STATEMENTS) for _ in range(400)]
+    chunks = [inputs[i:i+10] for i in range(0, len(inputs), 10)]
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        recording = RecordingSnailz(packed=packed)
+        parser, spec = recording.parser, recording.lexer.spec
+        expected = parse_recording(parser, spec, inputs, tracking)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(parse_recording, parser, spec, chunk, tracking) for chunk in chunks]
+            results = [r for f in futures for r in f.result()]
+    assert any(errors for _, errors in expected)
+    assert results == expected
+
+# -----------------------------------------------------------------------------
+# LALR tables
+# -----------------------------------------------------------------------------
+
+# The LALR(1) tables of a grammar the long way round: the canonical LR(1)
+# item sets, merged where they have the same core, with conflicts resolved
+# as LRTable.lr_parse_table() does.  Returns the action and goto tables and
+# the transitions of each state, by core.
+def lalr_reference(grammar):
+    prods = grammar.Productions
+    nonterminals = set(grammar.Prodnames)
+
+    # FIRST of each nonterminal, with None for empty
+    first = { n: set() for n in nonterminals }
+    def first_of(symbols, lookahead):
+        result = set()
+        for s in symbols:
+            if s not in nonterminals:
+                return result | { s }
+            result |= first[s] - { None }
+            if None not in first[s]:
+                return result
+        return result | { lookahead }
+    changed = True
+    while changed:
+        changed = False
+        for p in prods[1:]:
+            f = first_of(p.prod, None)
+            if not f <= first[p.name]:
+                first[p.name] |= f
+                changed = True
+
+    def closure(items):
+        items = set(items)
+        work = list(items)
+        while work:
+            n, dot, a = work.pop()
+            rhs = prods[n].prod
+            if dot < len(rhs) and rhs[dot] in nonterminals:
+                for b in first_of(rhs[dot + 1:], a):
+                    for p in grammar.Prodnames[rhs[dot]]:
+                        item = (p.number, 0, b)
+                        if item not in items:
+                            items.add(item)
+                            work.append(item)
+        return frozenset(items)
+
+    def core(items):
+        return frozenset((n, dot) for n, dot, _ in items)
+
+    # The canonical LR(1) states, merged by core
+    start = closure({ (0, 0, '$end') })
+    merged = { core(start): set(start) }
+    transitions = {}
+    seen = { start }
+    work = [start]
+    while work:
+        items = work.pop()
+        moves = {}
+        for n, dot, a in items:
+            rhs = prods[n].prod
+            if dot < len(rhs):
+                moves.setdefault(rhs[dot], set()).add((n, dot + 1, a))
+        for symbol, kernel in moves.items():
+            target = closure(kernel)
+            transitions.setdefault(core(items), {})[symbol] = core(target)
+            merged.setdefault(core(target), set()).update(target)
+            if target not in seen:
+                seen.add(target)
+                work.append(target)
+
+    action = {}
+    goto = {}
+    for state, items in merged.items():
+        shifts = transitions.get(state, {})
+        reduces = {}
+        for n, dot, a in items:
+            if dot == len(prods[n].prod):
+                reduces.setdefault(a, []).append(prods[n])
+        st_action = {}
+        for a in set(reduces) | { s for s in shifts if s not in nonterminals }:
+            if a == '$end' and any(p.number == 0 for p in reduces.get(a, [])):
+                st_action[a] = 0
+                continue
+            reduce = min(reduces[a], key=lambda p: p.line) if a in reduces else None
+            if reduce is None:
+                st_action[a] = shifts[a]
+            elif a not in shifts:
+                st_action[a] = -reduce.number
+            else:
+                sprec, slevel = grammar.Precedence.get(a, ('right', 0))
+                rprec, rlevel = reduce.prec
+                if slevel < rlevel or (slevel == rlevel and rprec == 'left'):
+                    st_action[a] = -reduce.number
+                elif slevel == rlevel and rprec == 'nonassoc':
+                    st_action[a] = None
+                else:
+                    st_action[a] = shifts[a]
+        action[state] = st_action
+        goto[state] = { s: t for s, t in shifts.items() if s in nonterminals }
+    return action, goto, transitions, core(start)
+
+# Check the tables of LRTable against lalr_reference(), with the states
+# matched up by following the transitions from the start state
+def check_lalr_tables(grammar):
+    table = yacc.LRTable(grammar)
+    action, goto, transitions, start = lalr_reference(grammar)
+    numbers = { start: 0 }
+    work = [start]
+    while work:
+        state = work.pop()
+        lr0 = table.lr0_transitions[numbers[state]]
+        assert set(lr0) == set(transitions.get(state, {}))
+        for symbol, target in transitions.get(state, {}).items():
+            if target not in numbers:
+                numbers[target] = lr0[symbol]
+                work.append(target)
+            assert numbers[target] == lr0[symbol]
+    assert sorted(numbers.values()) == list(range(len(table.lr_action)))
+
+    def number(value):
+        return numbers[value] if isinstance(value, frozenset) else value
+    for state, st in numbers.items():
+        assert table.lr_action[st] == { a: number(v) for a, v in action[state].items() }
+        assert table.lr_goto[st] == { n: numbers[t] for n, t in goto[state].items() }
+
+def make_grammar(terminals, rules, precedence=()):
+    grammar = yacc.Grammar(terminals)
+    for level, (assoc, *terms) in enumerate(precedence, 1):
+        for term in terms:
+            grammar.set_precedence(term, assoc, level)
+    for line, rule in enumerate(rules, 1):
+        name, _, syms = rule.partition(':')
+        grammar.add_production(name.strip(), syms.split(), 'p_rule', 'grammar', line)
+    grammar.set_start()
+    return grammar
+
+GRAMMARS = {
+    # Left recursion with an empty list
+    'left': (['NAME', 'NUMBER', 'EQUALS', 'SEMI'], [
+        'program : program statement',
+        'program : ',
+        'statement : NAME EQUALS value SEMI',
+        'statement : SEMI',
+        'value : NAME',
+        'value : NUMBER',
+    ]),
+    # Right recursion through nullable nonterminals
+    'right': (['A', 'B', 'C', 'D'], [
+        's : a b c s',
+        's : D',
+        'a : A a',
+        'a : ',
+        'b : B',
+        'b : ',
+        'c : a C',
+        'c : b',
+    ]),
+    # LALR(1) but not SLR(1)
+    'assign': (['STAR', 'ID', 'EQUALS'], [
+        's : l EQUALS r',
+        's : r',
+        'l : STAR r',
+        'l : ID',
+        'r : l',
+    ]),
+    # LR(1) but not LALR(1): merging gives reduce/reduce conflicts
+    'merged': (['A', 'B', 'C', 'D', 'E'], [
+        's : A e C',
+        's : A f D',
+        's : B f C',
+        's : B e D',
+        'e : E',
+        'f : E',
+    ]),
+    # Ambiguous, with precedence, nonassoc and %prec
+    'expr': (['NUMBER', 'PLUS', 'TIMES', 'POWER', 'LT', 'MINUS'], [
+        'expr : expr PLUS expr',
+        'expr : expr TIMES expr',
+        'expr : expr POWER expr',
+        'expr : expr LT expr',
+        'expr : MINUS expr %prec UMINUS',
+        'expr : expr MINUS expr',
+        'expr : NUMBER',
+    ], [('nonassoc', 'LT'), ('left', 'PLUS', 'MINUS'), ('left', 'TIMES'),
+        ('right', 'POWER'), ('right', 'UMINUS')]),
+}
+
+@pytest.mark.parametrize('name', sorted(GRAMMARS))
+def test_lalr_tables(name):
+    check_lalr_tables(make_grammar(*GRAMMARS[name]))
+
+def test_lalr_tables_snailz(snailz):
+    pinfo = yacc.ParserReflect({ k: getattr(snailz, k) for k in dir(snailz) })
+    pinfo.get_all()
+    with contextlib.redirect_stderr(io.StringIO()):
+        assert not pinfo.validate_all()
+    grammar = yacc.Grammar(pinfo.tokens)
+    for term, assoc, level in pinfo.preclist:
+        grammar.set_precedence(term, assoc, level)
+    for funcname, gram in pinfo.grammar:
+        file, line, prodname, syms = gram
+        grammar.add_production(prodname, syms, funcname, file, line)
+    grammar.set_start(pinfo.start)
+    check_lalr_tables(grammar)
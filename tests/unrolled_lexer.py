@@ -0,0 +1,13 @@
+# The rules of slash_lexer with the comment written out without a lazy
+# repeat, so that the dfa engine can put it in its DFA.
+
+tokens = ('NAME', 'DIVIDE', 'TIMES')
+
+t_ignore_COMMENT = r'/\*[^*]*\*+([^/*][^*]*\*+)*/'
+t_DIVIDE = r'/'
+t_TIMES = r'\*'
+t_NAME = r'[a-z]+'
+t_ignore = ' \n'
+
+def t_error(t):
+    t.lexer.skip(1)